@@ -0,0 +1,108 @@
+"""Compare the memory used by different representations of a flavor catalog.
+
+Build the same number of flavors as pydantic `FlavorRead` models, neomodel `Flavor`
+nodes and slotted `FlavorRecord` records, and print the memory allocated by each
+representation. No DB is needed: items are built from rows like the ones returned
+by Cypher queries.
+
+Run it with:
+
+    python benchmarks/records_memory.py --items 1000000
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+from collections.abc import Callable
+from typing import Any
+from uuid import uuid4
+
+from fedreg.flavor.models import Flavor
+from fedreg.flavor.schemas import FlavorRead, FlavorRecord
+from fedreg.hashing import CONTENT_HASH, ETAG
+
+VALUES = {
+    "description": "",
+    "disk": 10,
+    "ram": 2048,
+    "vcpus": 2,
+    "swap": 0,
+    "ephemeral": 0,
+    "infiniband": False,
+    "gpus": 0,
+}
+
+
+def rows(items: int) -> list[tuple[Any, ...]]:
+    """Return rows with the record fields, as returned by `FlavorRecord.fetch`."""
+    data = []
+    for i in range(items):
+        values = {
+            **VALUES,
+            "uid": uuid4().hex,
+            "name": f"flavor-{i}",
+            "uuid": uuid4().hex,
+            "etag": uuid4().hex,
+            "is_shared": i % 2 == 0,
+        }
+        data.append(tuple(values.get(k) for k in FlavorRecord.__fields__))
+    return data
+
+
+def pydantic_models(data: list[tuple[Any, ...]]) -> list[FlavorRead]:
+    """Validated pydantic models."""
+    fields = FlavorRecord.__fields__
+    return [FlavorRead(**dict(zip(fields, row, strict=True))) for row in data]
+
+
+def neomodel_nodes(data: list[tuple[Any, ...]]) -> list[Flavor]:
+    """Neomodel nodes, as inflated by node sets.
+
+    Nodes store the etag as their content hash.
+    """
+    fields = [CONTENT_HASH if i == ETAG else i for i in FlavorRecord.__fields__]
+    return [Flavor(**dict(zip(fields, row, strict=True))) for row in data]
+
+
+def records(data: list[tuple[Any, ...]]) -> list[FlavorRecord]:
+    """Slotted records, without validation."""
+    return [FlavorRecord.from_row(row) for row in data]
+
+
+def measure(
+    func: Callable[[list[tuple[Any, ...]]], list[Any]], data: list[tuple[Any, ...]]
+) -> tuple[int, float]:
+    """Return allocated bytes and elapsed seconds building the items."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    items = func(data)
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del items
+    return size, elapsed
+
+
+def main() -> None:
+    """Print a line for each representation."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    data = rows(args.items)
+    print(f"{'representation':<16}{'total MiB':>12}{'bytes/item':>12}{'seconds':>10}")
+    for name, func in (
+        ("pydantic", pydantic_models),
+        ("neomodel", neomodel_nodes),
+        ("record", records),
+    ):
+        size, elapsed = measure(func, data)
+        print(
+            f"{name:<16}{size / 2**20:>12.1f}{size / args.items:>12.0f}{elapsed:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
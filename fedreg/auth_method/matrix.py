@@ -0,0 +1,143 @@
+"""Matrix of the authentication methods linking providers and identity providers.
+
+`AuthMatrix.load` reads every (Provider)-[AuthMethod]->(IdentityProvider) edge, with
+its properties, in a single query. `auth_matrix` returns a process-wide copy,
+reloaded after `max_age` seconds and dropped whenever an AuthMethod relationship is
+created, deleted or saved in this process.
+
+Provider and identity provider relationships use `ZeroOrMoreAuthMethods`, whose
+`relationship` method is served by the cached matrix: extended read schemas get the
+properties of every edge without a query per edge. Edges missing from the matrix,
+created by other processes, fall back to a query.
+"""
+
+import threading
+import time
+from typing import Any
+
+from neomodel import StructuredNode, StructuredRel, db
+from neomodel.util import OUTGOING
+
+from fedreg.changes import ZeroOrMore
+
+DEFAULT_MAX_AGE = 30.0
+
+auth_matrix_query = """
+    MATCH (p:Provider)-[r:`ALLOW_AUTH_THROUGH`]->(i:IdentityProvider)
+    RETURN p.uid, i.uid, r
+    ORDER BY p.uid, i.uid
+    """
+
+
+class AuthMatrix:
+    """Authentication methods by provider and identity provider uid.
+
+    Attributes:
+    ----------
+        loaded_at (float): Load time, from `time.monotonic`.
+    """
+
+    def __init__(self, rows: list[list[Any]], *, loaded_at: float = 0.0) -> None:
+        """Index the rows returned by `auth_matrix_query`."""
+        self._edges = {(provider, idp): rel for provider, idp, rel in rows}
+        self.loaded_at = loaded_at
+
+    @classmethod
+    def load(cls) -> "AuthMatrix":
+        """Read all the authentication methods with a single query."""
+        results, _ = db.cypher_query(auth_matrix_query)
+        return cls(results, loaded_at=time.monotonic())
+
+    def __len__(self) -> int:
+        return len(self._edges)
+
+    def get(self, provider: str, identity_provider: str) -> dict[str, Any] | None:
+        """Return the properties of the authentication method, None if missing."""
+        rel = self._edges.get((provider, identity_provider))
+        return None if rel is None else dict(rel)
+
+    def items(self) -> list[tuple[str, str, dict[str, Any]]]:
+        """Return all the (provider uid, identity provider uid, properties)."""
+        return [(p, i, dict(rel)) for (p, i), rel in self._edges.items()]
+
+    def identity_providers(self, provider: str) -> dict[str, dict[str, Any]]:
+        """Return the authentication methods of a provider, by identity provider."""
+        return {i: dict(rel) for (p, i), rel in self._edges.items() if p == provider}
+
+    def providers(self, identity_provider: str) -> dict[str, dict[str, Any]]:
+        """Return the providers trusting an identity provider, with their methods."""
+        return {
+            p: dict(rel)
+            for (p, i), rel in self._edges.items()
+            if i == identity_provider
+        }
+
+    def relationship(
+        self, provider: str, identity_provider: str, model: type[StructuredRel]
+    ) -> StructuredRel | None:
+        """Return the authentication method inflated into the given model."""
+        rel = self._edges.get((provider, identity_provider))
+        return None if rel is None else model.inflate(rel)
+
+
+_lock = threading.Lock()
+_matrix: AuthMatrix | None = None
+
+
+def auth_matrix(*, max_age: float = DEFAULT_MAX_AGE) -> AuthMatrix:
+    """Return the shared matrix, reloading it when older than max_age."""
+    global _matrix
+    with _lock:
+        matrix = _matrix
+    if matrix is None or time.monotonic() - matrix.loaded_at > max_age:
+        matrix = AuthMatrix.load()
+        with _lock:
+            _matrix = matrix
+    return matrix
+
+
+def invalidate() -> None:
+    """Drop the shared matrix: the next access reloads it."""
+    global _matrix
+    with _lock:
+        _matrix = None
+
+
+class ZeroOrMoreAuthMethods(ZeroOrMore):
+    """ZeroOrMore relationship between providers and identity providers.
+
+    Changes drop the shared matrix and `relationship` reads from it.
+    """
+
+    def connect(self, node: StructuredNode, properties: Any = None) -> Any:
+        """Connect the node and drop the shared matrix."""
+        result = super().connect(node, properties)
+        invalidate()
+        return result
+
+    def disconnect(self, node: StructuredNode) -> None:
+        """Disconnect the node and drop the shared matrix."""
+        super().disconnect(node)
+        invalidate()
+
+    def disconnect_all(self) -> None:
+        """Disconnect all nodes and drop the shared matrix."""
+        super().disconnect_all()
+        invalidate()
+
+    def reconnect(self, old_node: StructuredNode, new_node: StructuredNode) -> None:
+        """Replace the connected node and drop the shared matrix."""
+        super().reconnect(old_node, new_node)
+        invalidate()
+
+    def relationship(self, node: StructuredNode) -> StructuredRel | None:
+        """Return the authentication method with node from the shared matrix."""
+        self._check_node(node)
+        pair = (self.source.uid, node.uid)
+        if self.definition["direction"] != OUTGOING:
+            pair = pair[::-1]
+        model = self.definition.get("model") or StructuredRel
+        rel = auth_matrix().relationship(*pair, model)
+        if rel is None:
+            return super().relationship(node)
+        return self._set_start_end_cls(rel, node)
@@ -2,6 +2,8 @@
 
 from neomodel import StringProperty, StructuredRel
 
+from fedreg.auth_method.matrix import invalidate
+
 
 class AuthMethod(StructuredRel):
     """Relationship linking a Provider with an Identity Provider.
@@ -14,3 +16,7 @@ class AuthMethod(StructuredRel):
 
     idp_name = StringProperty(required=True)
     protocol = StringProperty(required=True)
+
+    def post_save(self):
+        """Drop the cached authentication matrix."""
+        invalidate()
@@ -0,0 +1,187 @@
+"""Effective compute capacity available to each project in each region.
+
+The capacity of a project on a compute service is its quota limit, multiplied by the
+overbooking factor of the region for cores and RAM, minus its current usage. A limit
+of -1, or a missing limit quota, means unlimited and gives an infinite capacity.
+Per-user quotas are ignored.
+
+`CapacityTable.load` reads all the quotas with a single query. The capacity of each
+resource is computed with numpy operations on whole columns and stored as a float
+array; the rows of each project are indexed once, when the table is built. The table
+is immutable, so it can be shared between requests: `capacity_table` returns a
+process-wide copy refreshed after `max_age` seconds.
+"""
+
+import threading
+import time
+from collections.abc import Sequence
+from typing import Any, NamedTuple
+
+import numpy as np
+from neomodel import db
+
+UNLIMITED = -1
+DEFAULT_MAX_AGE = 30.0
+COLUMNS = ("cores", "ram", "instances")
+
+capacity_query = """
+    MATCH (r:Region)-[:`SUPPLY`]->(s:ComputeService)<-[:`APPLY_TO`]-(q:ComputeQuota)
+        <-[:`USE_SERVICE_WITH`]-(p:Project)
+    WHERE NOT coalesce(q.per_user, false)
+    WITH r, s, p,
+        head(collect(CASE WHEN NOT coalesce(q.usage, false) THEN q END)) AS l,
+        head(collect(CASE WHEN q.usage THEN q END)) AS u
+    RETURN r.uid, s.uid, p.uid,
+        coalesce(r.overbooking_cpu, 1.0), coalesce(r.overbooking_ram, 1.0),
+        l.cores, l.ram, l.instances, u.cores, u.ram, u.instances
+    ORDER BY r.uid, s.uid, p.uid
+    """
+
+
+class Capacity(NamedTuple):
+    """Capacity available to a project on a compute service.
+
+    Attributes:
+    ----------
+        region (str): Region uid.
+        service (str): Compute service uid.
+        project (str): Project uid.
+        cores (float): Available cores, inf when unlimited.
+        ram (float): Available RAM (MiB), inf when unlimited.
+        instances (float): Available instances, inf when unlimited.
+    """
+
+    region: str
+    service: str
+    project: str
+    cores: float
+    ram: float
+    instances: float
+
+
+def effective(
+    limits: Sequence[Any], factors: Sequence[float] | float, usages: Sequence[Any]
+) -> np.ndarray:
+    """Return the overbooked limits minus the usages, computed by column.
+
+    Missing or -1 limits are unlimited, missing usages are 0. Capacities never go
+    below 0, even when the usage exceeds the limit.
+    """
+    limits = np.asarray(limits, dtype=float)
+    usages = np.nan_to_num(np.asarray(usages, dtype=float))
+    capacity = np.maximum(limits * np.asarray(factors, dtype=float) - usages, 0.0)
+    return np.where(np.isnan(limits) | (limits == UNLIMITED), np.inf, capacity)
+
+
+class CapacityTable:
+    """Capacity of every project on every compute service, stored by column.
+
+    Attributes:
+    ----------
+        regions (tuple of str): Region uid of each row.
+        services (tuple of str): Compute service uid of each row.
+        projects (tuple of str): Project uid of each row.
+        cores (numpy.ndarray): Available cores of each row.
+        ram (numpy.ndarray): Available RAM of each row.
+        instances (numpy.ndarray): Available instances of each row.
+        loaded_at (float): Load time, from `time.monotonic`.
+    """
+
+    def __init__(self, rows: Sequence[Sequence[Any]], *, loaded_at: float = 0.0):
+        """Compute the capacities from the rows returned by `capacity_query`."""
+        columns = list(zip(*rows, strict=True)) or [()] * 11
+        self.regions: tuple[str, ...] = columns[0]
+        self.services: tuple[str, ...] = columns[1]
+        self.projects: tuple[str, ...] = columns[2]
+        self.cores = effective(columns[5], columns[3], columns[8])
+        self.ram = effective(columns[6], columns[4], columns[9])
+        self.instances = effective(columns[7], 1.0, columns[10])
+        self.loaded_at = loaded_at
+        projects = np.array(self.projects, dtype=object)
+        order = np.argsort(projects, kind="stable")
+        keys, starts = np.unique(projects[order], return_index=True)
+        self._rows: dict[str, np.ndarray] = dict(
+            zip(keys, np.split(order, starts[1:]), strict=False)
+        )
+
+    @classmethod
+    def load(cls) -> "CapacityTable":
+        """Read the quotas of all the projects with a single query."""
+        results, _ = db.cypher_query(capacity_query)
+        return cls(results, loaded_at=time.monotonic())
+
+    def __len__(self) -> int:
+        return len(self.projects)
+
+    def __getitem__(self, index: int) -> Capacity:
+        return Capacity(
+            self.regions[index],
+            self.services[index],
+            self.projects[index],
+            float(self.cores[index]),
+            float(self.ram[index]),
+            float(self.instances[index]),
+        )
+
+    def rows(self, *, project: str | None = None) -> list[Capacity]:
+        """Return the capacities, optionally only those of the given project uid."""
+        if project is None:
+            return [self[i] for i in range(len(self))]
+        return [self[i] for i in self._rows.get(project, ())]
+
+    def ranked(
+        self,
+        project: str,
+        *,
+        cores: float = 0,
+        ram: float = 0,
+        instances: float = 1,
+    ) -> list[Capacity]:
+        """Return the capacities of a project able to host the request, best first.
+
+        Rows are ordered by the number of copies of the request they can host, then
+        by available cores and RAM.
+
+        Args:
+        ----
+            project (str): Project uid.
+            cores (float): Requested cores.
+            ram (float): Requested RAM (MiB).
+            instances (float): Requested instances.
+
+        Returns:
+        -------
+            list[Capacity].
+        """
+        rows = self._rows.get(project, np.empty(0, dtype=int))
+        available = np.stack([self.cores[rows], self.ram[rows], self.instances[rows]])
+        request = np.array([cores, ram, instances], dtype=float)
+        keep = (available >= request[:, None]).all(axis=0)
+        rows, available = rows[keep], available[:, keep]
+        asked = request > 0
+        fits = (available[asked] / request[asked, None]).min(axis=0, initial=np.inf)
+        order = np.lexsort((rows, -available[1], -available[0], -fits))
+        return [self[i] for i in rows[order]]
+
+
+_lock = threading.Lock()
+_table: CapacityTable | None = None
+
+
+def capacity_table(*, max_age: float = DEFAULT_MAX_AGE) -> CapacityTable:
+    """Return the shared capacity table, reloading it when older than max_age."""
+    global _table
+    with _lock:
+        table = _table
+    if table is None or time.monotonic() - table.loaded_at > max_age:
+        table = CapacityTable.load()
+        with _lock:
+            _table = table
+    return table
+
+
+def invalidate() -> None:
+    """Drop the shared capacity table: the next access reloads it."""
+    global _table
+    with _lock:
+        _table = None
@@ -0,0 +1,519 @@
+"""Capture of the changes made to the registry through fedreg models.
+
+All fedreg models inherit from `TrackedNode`, whose neomodel hooks notify the
+registered listeners with a `Change` each time a node is created, updated or deleted.
+Relationships of the fedreg models use the cardinality classes defined here, `One`,
+`OneOrMore`, `ZeroOrMore` and `ZeroOrOne`, whose managers notify connections and
+disconnections too; neomodel classes are left untouched. When no listener is
+registered hooks return immediately, so disabled change capture issues no additional
+query. Code writing with raw queries reports its changes with `notify`.
+
+While at least one listener is registered, each save, delete and relationship change
+runs, with its notification, in a single transaction: the caller's one, if open,
+otherwise a new one. `ChangeLog` is a listener appending changes, in the same
+transaction of the change, to an ordered log stored in the DB. Consumers read it
+starting from a cursor, the sequence number of the last change they have processed,
+and sync incrementally.
+
+Example:
+-------
+    log = ChangeLog()
+    add_listener(log)
+    ...
+    cursor = 0
+    for change in log.read(cursor):
+        cursor = change.seq
+"""
+
+import threading
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, NamedTuple
+
+import neomodel
+from neo4j.time import DateTime
+from neomodel import RelationshipManager, StringProperty, StructuredNode, db
+from neomodel.util import INCOMING
+
+from fedreg.hashing import (
+    CONTENT_HASH,
+    TREE_BASE_LABELS,
+    TREE_HASH,
+    content_hash,
+    owners_query,
+)
+
+CREATE = "create"
+UPDATE = "update"
+DELETE = "delete"
+CONNECT = "connect"
+DISCONNECT = "disconnect"
+DEFAULT_READ_LIMIT = 1000
+
+
+class Change(NamedTuple):
+    """A single change of a node or of a relationship.
+
+    Relationship changes are reported on the start node of the relationship. The
+    removal of all the relationships of a type is reported on the node they have been
+    removed from.
+
+    Attributes:
+    ----------
+        op (str): One of create, update, delete, connect and disconnect.
+        entity_label (str): Label of the changed node.
+        entity_uid (str): Uid of the changed node.
+        fields (tuple of str): Changed properties, or properties of the relationship.
+        relationship (str | None): Type of the connected or disconnected relationship.
+        target_label (str | None): Label of the end node of the relationship.
+        target_uid (str | None): Uid of the end node of the relationship. None when
+            all the relationships of that type have been removed.
+        seq (int | None): Sequence number in the change log.
+        timestamp (datetime | None): Time the change has been logged.
+        owners (tuple of str): Uids of the providers whose trees contained a deleted
+            node. Resolved before the deletion only while a registered listener has
+            `needs_owners` set. Not stored in the change log.
+    """
+
+    op: str
+    entity_label: str
+    entity_uid: str
+    fields: tuple[str, ...] = ()
+    relationship: str | None = None
+    target_label: str | None = None
+    target_uid: str | None = None
+    seq: int | None = None
+    timestamp: datetime | None = None
+    owners: tuple[str, ...] = ()
+
+
+Listener = Callable[[Change], None]
+
+_listeners: list[Listener] = []
+_lock = threading.Lock()
+
+
+def _notify(change: Change) -> None:
+    """Send the change to all the listeners."""
+    for listener in list(_listeners):
+        listener(change)
+
+
+@contextmanager
+def _transaction() -> Iterator[None]:
+    """Run the block in a transaction when listeners are registered.
+
+    The caller's transaction is reused when open, so that the change and the writes
+    of the listeners are committed, or rolled back, together.
+    """
+    if not _listeners or db._active_transaction is not None:
+        yield
+    else:
+        with db.transaction:
+            yield
+
+
+class TrackedNode(StructuredNode):
+    """Base class of the fedreg models notifying their changes.
+
+    To detect the updated properties, while change capture is enabled, nodes keep
+    the properties read from the DB. Only properties defined by the model are compared:
+    derived ones, written by queries, are ignored. Subclasses overriding `pre_save` or
+    `post_save` must call the parent method.
+
+    Before each save the content hash of the node is updated. It is not reported
+    among the changed properties.
+
+    Attributes:
+    ----------
+        content_hash (str | None): Hash of the node properties.
+    """
+
+    __abstract_node__ = True
+
+    content_hash = StringProperty()
+
+    @classmethod
+    def inflate(cls, node: Any) -> "TrackedNode":
+        """Keep the tree hash and, when change capture is enabled, the properties."""
+        item = super().inflate(node)
+        if not isinstance(node, (str, int)):
+            item._tree_hash = node.get(TREE_HASH)
+            if _listeners:
+                item._stored = dict(node)
+        return item
+
+    @property
+    def etag(self) -> str | None:
+        """Return the tree hash read from the DB, otherwise the content hash."""
+        return getattr(self, "_tree_hash", None) or self.content_hash
+
+    def save(self) -> "TrackedNode":
+        """Save the node and notify the change in the same transaction."""
+        with _transaction():
+            return super().save()
+
+    def delete(self) -> bool:
+        """Delete the node and notify the change in the same transaction.
+
+        When a listener needs them, the providers owning the node are resolved first,
+        while the node is still part of their trees.
+        """
+        with _transaction():
+            self._owners = ()
+            if any(getattr(i, "needs_owners", False) for i in _listeners) and (
+                not TREE_BASE_LABELS.isdisjoint(self.inherited_labels())
+            ):
+                results, _ = db.cypher_query(owners_query, {"uids": [self.uid]})
+                self._owners = tuple(results[0][0])
+            return super().delete()
+
+    def pre_save(self):
+        """Update the content hash and detect if the node is new.
+
+        A content change makes the tree hash read from the DB stale.
+        """
+        value = content_hash(self.deflate(self.__properties__, self))
+        if value != self.content_hash:
+            self.content_hash = value
+            self._tree_hash = None
+        if _listeners:
+            self._created = not hasattr(self, "element_id_property")
+
+    def post_save(self):
+        """Notify the created node or its updated properties."""
+        if not _listeners:
+            return
+        properties = self.deflate(self.__properties__, self)
+        stored = getattr(self, "_stored", None)
+        created = getattr(self, "_created", False)
+        if created or stored is None:
+            fields = [k for k, v in properties.items() if v is not None]
+        else:
+            fields = [k for k, v in properties.items() if v != stored.get(k)]
+        fields = [i for i in fields if i != CONTENT_HASH]
+        self._stored = properties
+        if created or fields:
+            op = CREATE if created else UPDATE
+            _notify(Change(op, self.__label__, self.uid, tuple(sorted(fields))))
+
+    def post_delete(self):
+        """Notify the deleted node."""
+        if _listeners:
+            owners = getattr(self, "_owners", ())
+            _notify(Change(DELETE, self.__label__, self.uid, owners=owners))
+
+
+def _relationship_change(
+    manager: RelationshipManager,
+    op: str,
+    node: StructuredNode | None,
+    properties: dict[str, Any] | None = None,
+) -> Change:
+    """Return the change of a relationship of the manager's source node."""
+    source = manager.source
+    definition = manager.definition
+    target_label = definition["node_class"].__label__
+    target_uid = None
+    if node is not None:
+        target_label, target_uid = node.__label__, node.uid
+    if definition["direction"] == INCOMING and node is not None:
+        start = (target_label, target_uid)
+        target_label, target_uid = source.__label__, source.uid
+    else:
+        start = (source.__label__, source.uid)
+    return Change(
+        op,
+        *start,
+        tuple(sorted(properties or ())),
+        definition["relation_type"],
+        target_label,
+        target_uid,
+    )
+
+
+class TrackedRelationshipManager(RelationshipManager):
+    """Relationship manager notifying connections and disconnections.
+
+    Base of the fedreg cardinality classes. Each change runs, with its notification,
+    in the transaction of `TrackedNode` writes.
+    """
+
+    def connect(self, node: StructuredNode, properties: Any = None) -> Any:
+        """Connect the node and notify the change."""
+        with _transaction():
+            result = super().connect(node, properties)
+            if _listeners:
+                _notify(_relationship_change(self, CONNECT, node, properties))
+        return result
+
+    def disconnect(self, node: StructuredNode) -> None:
+        """Disconnect the node and notify the change."""
+        with _transaction():
+            super().disconnect(node)
+            if _listeners:
+                _notify(_relationship_change(self, DISCONNECT, node))
+
+    def disconnect_all(self) -> None:
+        """Disconnect all nodes and notify a change without target uid."""
+        with _transaction():
+            super().disconnect_all()
+            if _listeners:
+                _notify(_relationship_change(self, DISCONNECT, None))
+
+    def reconnect(self, old_node: StructuredNode, new_node: StructuredNode) -> None:
+        """Replace the connected node and notify both changes."""
+        with _transaction():
+            super().reconnect(old_node, new_node)
+            if _listeners and old_node.element_id != new_node.element_id:
+                _notify(_relationship_change(self, DISCONNECT, old_node))
+                _notify(_relationship_change(self, CONNECT, new_node))
+
+
+class One(TrackedRelationshipManager, neomodel.One):
+    """A relationship to a single node, notifying its changes."""
+
+
+class OneOrMore(TrackedRelationshipManager, neomodel.OneOrMore):
+    """A relationship to one or more nodes, notifying its changes."""
+
+
+class ZeroOrMore(TrackedRelationshipManager, neomodel.ZeroOrMore):
+    """A relationship to zero or more nodes, notifying its changes."""
+
+
+class ZeroOrOne(TrackedRelationshipManager, neomodel.ZeroOrOne):
+    """A relationship to zero or one node, notifying its changes."""
+
+
+def add_listener(listener: Listener) -> None:
+    """Register a listener and enable change capture."""
+    with _lock:
+        _listeners.append(listener)
+
+
+def remove_listener(listener: Listener) -> None:
+    """Unregister a listener. Disable change capture when no listeners are left."""
+    with _lock:
+        _listeners.remove(listener)
+
+
+def notify(changes: Iterable[Change]) -> None:
+    """Send to the listeners the changes applied with raw queries."""
+    for change in changes:
+        _notify(change)
+
+
+def is_enabled() -> bool:
+    """Return True if at least one listener is registered."""
+    return bool(_listeners)
+
+
+def has_listener(listener: Listener) -> bool:
+    """Return True if the listener is registered."""
+    return listener in _listeners
+
+
+@contextmanager
+def capture(listener: Listener) -> Iterator[Listener]:
+    """Register the listener for the duration of the block."""
+    add_listener(listener)
+    try:
+        yield listener
+    finally:
+        remove_listener(listener)
+
+
+class CursorExpiredError(LookupError):
+    """Changes following the cursor have been removed by the retention policy.
+
+    The consumer must sync from a full snapshot and restart from `head()`.
+    """
+
+
+class ChangeLog:
+    """Ordered log of changes stored in the DB.
+
+    Each change is a `ChangeEntry` node with a sequence number assigned incrementing
+    a counter stored in a `ChangeLogState` node: the counter update locks that node,
+    so concurrent transactions get increasing numbers in commit order. The same node
+    stores the *floor*, the highest sequence number removed by `truncate`.
+
+    Instances are listeners: register one with `add_listener` to start logging.
+    """
+
+    append_query = """
+        MERGE (s:ChangeLogState {id: 0})
+        SET s.seq = coalesce(s.seq, 0) + 1
+        CREATE (e:ChangeEntry $entry)
+        SET e.seq = s.seq, e.timestamp = datetime()
+        RETURN e.seq
+        """
+    read_query = """
+        OPTIONAL MATCH (s:ChangeLogState {id: 0})
+        OPTIONAL MATCH (e:ChangeEntry)
+        WHERE e.seq > $cursor
+        WITH s, e
+        ORDER BY e.seq
+        LIMIT $limit
+        RETURN coalesce(s.floor, 0), properties(e)
+        """
+    compact_query = """
+        MATCH (e:ChangeEntry)
+        WHERE e.seq <= $upto
+        WITH e
+        ORDER BY e.seq
+        WITH
+            e.entity_uid AS uid,
+            coalesce(e.relationship, "") AS relationship,
+            coalesce(e.target_uid, "") AS target,
+            collect(e) AS entries
+        WHERE size(entries) > 1
+        WITH last(entries) AS kept, entries
+        SET kept.fields = apoc.coll.sort(apoc.coll.toSet(
+                reduce(f = [], i IN entries | f + coalesce(i.fields, []))
+            )),
+            kept.op = CASE
+                WHEN kept.op = $update AND any(i IN entries WHERE i.op = $create)
+                THEN $create
+                ELSE kept.op
+            END
+        WITH kept, entries
+        UNWIND entries AS e
+        WITH e, kept
+        WHERE e <> kept
+        DELETE e
+        RETURN count(e)
+        """
+    truncate_query = """
+        OPTIONAL MATCH (e:ChangeEntry)
+        WHERE e.seq <= $upto OR e.timestamp < datetime() - $older_than
+        WITH max(e.seq) AS floor, collect(e) AS entries
+        MERGE (s:ChangeLogState {id: 0})
+        SET s.floor = CASE
+            WHEN floor > coalesce(s.floor, 0) THEN floor
+            ELSE s.floor
+        END
+        FOREACH (e IN entries | DELETE e)
+        RETURN size(entries)
+        """
+
+    def __call__(self, change: Change) -> None:
+        """Append the change. Makes instances usable as listeners."""
+        self.append(change)
+
+    def append(self, change: Change) -> int:
+        """Append the change to the log and return its sequence number."""
+        entry = change._asdict()
+        entry.pop("seq")
+        entry.pop("timestamp")
+        entry.pop("owners")
+        entry["fields"] = list(entry["fields"])
+        results, _ = db.cypher_query(self.append_query, {"entry": entry})
+        return results[0][0]
+
+    def read(self, cursor: int = 0, *, limit: int = DEFAULT_READ_LIMIT) -> list[Change]:
+        """Return the changes following the cursor, in order.
+
+        Args:
+        ----
+            cursor (int): Sequence number of the last processed change. 0 to read
+                from the beginning.
+            limit (int): Maximum number of returned changes.
+
+        Returns:
+        -------
+            list[Change]. The next changes. Consumers use the `seq` of the last one
+            as next cursor.
+
+        Raises:
+        ------
+            CursorExpiredError: Some changes following the cursor have been removed.
+        """
+        results, _ = db.cypher_query(
+            self.read_query, {"cursor": cursor, "limit": limit}
+        )
+        if results and cursor < results[0][0]:
+            raise CursorExpiredError(
+                f"Changes up to {results[0][0]} have been removed, cursor is {cursor}"
+            )
+        return [self._change(row[1]) for row in results if row[1] is not None]
+
+    def head(self) -> int:
+        """Return the sequence number of the last change, 0 if there are none."""
+        results, _ = db.cypher_query(
+            "OPTIONAL MATCH (s:ChangeLogState {id: 0}) RETURN coalesce(s.seq, 0)"
+        )
+        return results[0][0]
+
+    def compact(self, upto: int | None = None) -> int:
+        """Keep only the last change of each node and of each relationship.
+
+        Compaction keeps the log consistent: a consumer reading from any cursor still
+        reaches the current state, but skips the intermediate ones. The kept change of
+        a node lists all the properties changed by the removed ones and, if the node
+        has been created in the compacted range, it is a create.
+
+        Args:
+        ----
+            upto (int | None): Compact changes up to this sequence number. By default
+                all of them.
+
+        Returns:
+        -------
+            int. Number of removed changes.
+        """
+        results, _ = db.cypher_query(
+            self.compact_query,
+            {
+                "upto": self.head() if upto is None else upto,
+                "create": CREATE,
+                "update": UPDATE,
+            },
+        )
+        return sum(row[0] for row in results)
+
+    def truncate(
+        self, *, upto: int | None = None, older_than: timedelta | None = None
+    ) -> int:
+        """Remove old changes, applying the retention policy.
+
+        Consumers with a cursor lower than the highest removed change get a
+        `CursorExpiredError`.
+
+        Args:
+        ----
+            upto (int | None): Remove changes up to this sequence number.
+            older_than (timedelta | None): Remove changes logged before this time.
+
+        Returns:
+        -------
+            int. Number of removed changes.
+        """
+        results, _ = db.cypher_query(
+            self.truncate_query,
+            {
+                "upto": -1 if upto is None else upto,
+                "older_than": older_than,
+            },
+        )
+        return results[0][0]
+
+    @staticmethod
+    def _change(entry: dict[str, Any]) -> Change:
+        """Build a change from the stored properties."""
+        timestamp = entry.get("timestamp")
+        if isinstance(timestamp, DateTime):
+            timestamp = timestamp.to_native()
+        return Change(
+            op=entry["op"],
+            entity_label=entry["entity_label"],
+            entity_uid=entry["entity_uid"],
+            fields=tuple(entry.get("fields", ())),
+            relationship=entry.get("relationship"),
+            target_label=entry.get("target_label"),
+            target_uid=entry.get("target_uid"),
+            seq=entry["seq"],
+            timestamp=timestamp,
+        )
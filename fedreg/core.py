@@ -1,17 +1,23 @@
 """Core pydantic models."""
 
+from collections.abc import Iterator, Mapping, Sequence
 from datetime import date, datetime
 from enum import Enum
 from typing import Any, Literal, get_origin
 from uuid import UUID
 
 from neo4j.time import Date, DateTime
-from neomodel import One, OneOrMore, ZeroOrMore, ZeroOrOne
+from neomodel import One, OneOrMore, ZeroOrMore, ZeroOrOne, db
 from pydantic import BaseModel, Field, create_model, fields, validator
 from pydantic.fields import SHAPE_LIST
 
+from fedreg.hashing import ETAG, etag, etag_expression
+from fedreg.provider.status import AVAILABLE_STATUSES, hides_unavailable
+from fedreg.sla.models import hides_inactive
+
 DOC_SCHEMA_TYPE = "Inner attribute to distinguish between schema types"
 MAX_DEEP = 1
+RECORD_BATCH_SIZE = 10000
 
 
 class BaseNode(BaseModel):
@@ -65,11 +71,25 @@ class BaseNodeCreate(BaseModel):
         validate_assignment = True
 
 
+def _hidden(manager: Any, node: Any, *, single: bool = False) -> bool:
+    """Return True if `available_only` or `active_only` leave the node out.
+
+    A single provider field is the owner of the read item and is always kept.
+    """
+    label = manager.definition["node_class"].__label__
+    if label == "Provider":
+        return (
+            not single and hides_unavailable() and node.status not in AVAILABLE_STATUSES
+        )
+    day = hides_inactive()
+    return label == "SLA" and day is not None and not node.is_active(day)
+
+
 class BaseNodeRead(BaseModel):
     """Common attributes and validators when reading nodes from the DB.
 
     Use ORM mode to read data from DB models.
-    Add the uid attribute.
+    Add the uid and etag attributes.
     Convert Neo4j datetime objects into python
     datetime ones.
     When dealing with relationships retrieve all connected items and show
@@ -80,9 +100,16 @@ class BaseNodeRead(BaseModel):
     Attributes:
     ----------
         uid (str): Database item's unique identifier.
+        etag (str | None): Hash of the item content and, for the items of a provider
+            tree, of its subtree.
     """
 
     uid: str = Field(description="Database item's unique identifier.")
+    etag: str | None = Field(
+        default=None,
+        description="Hash of the item content and, for the items of a provider "
+        "tree, of its subtree.",
+    )
 
     @validator("*", pre=True)
     @classmethod
@@ -93,24 +120,28 @@ class BaseNodeRead(BaseModel):
         From OneOrMore or ZeroOrMore relationships get all relationships.
 
         If the relationship has a model, return a dict with the data stored in the
-        relationship.
+        relationship. Within `available_only`, lists of providers skip the unavailable
+        ones. Within `active_only`, SLAs not active on the given day are skipped.
         """
         if isinstance(v, (One, ZeroOrOne)):
-            if v.definition.get("model") is None:
-                return v.single()
             node = v.single()
-            if node is not None:
-                item = node.__dict__
-                item["relationship"] = v.relationship(node)
-                return item
-            return node
+            if node is not None and _hidden(v, node, single=True):
+                node = None
+            if node is None or v.definition.get("model") is None:
+                return node
+            item = node.__dict__
+            item["relationship"] = v.relationship(node)
+            item[ETAG] = getattr(node, ETAG, None)
+            return item
         if isinstance(v, (OneOrMore, ZeroOrMore)):
+            nodes = [i for i in v.all() if not _hidden(v, i)]
             if v.definition.get("model") is None:
-                return v.all()
+                return nodes
             items = []
-            for node in v.all():
+            for node in nodes:
                 item = node.__dict__
                 item["relationship"] = v.relationship(node)
+                item[ETAG] = getattr(node, ETAG, None)
                 items.append(item)
             return items
         return v
@@ -279,3 +310,151 @@ def create_query_model(
         new_fields = add_fields(field, deep=MAX_DEEP)
         d.update(new_fields)
     return create_model(model_name, __base__=BaseNodeQuery, **d)
+
+
+class BaseRecord:
+    """Compact record with the properties of a node.
+
+    Records store, in slots, the values as they are read from the DB, without any
+    validation nor conversion. They are meant for bulk processing of millions of items,
+    where pydantic models and neomodel nodes use too much memory. Use `to_schema` to
+    get the validated pydantic model.
+
+    Concrete record types are created with `create_record_type`.
+    """
+
+    __slots__ = ()
+    __fields__: tuple[str, ...] = ()
+    __label__: str = ""
+    __schema__: type[BaseModel] = BaseModel
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        """Set values by position or name. Missing values get the schema default."""
+        if len(args) > len(self.__fields__):
+            raise TypeError(
+                f"{type(self).__name__} takes at most {len(self.__fields__)} values"
+            )
+        values = dict(zip(self.__fields__, args, strict=False))
+        duplicates = values.keys() & kwargs.keys()
+        if duplicates:
+            raise TypeError(f"Multiple values for {', '.join(sorted(duplicates))}")
+        values.update(kwargs)
+        unknown = values.keys() - set(self.__fields__)
+        if unknown:
+            raise TypeError(f"Unexpected fields: {', '.join(sorted(unknown))}")
+        for name in self.__fields__:
+            if name in values:
+                setattr(self, name, values[name])
+            else:
+                setattr(self, name, self.__schema__.__fields__[name].get_default())
+
+    @classmethod
+    def from_row(cls, row: Sequence[Any]) -> "BaseRecord":
+        """Build a record from a row with a value for each field, in field order."""
+        item = object.__new__(cls)
+        for name, value in zip(cls.__fields__, row, strict=True):
+            setattr(item, name, value)
+        return item
+
+    @classmethod
+    def from_mapping(cls, data: Mapping[str, Any]) -> "BaseRecord":
+        """Build a record from a dict or a neo4j Node.
+
+        Neo4j does not store null properties, so missing keys get the schema default.
+        The etag is read from the stored hashes.
+        """
+        item = object.__new__(cls)
+        for name in cls.__fields__:
+            if name == ETAG and name not in data:
+                setattr(item, name, etag(data))
+            elif name in data:
+                setattr(item, name, data[name])
+            else:
+                setattr(item, name, cls.__schema__.__fields__[name].get_default())
+        return item
+
+    @classmethod
+    def projection(cls, var: str = "n") -> str:
+        """Return the Cypher expressions returning the record fields of a node."""
+        return ", ".join(
+            etag_expression(var) if name == ETAG else f"{var}.{name}"
+            for name in cls.__fields__
+        )
+
+    @classmethod
+    def fetch(cls, *, batch_size: int = RECORD_BATCH_SIZE) -> Iterator["BaseRecord"]:
+        """Yield a record for each node with the record label.
+
+        Nodes are read in batches, ordered by uid, using the uid of the last node
+        of the previous batch as starting point: each batch uses the uid index and
+        only a batch of rows is kept in memory.
+        """
+        query = f"""
+            MATCH (n:{cls.__label__})
+            WHERE $last IS NULL OR n.uid > $last
+            RETURN {cls.projection("n")}
+            ORDER BY n.uid
+            LIMIT $limit
+        """
+        last = None
+        while True:
+            rows, _ = db.cypher_query(query, {"last": last, "limit": batch_size})
+            for row in rows:
+                yield cls.from_row(row)
+            if len(rows) < batch_size:
+                return
+            last = rows[-1][0]
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return a dict with the record values."""
+        return {name: getattr(self, name) for name in self.__fields__}
+
+    def to_schema(self, schema: type[BaseModel] | None = None) -> BaseModel:
+        """Return the validated pydantic model. By default the record schema."""
+        return (schema or self.__schema__).parse_obj(self.to_dict())
+
+    def __eq__(self, other: object) -> bool:
+        """Records are equal when they have the same type and values."""
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, i) == getattr(other, i) for i in self.__fields__)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        """Show type name and values."""
+        values = ", ".join(f"{k}={v!r}" for k, v in self.to_dict().items())
+        return f"{type(self).__name__}({values})"
+
+
+def create_record_type(
+    model_name: str, schema: type[BaseModel], *, label: str
+) -> type[BaseRecord]:
+    """Create a slotted record type from a read schema.
+
+    The new record has the given name and one slot for each attribute of the schema,
+    except the internal *schema_type*. The *uid* is always the first one.
+
+    Args:
+    ----
+        model_name (str): New record type name.
+        schema (type[BaseModel]): Read schema from which retrieve the attributes. It
+            is the default target of `to_schema`.
+        label (str): Label of the nodes read by `fetch`.
+
+    Returns:
+    -------
+        type[BaseRecord].
+    """
+    names = [i for i in schema.__fields__ if i not in ("uid", "schema_type")]
+    if "uid" in schema.__fields__:
+        names.insert(0, "uid")
+    attrs = {
+        "__slots__": tuple(names),
+        "__fields__": tuple(names),
+        "__label__": label,
+        "__schema__": schema,
+        "__module__": schema.__module__,
+        "__doc__": f"Compact record of {schema.__name__} data.",
+    }
+    return type(model_name, (BaseRecord,), attrs)
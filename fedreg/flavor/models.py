@@ -3,16 +3,15 @@
 from neomodel import (
     BooleanProperty,
     IntegerProperty,
-    One,
-    OneOrMore,
     RelationshipFrom,
     StringProperty,
-    StructuredNode,
     UniqueIdProperty,
 )
 
+from fedreg.changes import One, OneOrMore, TrackedNode
 
-class Flavor(StructuredNode):
+
+class Flavor(TrackedNode):
     """Virtual Machine Flavor owned by a Resource Provider.
 
     A VM Flavor is uniquely identified in the Resource Provider by its uuid. It has a
@@ -11,6 +11,7 @@ from fedreg.core import (
     BaseReadPrivate,
     BaseReadPublic,
     create_query_model,
+    create_record_type,
 )
 from fedreg.flavor.constants import (
     DOC_DISK,
@@ -219,3 +220,4 @@ class FlavorRead(BaseNodeRead, BaseReadPrivate, FlavorBase):
 
 
 FlavorQuery = create_query_model("FlavorQuery", FlavorBase)
+FlavorRecord = create_record_type("FlavorRecord", FlavorRead, label="Flavor")
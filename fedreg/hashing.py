@@ -0,0 +1,119 @@
+"""Content and subtree hashes of the registry nodes.
+
+Every node stores in `content_hash` a digest of its own properties, computed by the
+`TrackedNode` hooks from the deflated model properties: the uid, the hashes and the
+properties derived from other ones are left out, so equal content gives equal
+hashes whatever the node identity. The nodes of a provider tree also store in
+`tree_hash` a digest of their content and of the hashes of their children: a change
+anywhere in a subtree changes the tree hash of all its ancestors, while unchanged
+subtrees keep theirs. Tree hashes are maintained by `fedreg.provider.hashes`.
+
+The ETag of a node is its tree hash, when it has one, otherwise its content hash.
+Tree hashes, and so ETags and provider comparisons, are up to date only while a
+`TreeHasher` is registered: after writes made without one, run `rehash`, or `refresh`
+after writes made without the neomodel hooks.
+"""
+
+import hashlib
+import json
+from collections.abc import Iterable, Mapping
+from typing import Any
+
+CONTENT_HASH = "content_hash"
+TREE_HASH = "tree_hash"
+ETAG = "etag"
+DIGEST_SIZE = 16
+DERIVED_PROPERTIES = frozenset({"uid", CONTENT_HASH, "search_tags", "fingerprint"})
+TREE_BASE_LABELS = frozenset(
+    {
+        "Provider",
+        "Project",
+        "Region",
+        "Location",
+        "Service",
+        "Flavor",
+        "Image",
+        "Network",
+        "Quota",
+    }
+)
+# Uids of the providers owning the nodes with the given uids.
+owners_query = """
+    CALL {
+        MATCH (p:Provider)
+        WHERE p.uid IN $uids
+        RETURN p
+        UNION
+        MATCH (p:Provider)-[:`BOOK_PROJECT_FOR_SLA`]->(n:Project)
+        WHERE n.uid IN $uids
+        RETURN p
+        UNION
+        MATCH (p:Provider)-[:`DIVIDED_INTO`]->(n:Region)
+        WHERE n.uid IN $uids
+        RETURN p
+        UNION
+        MATCH (p:Provider)-[:`DIVIDED_INTO`]->(:Region)-[:`LOCATED_AT`]->(n:Location)
+        WHERE n.uid IN $uids
+        RETURN p
+        UNION
+        MATCH (p:Provider)-[:`DIVIDED_INTO`]->(:Region)-[:`SUPPLY`]->(n:Service)
+        WHERE n.uid IN $uids
+        RETURN p
+        UNION
+        MATCH (p:Provider)-[:`DIVIDED_INTO`]->(:Region)-[:`SUPPLY`]->(:Service)
+            -[:`AVAILABLE_VM_FLAVOR`]->(n:Flavor)
+        WHERE n.uid IN $uids
+        RETURN p
+        UNION
+        MATCH (p:Provider)-[:`DIVIDED_INTO`]->(:Region)-[:`SUPPLY`]->(:Service)
+            -[:`AVAILABLE_VM_IMAGE`]->(n:Image)
+        WHERE n.uid IN $uids
+        RETURN p
+        UNION
+        MATCH (p:Provider)-[:`DIVIDED_INTO`]->(:Region)-[:`SUPPLY`]->(:Service)
+            -[:`AVAILABLE_NETWORK`]->(n:Network)
+        WHERE n.uid IN $uids
+        RETURN p
+        UNION
+        MATCH (p:Provider)-[:`DIVIDED_INTO`]->(:Region)-[:`SUPPLY`]->(:Service)
+            <-[:`APPLY_TO`]-(n:Quota)
+        WHERE n.uid IN $uids
+        RETURN p
+    }
+    RETURN collect(p.uid)
+    """
+
+
+def digest(*parts: Any) -> str:
+    """Return the hex digest of the canonical JSON serialization of the parts."""
+    data = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(data.encode(), digest_size=DIGEST_SIZE).hexdigest()
+
+
+def content_hash(properties: Mapping[str, Any]) -> str:
+    """Return the hash of the deflated properties of a node.
+
+    Null values are skipped, as Neo4j does not store them.
+    """
+    return digest(
+        {
+            k: v
+            for k, v in properties.items()
+            if v is not None and k not in DERIVED_PROPERTIES
+        }
+    )
+
+
+def tree_hash(content: str | None, children: Iterable[str | None]) -> str:
+    """Return the hash of a node content and of its children hashes, in any order."""
+    return digest(content, sorted(i or "" for i in children))
+
+
+def etag(properties: Mapping[str, Any]) -> str | None:
+    """Return the ETag of a node from its stored properties."""
+    return properties.get(TREE_HASH) or properties.get(CONTENT_HASH)
+
+
+def etag_expression(var: str) -> str:
+    """Return the Cypher expression of the ETag of the node var."""
+    return f"coalesce({var}.{TREE_HASH}, {var}.{CONTENT_HASH})"
@@ -0,0 +1,240 @@
+"""Resolution of the access granted by an authentication token.
+
+A token is identified by its issuer, the identity provider endpoint, and by the value
+of the group claim, the user group name. `AccessResolver` maps them, with a single
+query starting from the unique endpoint index, to the user groups, their SLAs and
+the projects and providers they give access to.
+
+Descriptors are kept in a TTL cache, including the negative ones, so unknown tokens
+do not hit the DB on every call. SLA validity is checked when reading the cache, so
+descriptors do not depend on the day. `install` registers the shared
+`access_resolver` as change listener, so its descriptors are dropped as soon as
+identity providers, user groups, SLAs, projects or providers change; the TTL bounds
+the staleness due to writes made by other processes. Registering a listener enables
+change capture, so the resolver is not registered at import.
+
+Example:
+-------
+    resolver = install()
+    access = resolver.resolve(issuer, group)
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from datetime import date
+from typing import NamedTuple
+
+from neomodel import db
+
+from fedreg.changes import Change, add_listener, has_listener
+
+DEFAULT_TTL = 60.0
+DEFAULT_MAXSIZE = 4096
+WATCHED_LABELS = frozenset(
+    {"IdentityProvider", "UserGroup", "SLA", "Project", "Provider"}
+)
+
+access_query = """
+    MATCH (i:IdentityProvider {endpoint: $issuer})
+    OPTIONAL MATCH (i)<-[:`BELONG_TO`]-(g:UserGroup {name: $group})
+    OPTIONAL MATCH (g)-[:`AGREE`]->(s:SLA)-[:`REFER_TO`]->(p:Project)
+        <-[:`BOOK_PROJECT_FOR_SLA`]-(prov:Provider)
+    RETURN i.uid, i.group_claim, g.uid, s.uid, s.start_date, s.end_date,
+        p.uid, p.uuid, p.name, prov.uid, prov.name, prov.status
+    ORDER BY g.uid, s.uid, p.uid
+    """
+
+
+class ProjectAccess(NamedTuple):
+    """Project reachable through an SLA of a user group.
+
+    Attributes:
+    ----------
+        user_group (str): User group uid.
+        sla (str): SLA uid.
+        start_date (date): SLA start date.
+        end_date (date): SLA end date.
+        project (str): Project uid.
+        project_uuid (str): Project unique ID in the Provider.
+        project_name (str): Project name in the Provider.
+        provider (str): Provider uid.
+        provider_name (str): Provider name.
+        provider_status (str | None): Provider status.
+    """
+
+    user_group: str
+    sla: str
+    start_date: date
+    end_date: date
+    project: str
+    project_uuid: str
+    project_name: str
+    provider: str
+    provider_name: str
+    provider_status: str | None
+
+
+class Access(NamedTuple):
+    """Access granted by an authentication token.
+
+    Attributes:
+    ----------
+        identity_provider (str): Identity provider uid.
+        group_claim (str): Token claim holding the user group name.
+        user_groups (tuple of str): Uids of the user groups with the claimed name.
+        projects (tuple of ProjectAccess): Reachable projects.
+    """
+
+    identity_provider: str
+    group_claim: str
+    user_groups: tuple[str, ...]
+    projects: tuple[ProjectAccess, ...]
+
+    def active(self, day: date) -> "Access":
+        """Return the access restricted to the SLAs valid on the given day."""
+        return self._replace(
+            projects=tuple(
+                i for i in self.projects if i.start_date <= day <= i.end_date
+            )
+        )
+
+
+def fetch_access(issuer: str, group: str) -> Access | None:
+    """Read the access of a token with a single query.
+
+    Args:
+    ----
+        issuer (str): Identity provider endpoint.
+        group (str): User group name, value of the group claim.
+
+    Returns:
+    -------
+        Access | None. None when the identity provider does not exist.
+    """
+    results, _ = db.cypher_query(access_query, {"issuer": issuer, "group": group})
+    if not results:
+        return None
+    user_groups: dict[str, None] = {}
+    projects = []
+    for row in results:
+        idp, claim, user_group, sla, start, end, *project = row
+        if user_group is not None:
+            user_groups[user_group] = None
+        if sla is not None:
+            projects.append(
+                ProjectAccess(
+                    user_group,
+                    sla,
+                    _date(start),
+                    _date(end),
+                    *project,
+                )
+            )
+    return Access(idp, claim, tuple(user_groups), tuple(projects))
+
+
+class AccessResolver:
+    """TTL cache of the access descriptors, by issuer and group.
+
+    Attributes:
+    ----------
+        ttl (float): Seconds a descriptor is kept.
+        maxsize (int): Maximum number of cached descriptors. The least recently
+            used ones are dropped first.
+    """
+
+    def __init__(
+        self,
+        *,
+        ttl: float = DEFAULT_TTL,
+        maxsize: int = DEFAULT_MAXSIZE,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._items: OrderedDict[tuple[str, str], tuple[float, Access | None]] = (
+            OrderedDict()
+        )
+        self._generation = 0
+
+    def __call__(self, change: Change) -> None:
+        """Drop all the descriptors when a change may affect them."""
+        if (
+            change.entity_label in WATCHED_LABELS
+            or change.target_label in WATCHED_LABELS
+        ):
+            self.invalidate()
+
+    def resolve(
+        self,
+        issuer: str,
+        group: str,
+        *,
+        day: date | None = None,
+        all_slas: bool = False,
+    ) -> Access | None:
+        """Return the access of a token.
+
+        Args:
+        ----
+            issuer (str): Identity provider endpoint.
+            group (str): User group name, value of the group claim.
+            day (date | None): Keep only the SLAs valid on this day. By default
+                today.
+            all_slas (bool): Keep all the SLAs, whatever their validity.
+
+        Returns:
+        -------
+            Access | None. None when the identity provider does not exist.
+        """
+        key = (issuer, group)
+        now = self._clock()
+        with self._lock:
+            cached = self._items.get(key)
+            if cached is not None and cached[0] > now:
+                self._items.move_to_end(key)
+                access = cached[1]
+            else:
+                cached = None
+            generation = self._generation
+        if cached is None:
+            access = fetch_access(issuer, group)
+            with self._lock:
+                if generation == self._generation:
+                    self._items[key] = (now + self.ttl, access)
+                    self._items.move_to_end(key)
+                    while len(self._items) > self.maxsize:
+                        self._items.popitem(last=False)
+        if access is None or all_slas:
+            return access
+        return access.active(day or date.today())
+
+    def invalidate(self) -> None:
+        """Drop all the descriptors."""
+        with self._lock:
+            self._items.clear()
+            self._generation += 1
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+def _date(value: str | date) -> date:
+    """Return the date of a DateProperty read with a raw query."""
+    return value if isinstance(value, date) else date.fromisoformat(value)
+
+
+access_resolver = AccessResolver()
+_install_lock = threading.Lock()
+
+
+def install() -> AccessResolver:
+    """Register `access_resolver` as change listener, once, and return it."""
+    with _install_lock:
+        if not has_listener(access_resolver):
+            add_listener(access_resolver)
+    return access_resolver
@@ -3,15 +3,15 @@
 from neomodel import (
     RelationshipFrom,
     StringProperty,
-    StructuredNode,
     UniqueIdProperty,
-    ZeroOrMore,
 )
 
+from fedreg.auth_method.matrix import ZeroOrMoreAuthMethods
 from fedreg.auth_method.models import AuthMethod
+from fedreg.changes import TrackedNode, ZeroOrMore
 
 
-class IdentityProvider(StructuredNode):
+class IdentityProvider(TrackedNode):
     """Identity Provider.
 
     An Identity Provider is used to authenticate operations.
@@ -36,7 +36,7 @@ class IdentityProvider(StructuredNode):
     providers = RelationshipFrom(
         "fedreg.provider.models.Provider",
         "ALLOW_AUTH_THROUGH",
-        cardinality=ZeroOrMore,
+        cardinality=ZeroOrMoreAuthMethods,
         model=AuthMethod,
     )
     user_groups = RelationshipFrom(
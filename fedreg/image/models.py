@@ -1,18 +1,70 @@
 """Neomodel model of the Virtual Machine Image owned by a Provider."""
 
+import hashlib
+import json
+from collections.abc import Iterable, Mapping
+from enum import Enum
+from typing import Any
+
 from neomodel import (
     ArrayProperty,
     BooleanProperty,
     DateTimeProperty,
-    OneOrMore,
     RelationshipFrom,
     StringProperty,
-    StructuredNode,
     UniqueIdProperty,
+    db,
+)
+
+from fedreg.changes import OneOrMore, TrackedNode
+
+FINGERPRINT_FIELDS = (
+    "uuid",
+    "name",
+    "os_type",
+    "os_distro",
+    "os_version",
+    "architecture",
+    "tags",
+    "is_shared",
 )
+FINGERPRINT_BATCH_SIZE = 1000
+REUSABLE_IMAGE = """(n:SharedImage OR EXISTS {
+        MATCH (n)<-[:`AVAILABLE_VM_IMAGE`]-(o:ComputeService)
+        WHERE o = s OR EXISTS {
+            MATCH (o)<-[:`SUPPLY`]-(:Region)<-[:`DIVIDED_INTO`]-(p)
+        }
+    })"""
+
+
+def fingerprint(data: Mapping[str, Any]) -> str:
+    """Return the fingerprint of an image from its identity-relevant fields.
 
+    The uuid is part of the fingerprint: it identifies the image in the scope of its
+    provider, so only copies published by services sharing the same image catalog are
+    considered equivalent. Tags order and duplicates are ignored.
 
-class Image(StructuredNode):
+    Args:
+    ----
+        data (Mapping[str, Any]): Image attributes, as a dict or a schema dict.
+
+    Returns:
+    -------
+        str. Hex digest.
+    """
+    values = []
+    for name in FINGERPRINT_FIELDS:
+        value = data.get(name)
+        if isinstance(value, Enum):
+            value = value.value
+        if name == "tags":
+            value = sorted(set(value or []))
+        values.append(value)
+    text = json.dumps(values, separators=(",", ":"))
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+class Image(TrackedNode):
     """Virtual Machine Image owned by a Provider.
 
     A VM Image is uniquely identified in the Provider by its uuid. It has a name and a
@@ -37,6 +89,9 @@ class Image(StructuredNode):
         gpu_driver (str): Support for GPUs drivers enabled.
         created_at (datetime | None): Creation time.
         tags (list of str): list of tags associated to this Image.
+        search_tags (str): Tags joined by spaces, used by the full-text search.
+        fingerprint (str): Hash of the identity-relevant fields, used to find
+            equivalent images.
     """
 
     uid = UniqueIdProperty()
@@ -52,6 +107,8 @@ class Image(StructuredNode):
     gpu_driver = BooleanProperty(default=False)
     created_at = DateTimeProperty()
     tags = ArrayProperty(StringProperty(), default=[])
+    search_tags = StringProperty(default="")
+    fingerprint = StringProperty(index=True)
 
     services = RelationshipFrom(
         "fedreg.service.models.ComputeService",
@@ -59,6 +116,120 @@ class Image(StructuredNode):
         cardinality=OneOrMore,
     )
 
+    def pre_save(self):
+        """Update the tags text indexed by the full-text search and the fingerprint."""
+        self.search_tags = " ".join(self.tags or [])
+        self.fingerprint = fingerprint(
+            {i: getattr(self, i, None) for i in FINGERPRINT_FIELDS}
+        )
+        super().pre_save()
+
+    @classmethod
+    def find_by_fingerprints(cls, fingerprints: Iterable[str]) -> dict[str, "Image"]:
+        """Find the images with the given fingerprints with a single query.
+
+        When multiple images share a fingerprint, the one with the lowest uid is
+        returned, so repeated lookups always pick the same node.
+
+        Args:
+        ----
+            fingerprints (Iterable[str]): Fingerprints to look for.
+
+        Returns:
+        -------
+            dict[str, Image]. Images by fingerprint. Missing fingerprints are absent.
+        """
+        return {k: v for k, (v, _) in cls._find(fingerprints, None).items()}
+
+    @classmethod
+    def find_reusable(
+        cls, fingerprints: Iterable[str], service_uid: str
+    ) -> dict[str, tuple["Image", bool]]:
+        """Find the images a compute service can reuse, with a single query.
+
+        Shared images can be reused by any service. Private images are linked to the
+        projects of a single provider, so only the ones published by the service or by
+        other services of the same provider are returned.
+
+        Args:
+        ----
+            fingerprints (Iterable[str]): Fingerprints to look for.
+            service_uid (str): Uid of the compute service reusing the images.
+
+        Returns:
+        -------
+            dict[str, tuple[Image, bool]]. Images by fingerprint, with True when
+            already connected to the service. Missing fingerprints are absent.
+        """
+        return cls._find(fingerprints, service_uid)
+
+    @classmethod
+    def _find(
+        cls, fingerprints: Iterable[str], service_uid: str | None
+    ) -> dict[str, tuple["Image", bool]]:
+        """Find the images by fingerprint, reusable by the service if given."""
+        results, _ = db.cypher_query(
+            f"""
+                OPTIONAL MATCH (s:ComputeService {{uid: $service}})
+                OPTIONAL MATCH (s)<-[:`SUPPLY`]-(:Region)<-[:`DIVIDED_INTO`]-(p)
+                MATCH (n:Image)
+                WHERE n.fingerprint IN $fingerprints
+                    AND ($service IS NULL OR {REUSABLE_IMAGE})
+                RETURN n, s IS NOT NULL AND EXISTS {{
+                    MATCH (s)-[:`AVAILABLE_VM_IMAGE`]->(n)
+                }}
+                ORDER BY n.uid
+            """,
+            {"fingerprints": list(set(fingerprints)), "service": service_uid},
+            resolve_objects=True,
+        )
+        items: dict[str, tuple[Image, bool]] = {}
+        for node, connected in results:
+            items.setdefault(node.fingerprint, (node, connected))
+        return items
+
+    @classmethod
+    def refresh_fingerprints(cls, *, batch_size: int = FINGERPRINT_BATCH_SIZE) -> int:
+        """Compute the missing fingerprints.
+
+        Needed after images have been written without the neomodel hooks.
+
+        Args:
+        ----
+            batch_size (int): Number of images updated by each query.
+
+        Returns:
+        -------
+            int. Number of updated images.
+        """
+        total = 0
+        while True:
+            results, _ = db.cypher_query(
+                f"""
+                    MATCH (n:Image)
+                    WHERE n.fingerprint IS NULL
+                    RETURN n.uid, n {{{", ".join(f".{i}" for i in FINGERPRINT_FIELDS)}}}
+                    LIMIT $limit
+                """,
+                {"limit": batch_size},
+            )
+            if not results:
+                return total
+            db.cypher_query(
+                """
+                    UNWIND $rows AS row
+                    MATCH (n:Image {uid: row.uid})
+                    SET n.fingerprint = row.fingerprint
+                """,
+                {
+                    "rows": [
+                        {"uid": uid, "fingerprint": fingerprint(data)}
+                        for uid, data in results
+                    ]
+                },
+            )
+            total += len(results)
+
 
 class PrivateImage(Image):
     """Virtual Machine Image owned by a Provider.
@@ -81,6 +252,9 @@ class PrivateImage(Image):
         gpu_driver (str): Support for GPUs drivers enabled.
         created_at (datetime | None): Creation time.
         tags (list of str): list of tags associated to this Image.
+        search_tags (str): Tags joined by spaces, used by the full-text search.
+        fingerprint (str): Hash of the identity-relevant fields, used to find
+            equivalent images.
         is_shared (bool): Public or private Image.
     """
 
@@ -113,6 +287,9 @@ class SharedImage(Image):
         gpu_driver (str): Support for GPUs drivers.
         created_at (datetime | None): Creation time.
         tags (list of str): list of tags associated to this Image.
+        search_tags (str): Tags joined by spaces, used by the full-text search.
+        fingerprint (str): Hash of the identity-relevant fields, used to find
+            equivalent images.
         is_shared (bool): Public or private Image.
     """
 
@@ -12,6 +12,7 @@ from fedreg.core import (
     BaseReadPrivate,
     BaseReadPublic,
     create_query_model,
+    create_record_type,
 )
 from fedreg.image.constants import (
     DOC_ARCH,
@@ -202,3 +203,4 @@ class ImageRead(BaseNodeRead, BaseReadPrivate, ImageBase):
 
 
 ImageQuery = create_query_model("ImageQuery", ImageBase)
+ImageRecord = create_record_type("ImageRecord", ImageRead, label="Image")
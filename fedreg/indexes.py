@@ -0,0 +1,70 @@
+"""Indexes not expressible with neomodel properties.
+
+neomodel `install_all_labels` creates the uniqueness constraints and the range indexes
+defined on the models. The statements listed here create the remaining ones, the
+constraints of the change log and usage history nodes, which are not neomodel
+models, and fill the derived properties indexes are built on.
+"""
+
+from neomodel import db
+
+from fedreg.image.models import Image
+from fedreg.location.models import Location
+
+SEARCH_INDEX = "catalog_search"
+SEARCH_LABELS = ("Flavor", "Image", "Network", "Project")
+SEARCH_PROPERTIES = (
+    "name",
+    "description",
+    "uuid",
+    "search_tags",
+    "os_type",
+    "os_distro",
+    "os_version",
+    "architecture",
+    "gpu_model",
+    "gpu_vendor",
+    "local_storage",
+    "proxy_host",
+)
+INDEXES = [
+    """
+        CREATE POINT INDEX location_point IF NOT EXISTS
+        FOR (n:Location) ON (n.point)
+    """,
+    f"""
+        CREATE FULLTEXT INDEX {SEARCH_INDEX} IF NOT EXISTS
+        FOR (n:{"|".join(SEARCH_LABELS)})
+        ON EACH [{", ".join(f"n.{i}" for i in SEARCH_PROPERTIES)}]
+    """,
+    """
+        CREATE CONSTRAINT change_entry_seq IF NOT EXISTS
+        FOR (n:ChangeEntry) REQUIRE n.seq IS UNIQUE
+    """,
+    """
+        CREATE CONSTRAINT change_log_state_id IF NOT EXISTS
+        FOR (n:ChangeLogState) REQUIRE n.id IS UNIQUE
+    """,
+    """
+        CREATE CONSTRAINT usage_chunk_key IF NOT EXISTS
+        FOR (n:UsageChunk)
+        REQUIRE (n.project, n.service, n.type, n.per_user, n.day) IS UNIQUE
+    """,
+]
+SET_SEARCH_TAGS = """
+    MATCH (n)
+    WHERE n:Image OR n:Network
+    SET n.search_tags = apoc.text.join(coalesce(n.tags, []), " ")
+    """
+
+
+def install_indexes() -> None:
+    """Create the additional indexes and fill the properties they are built on.
+
+    Statements are idempotent: it is safe to call this function at every start up.
+    """
+    for query in INDEXES:
+        db.cypher_query(query)
+    Location.refresh_points()
+    Image.refresh_fingerprints()
+    db.cypher_query(SET_SEARCH_TAGS)
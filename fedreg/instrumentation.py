@@ -0,0 +1,329 @@
+"""Instrumentation of the queries sent to the DB.
+
+All the queries issued by fedreg models, schemas and neomodel relationship managers go
+through `neomodel.db.cypher_query`. When at least one sink is registered, that method
+is wrapped to measure each query and notify the sinks with a `QueryRecord`. When no
+sink is registered the original method is restored, so disabled instrumentation has
+no cost.
+
+Example:
+-------
+    collector = QueryCollector()
+    with instrument(collector):
+        ProviderReadExtended.from_orm(provider)
+    print(collector.count, collector.by_caller())
+"""
+
+import hashlib
+import json
+import logging
+import sys
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import Any, NamedTuple
+
+from neomodel import db
+
+IGNORED_MODULES = ("neomodel", "neo4j", __name__)
+
+
+class QueryRecord(NamedTuple):
+    """Measures of a single query.
+
+    Attributes:
+    ----------
+        query_hash (str): Short hash of the query text.
+        query (str): Query text.
+        params_size (int): Length of the JSON encoded parameters.
+        rows (int): Number of returned rows (0 if the query failed).
+        duration (float): Wall time in seconds.
+        caller (str): Schema or model method which issued the query.
+        error (str | None): Exception class name if the query failed.
+    """
+
+    query_hash: str
+    query: str
+    params_size: int
+    rows: int
+    duration: float
+    caller: str
+    error: str | None = None
+
+
+Sink = Callable[[QueryRecord], None]
+
+_sinks: list[Sink] = []
+_lock = threading.Lock()
+_original: Callable[..., Any] | None = None
+
+
+def query_hash(query: str) -> str:
+    """Return a short stable hash of the query text, ignoring indentation."""
+    text = " ".join(query.split())
+    return hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+
+
+def find_caller() -> str:
+    """Return the first fedreg (or user) function in the stack, outside neomodel.
+
+    If the function is a method, the name of the class of the instance (or of the
+    class for classmethods) is used, so that validators defined on base schemas
+    report the concrete schema.
+    """
+    frame = sys._getframe(2)
+    fallback = None
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if not module.startswith(IGNORED_MODULES):
+            code = frame.f_code
+            name = getattr(code, "co_qualname", code.co_name)
+            owner = frame.f_locals.get("self", frame.f_locals.get("cls"))
+            if owner is not None:
+                owner = owner if isinstance(owner, type) else type(owner)
+                name = f"{owner.__name__}.{code.co_name}"
+            if module.startswith("fedreg"):
+                return f"{module}:{name}"
+            fallback = fallback or f"{module}:{name}"
+        frame = frame.f_back
+    return fallback or "unknown"
+
+
+def _instrument(original: Callable[..., Any]) -> Callable[..., Any]:
+    """Return a wrapper of the original `cypher_query` notifying the sinks.
+
+    The original method is bound in the closure, so threads which picked up the
+    wrapper keep calling it even if instrumentation is disabled meanwhile.
+    """
+
+    def instrumented(
+        query: str, params: dict[str, Any] | None = None, *args: Any, **kwargs: Any
+    ) -> Any:
+        """Run the original `cypher_query` and notify the sinks."""
+        start = time.perf_counter()
+        error = None
+        results = None
+        try:
+            results, meta = original(query, params, *args, **kwargs)
+            return results, meta
+        except Exception as e:
+            error = type(e).__name__
+            raise
+        finally:
+            record = QueryRecord(
+                query_hash=query_hash(query),
+                query=query,
+                params_size=len(json.dumps(params or {}, default=str)),
+                rows=len(results or []),
+                duration=time.perf_counter() - start,
+                caller=find_caller(),
+                error=error,
+            )
+            for sink in list(_sinks):
+                sink(record)
+
+    return instrumented
+
+
+def add_sink(sink: Sink) -> None:
+    """Register a sink and enable instrumentation."""
+    global _original
+    with _lock:
+        _sinks.append(sink)
+        if _original is None:
+            _original = db.cypher_query
+            db.cypher_query = _instrument(_original)
+
+
+def remove_sink(sink: Sink) -> None:
+    """Unregister a sink. Disable instrumentation when no sinks are left."""
+    global _original
+    with _lock:
+        _sinks.remove(sink)
+        if not _sinks and _original is not None:
+            del db.cypher_query
+            _original = None
+
+
+def is_enabled() -> bool:
+    """Return True if at least one sink is registered."""
+    return bool(_sinks)
+
+
+@contextmanager
+def instrument(sink: Sink) -> Iterator[Sink]:
+    """Register the sink for the duration of the block."""
+    add_sink(sink)
+    try:
+        yield sink
+    finally:
+        remove_sink(sink)
+
+
+class QueryBudgetExceededError(AssertionError):
+    """A block of code issued more queries than allowed.
+
+    Attributes:
+    ----------
+        budget (int): Maximum number of allowed queries.
+        collector (QueryCollector): Queries issued by the block.
+    """
+
+    def __init__(self, budget: int, collector: "QueryCollector", name: str) -> None:
+        """Build a message with the number of queries issued by each caller."""
+        self.budget = budget
+        self.collector = collector
+        callers = "\n".join(
+            f"  {count:4d} {caller}"
+            for caller, count in sorted(
+                collector.by_caller().items(), key=lambda i: -i[1]
+            )
+        )
+        super().__init__(
+            f"{name} issued {collector.count} queries, budget is {budget}:\n{callers}"
+        )
+
+
+@contextmanager
+def query_budget(budget: int, *, name: str = "Block") -> Iterator["QueryCollector"]:
+    """Fail if the block issues more than `budget` DB round trips.
+
+    The check is performed only if the block completes without errors.
+
+    Args:
+    ----
+        budget (int): Maximum number of queries.
+        name (str): Name of the checked operation, used in the error message.
+
+    Returns:
+    -------
+        Iterator[QueryCollector]. Collector with the queries issued by the block.
+
+    Raises:
+    ------
+        QueryBudgetExceededError: When the budget is exceeded.
+    """
+    collector = QueryCollector()
+    with instrument(collector):
+        yield collector
+    if collector.count > budget:
+        raise QueryBudgetExceededError(budget, collector, name)
+
+
+class LoggingSink:
+    """Log each query.
+
+    Attributes:
+    ----------
+        logger (logging.Logger): Target logger.
+        level (int): Logging level.
+    """
+
+    def __init__(
+        self, logger: logging.Logger | None = None, level: int = logging.DEBUG
+    ) -> None:
+        """Set target logger and level."""
+        self.logger = logger or logging.getLogger(__name__)
+        self.level = level
+
+    def __call__(self, record: QueryRecord) -> None:
+        """Log the query measures."""
+        self.logger.log(
+            self.level,
+            "query=%s caller=%s rows=%d params_size=%d duration=%.6fs error=%s",
+            record.query_hash,
+            record.caller,
+            record.rows,
+            record.params_size,
+            record.duration,
+            record.error,
+        )
+
+
+class QueryCollector:
+    """Keep the records of the queries in memory.
+
+    Attributes:
+    ----------
+        records (list of QueryRecord): Collected records.
+    """
+
+    def __init__(self) -> None:
+        """Start with no records."""
+        self.records: list[QueryRecord] = []
+        self._lock = threading.Lock()
+
+    def __call__(self, record: QueryRecord) -> None:
+        """Store the record."""
+        with self._lock:
+            self.records.append(record)
+
+    @property
+    def count(self) -> int:
+        """Number of collected queries."""
+        return len(self.records)
+
+    @property
+    def duration(self) -> float:
+        """Total wall time of the collected queries."""
+        return sum(i.duration for i in self.records)
+
+    def by_caller(self) -> dict[str, int]:
+        """Number of queries issued by each caller."""
+        counts = defaultdict(int)
+        for i in self.records:
+            counts[i.caller] += 1
+        return dict(counts)
+
+    def clear(self) -> None:
+        """Drop the collected records."""
+        with self._lock:
+            self.records.clear()
+
+
+class OpenMetricsSink:
+    """Aggregate queries into counters exposed in the OpenMetrics text format.
+
+    Counters are labelled by caller. There is no dependency on a metrics client:
+    `render` returns the exposition text to serve from a metrics endpoint.
+    """
+
+    def __init__(self, prefix: str = "fedreg_db") -> None:
+        """Create empty counters."""
+        self.prefix = prefix
+        self.queries: dict[str, int] = defaultdict(int)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.rows: dict[str, int] = defaultdict(int)
+        self.seconds: dict[str, float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def __call__(self, record: QueryRecord) -> None:
+        """Update the counters of the record's caller."""
+        with self._lock:
+            self.queries[record.caller] += 1
+            self.rows[record.caller] += record.rows
+            self.seconds[record.caller] += record.duration
+            if record.error is not None:
+                self.errors[record.caller] += 1
+
+    def render(self) -> str:
+        """Return the counters in the OpenMetrics text format."""
+        lines = []
+        metrics = [
+            ("queries", "Number of queries.", self.queries),
+            ("query_errors", "Number of failed queries.", self.errors),
+            ("rows", "Number of returned rows.", self.rows),
+            ("query_seconds", "Time spent running queries.", self.seconds),
+        ]
+        with self._lock:
+            for name, help, values in metrics:
+                metric = f"{self.prefix}_{name}"
+                lines.append(f"# TYPE {metric} counter")
+                lines.append(f"# HELP {metric} {help}")
+                for caller, value in sorted(values.items()):
+                    label = caller.replace("\\", "\\\\").replace('"', '\\"')
+                    lines.append(f'{metric}_total{{caller="{label}"}} {value}')
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
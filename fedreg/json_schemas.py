@@ -0,0 +1,162 @@
+"""Registry of precomputed JSON schemas of the fedreg pydantic models.
+
+pydantic caches the result of `Model.schema()` only in the running process, so each
+worker computes again the deeply nested schemas of the extended models. The registry
+stores the schemas of all the models defined in the `schemas` and `schemas_extended`
+modules in a JSON file and fills the pydantic cache from it, so that `Model.schema()`
+and `Model.schema_json()` return without any computation.
+
+The registry is keyed by the package version and by a digest of the modules defining
+the models, so a file built by a different version, or from different sources, is
+ignored and rebuilt.
+
+Usage, at application startup:
+
+    from fedreg.json_schemas import load_registry
+
+    load_registry("/var/cache/fedreg/schemas.json")
+"""
+
+import hashlib
+import importlib
+import json
+import os
+import pkgutil
+import tempfile
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from typing import Any
+
+from pydantic import BaseModel
+from pydantic.schema import default_ref_template
+
+import fedreg
+
+SCHEMA_MODULES = ("schemas", "schemas_extended")
+
+
+def schema_modules() -> list[Any]:
+    """Import and return the modules defining the fedreg pydantic models."""
+    return [
+        importlib.import_module(i.name)
+        for i in pkgutil.walk_packages(fedreg.__path__, prefix="fedreg.")
+        if i.name.rsplit(".", 1)[-1] in SCHEMA_MODULES
+    ]
+
+
+def models() -> dict[str, type[BaseModel]]:
+    """Return the pydantic models defined in the fedreg schemas modules.
+
+    Models are looked for in the modules' namespaces, so models built with
+    `create_model`, such as the query ones, are included too. Different modules
+    define models with the same name, so models are keyed by module and name.
+    """
+    found: dict[str, type[BaseModel]] = {}
+    seen: set[type[BaseModel]] = set()
+    for module in sorted(schema_modules(), key=lambda i: i.__name__):
+        for name, obj in vars(module).items():
+            if (
+                isinstance(obj, type)
+                and issubclass(obj, BaseModel)
+                and obj.__module__ in (module.__name__, "pydantic.main")
+                and obj not in seen
+            ):
+                seen.add(obj)
+                found[f"{module.__name__}.{name}"] = obj
+    return dict(sorted(found.items()))
+
+
+def registry_key() -> str:
+    """Return the key identifying the current models.
+
+    It is made of the installed package version and the digest of the sources of the
+    modules defining the models.
+    """
+    try:
+        pkg_version = version("fedreg")
+    except PackageNotFoundError:
+        pkg_version = "unknown"
+    digest = hashlib.blake2b(digest_size=8)
+    for module in sorted(schema_modules(), key=lambda i: i.__name__):
+        digest.update(module.__name__.encode())
+        digest.update(Path(module.__file__).read_bytes())
+    return f"{pkg_version}+{digest.hexdigest()}"
+
+
+def build_registry() -> dict[str, Any]:
+    """Compute the JSON schema of each model.
+
+    Returns:
+    -------
+        dict[str, Any]. Dict with the registry `key` and the `schemas` by model.
+    """
+    return {
+        "key": registry_key(),
+        "schemas": {name: model.schema() for name, model in models().items()},
+    }
+
+
+def install_registry(registry: dict[str, Any]) -> bool:
+    """Fill the pydantic schema cache of each model with the registry schemas.
+
+    Args:
+    ----
+        registry (dict[str, Any]): Registry returned by `build_registry`.
+
+    Returns:
+    -------
+        bool. False, and nothing is installed, if the registry does not match the
+        current models.
+    """
+    if registry.get("key") != registry_key():
+        return False
+    schemas = registry["schemas"]
+    for name, model in models().items():
+        if name in schemas:
+            model.__schema_cache__[(True, default_ref_template)] = schemas[name]
+    return True
+
+
+def dump_registry(registry: dict[str, Any], path: str | Path) -> None:
+    """Atomically write the registry to the given path.
+
+    The file is written next to the target and then renamed, so workers concurrently
+    loading it never read a partial file.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(registry, f)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def load_registry(path: str | Path, *, rebuild: bool = True) -> bool:
+    """Load the registry from the given path and install it.
+
+    Args:
+    ----
+        path (str | Path): Registry file.
+        rebuild (bool): When the file is missing or does not match the current
+            models, build the registry, write it to the file and install it.
+
+    Returns:
+    -------
+        bool. True if the registry has been installed.
+    """
+    try:
+        with open(path) as f:
+            registry = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        registry = {}
+    if install_registry(registry):
+        return True
+    if not rebuild:
+        return False
+    registry = build_registry()
+    dump_registry(registry, path)
+    return install_registry(registry)
@@ -1,20 +1,33 @@
 """Neomodel model of the site geographical Location."""
 
+from typing import Any
+
 from neomodel import (
     FloatProperty,
     RelationshipFrom,
     StringProperty,
-    StructuredNode,
     UniqueIdProperty,
-    ZeroOrMore,
+    db,
 )
 
+from fedreg.changes import TrackedNode, ZeroOrMore
+
+SET_POINT = """
+    SET n.point = CASE
+        WHEN n.latitude IS NULL OR n.longitude IS NULL THEN null
+        ELSE point({latitude: n.latitude, longitude: n.longitude})
+    END
+    """
+
 
-class Location(StructuredNode):
+class Location(TrackedNode):
     """Site geographical Location.
 
     Providers or single Regions can have a Geographical location.
 
+    Coordinates are also stored in the `point` property, a WGS-84 point used by the
+    spatial index, updated each time the location is saved.
+
     Attributes:
     ----------
         uid (int): Location unique ID.
@@ -35,3 +48,84 @@ class Location(StructuredNode):
     regions = RelationshipFrom(
         "fedreg.region.models.Region", "LOCATED_AT", cardinality=ZeroOrMore
     )
+
+    near_query = """
+        MATCH (l:Location)
+        WHERE {condition}
+        MATCH (l)<-[:`LOCATED_AT`]-(r:Region)<-[:`DIVIDED_INTO`]-(p:Provider)
+        WITH r, p, point.distance(l.point, point({{latitude: $lat, longitude: $lon}}))
+            AS distance
+        RETURN r, p, distance / 1000.0
+        ORDER BY distance, r.uid
+        """
+
+    def post_save(self):
+        """Update the point used by the spatial index."""
+        self.cypher(f"MATCH (n) WHERE elementId(n)=$self {SET_POINT}")
+        super().post_save()
+
+    @classmethod
+    def refresh_points(cls) -> None:
+        """Update the point of all the locations.
+
+        Needed after locations have been written without the neomodel hooks.
+        """
+        db.cypher_query(f"MATCH (n:Location) {SET_POINT}")
+
+    @classmethod
+    def nearest_regions(
+        cls, latitude: float, longitude: float, *, limit: int = 1
+    ) -> list[tuple[Any, Any, float]]:
+        """Find the regions closest to the given coordinates.
+
+        Args:
+        ----
+            latitude (float): Latitude of the reference point.
+            longitude (float): Longitude of the reference point.
+            limit (int): Maximum number of returned regions.
+
+        Returns:
+        -------
+            list[tuple[Region, Provider, float]]. Regions, their providers and their
+            distances, in km, sorted from the closest.
+        """
+        return cls._near(latitude, longitude, radius=None, limit=limit)
+
+    @classmethod
+    def regions_within(
+        cls, latitude: float, longitude: float, radius: float
+    ) -> list[tuple[Any, Any, float]]:
+        """Find the regions within the given distance (km) from the coordinates.
+
+        Returns the same rows of `nearest_regions`. The distance filter is answered
+        by the location point index.
+        """
+        return cls._near(latitude, longitude, radius=radius * 1000, limit=None)
+
+    @classmethod
+    def _near(
+        cls,
+        latitude: float,
+        longitude: float,
+        *,
+        radius: float | None,
+        limit: int | None,
+    ) -> list[tuple[Any, Any, float]]:
+        """Run the spatial query, with an optional radius (m) and limit."""
+        if radius is None:
+            condition = "l.point IS NOT NULL"
+        else:
+            # Keep the predicate in this form so that the point index is used
+            condition = (
+                "point.distance(l.point, point({latitude: $lat, longitude: $lon}))"
+                " <= $radius"
+            )
+        query = cls.near_query.format(condition=condition)
+        if limit is not None:
+            query += "LIMIT $limit"
+        results, _ = db.cypher_query(
+            query,
+            {"lat": latitude, "lon": longitude, "radius": radius, "limit": limit},
+            resolve_objects=True,
+        )
+        return [tuple(row) for row in results]
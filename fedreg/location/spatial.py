@@ -0,0 +1,147 @@
+"""In-memory spatial index of the regions locations.
+
+Used when locations are served from a cache instead of querying the DB point index.
+Coordinates are converted to points on the unit sphere and stored in a 3-d tree: the
+euclidean (chord) distance between two points grows with their great-circle distance
+so nearest and radius searches on the tree give the same results of the haversine
+formula.
+"""
+
+import heapq
+import math
+from collections.abc import Iterable
+from typing import Any
+
+from neomodel import db
+
+EARTH_RADIUS = 6371.0088
+
+
+def to_xyz(latitude: float, longitude: float) -> tuple[float, float, float]:
+    """Convert coordinates (degrees) to a point on the unit sphere."""
+    lat = math.radians(latitude)
+    lon = math.radians(longitude)
+    return (
+        math.cos(lat) * math.cos(lon),
+        math.cos(lat) * math.sin(lon),
+        math.sin(lat),
+    )
+
+
+def chord_to_km(chord: float) -> float:
+    """Convert the chord length on the unit sphere to a great-circle distance."""
+    return 2 * EARTH_RADIUS * math.asin(min(1.0, chord / 2))
+
+
+def km_to_chord(distance: float) -> float:
+    """Convert a great-circle distance to the chord length on the unit sphere."""
+    return 2 * math.sin(min(math.pi, distance / EARTH_RADIUS) / 2)
+
+
+class SpatialIndex:
+    """Static k-d tree over the unit sphere points of a set of items.
+
+    Attributes:
+    ----------
+        items (list): Indexed items.
+    """
+
+    def __init__(self, entries: Iterable[tuple[Any, float, float]]) -> None:
+        """Build the tree from (item, latitude, longitude) tuples."""
+        entries = list(entries)
+        self.items = [i[0] for i in entries]
+        self._points = [to_xyz(i[1], i[2]) for i in entries]
+        # Flat tree: node i has children 2i+1 and 2i+2, -1 marks an empty node
+        self._tree: list[int] = []
+        self._build(list(range(len(entries))), 0, 0)
+
+    def __len__(self) -> int:
+        """Number of indexed items."""
+        return len(self.items)
+
+    def _build(self, idx: list[int], node: int, depth: int) -> None:
+        """Recursively store the median of each split in the tree."""
+        if node >= len(self._tree):
+            self._tree.extend([-1] * (node + 1 - len(self._tree)))
+        if not idx:
+            return
+        axis = depth % 3
+        idx.sort(key=lambda i: self._points[i][axis])
+        mid = len(idx) // 2
+        self._tree[node] = idx[mid]
+        self._build(idx[:mid], 2 * node + 1, depth + 1)
+        self._build(idx[mid + 1 :], 2 * node + 2, depth + 1)
+
+    def _search(
+        self,
+        target: tuple[float, float, float],
+        visit: Any,
+        bound: Any,
+    ) -> None:
+        """Visit the tree pruning the branches farther than `bound()`."""
+        stack = [(0, 0)]
+        while stack:
+            node, depth = stack.pop()
+            if node >= len(self._tree) or self._tree[node] < 0:
+                continue
+            i = self._tree[node]
+            point = self._points[i]
+            visit(i, math.dist(point, target))
+            axis = depth % 3
+            diff = target[axis] - point[axis]
+            near, far = (2 * node + 1, 2 * node + 2)
+            if diff > 0:
+                near, far = far, near
+            if abs(diff) <= bound():
+                stack.append((far, depth + 1))
+            stack.append((near, depth + 1))
+
+    def nearest(
+        self, latitude: float, longitude: float, n: int = 1
+    ) -> list[tuple[Any, float]]:
+        """Return the n items closest to the coordinates and their distance in km."""
+        heap: list[tuple[float, int]] = []
+
+        def visit(i: int, dist: float) -> None:
+            if len(heap) < n:
+                heapq.heappush(heap, (-dist, -i))
+            elif dist < -heap[0][0]:
+                heapq.heapreplace(heap, (-dist, -i))
+
+        def bound() -> float:
+            return -heap[0][0] if len(heap) == n else math.inf
+
+        if n > 0:
+            self._search(to_xyz(latitude, longitude), visit, bound)
+        found = sorted((-d, -i) for d, i in heap)
+        return [(self.items[i], chord_to_km(d)) for d, i in found]
+
+    def within(
+        self, latitude: float, longitude: float, radius: float
+    ) -> list[tuple[Any, float]]:
+        """Return the items within radius km from the coordinates, closest first."""
+        limit = km_to_chord(radius)
+        found: list[tuple[float, int]] = []
+
+        def visit(i: int, dist: float) -> None:
+            if dist <= limit:
+                found.append((dist, i))
+
+        self._search(to_xyz(latitude, longitude), visit, lambda: limit)
+        return [(self.items[i], chord_to_km(d)) for d, i in sorted(found)]
+
+    @classmethod
+    def regions(cls) -> "SpatialIndex":
+        """Build the index of the located regions.
+
+        Items are (Region, Provider) tuples, loaded with a single query.
+        """
+        results, _ = db.cypher_query(
+            """
+                MATCH (l:Location)<-[:`LOCATED_AT`]-(r:Region)<-[:`DIVIDED_INTO`]-(p)
+                WHERE l.latitude IS NOT NULL AND l.longitude IS NOT NULL
+                RETURN r, p, l.latitude, l.longitude
+            """,
+            resolve_objects=True,
+        )
+        return cls(((r, p), lat, lon) for r, p, lat, lon in results)
@@ -4,16 +4,15 @@ from neomodel import (
     ArrayProperty,
     BooleanProperty,
     IntegerProperty,
-    One,
-    OneOrMore,
     RelationshipFrom,
     StringProperty,
-    StructuredNode,
     UniqueIdProperty,
 )
 
+from fedreg.changes import One, OneOrMore, TrackedNode
 
-class Network(StructuredNode):
+
+class Network(TrackedNode):
     """Virtual Machine Network owned by a Provider.
 
     A VM Network is uniquely identified in the Provider by its uuid.
@@ -38,6 +37,7 @@ class Network(StructuredNode):
         proxy_host (str | None): Proxy IP address.
         proxy_user (str | None): Proxy username.
         tags (list of str): list of tags associated to this Network.
+        search_tags (str): Tags joined by spaces, used by the full-text search.
     """
 
     uid = UniqueIdProperty()
@@ -50,6 +50,7 @@ class Network(StructuredNode):
     proxy_host = StringProperty()
     proxy_user = StringProperty()
     tags = ArrayProperty(StringProperty(), default=[])
+    search_tags = StringProperty(default="")
 
     service = RelationshipFrom(
         "fedreg.service.models.NetworkService",
@@ -57,6 +58,11 @@ class Network(StructuredNode):
         cardinality=One,
     )
 
+    def pre_save(self):
+        """Update the tags text indexed by the full-text search."""
+        self.search_tags = " ".join(self.tags or [])
+        super().pre_save()
+
 
 class PrivateNetwork(Network):
     """Virtual Machine Network owned by a Provider.
@@ -75,6 +81,7 @@ class PrivateNetwork(Network):
         proxy_host (str | None): Proxy IP address.
         proxy_user (str | None): Proxy username.
         tags (list of str): list of tags associated to this Network.
+        search_tags (str): Tags joined by spaces, used by the full-text search.
         is_shared (bool): Public or private Network.
     """
 
@@ -104,6 +111,7 @@ class SharedNetwork(Network):
         proxy_host (str | None): Proxy IP address.
         proxy_user (str | None): Proxy username.
         tags (list of str): list of tags associated to this Network.
+        search_tags (str): Tags joined by spaces, used by the full-text search.
         is_shared (bool): Public or private Network.
     """
 
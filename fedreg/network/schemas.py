@@ -11,6 +11,7 @@ from fedreg.core import (
     BaseReadPrivate,
     BaseReadPublic,
     create_query_model,
+    create_record_type,
 )
 from fedreg.network.constants import (
     DOC_DEFAULT,
@@ -183,3 +184,4 @@ class NetworkRead(BaseNodeRead, BaseReadPrivate, NetworkBase):
 
 
 NetworkQuery = create_query_model("NetworkQuery", NetworkBase)
+NetworkRecord = create_record_type("NetworkRecord", NetworkRead, label="Network")
@@ -0,0 +1,291 @@
+"""Ranking of the regions where a user group can place a workload.
+
+`rank_regions` reads, with a single query, every compute service a user group can
+use through its SLAs and projects, together with the project quotas, the number of
+flavors fitting the request, the region bandwidth and location and the provider
+status. Only the SLAs valid on the given day, by default today, are considered.
+Candidates without a fitting flavor, without enough capacity or whose provider is
+unavailable are discarded; the others are scored with numpy operations on whole
+columns, as in `fedreg.capacity`.
+
+Each criterion is normalized in [0, 1] over the candidates (min-max, with unlimited
+values scoring 1 and missing ones 0; distance is inverted) and the score is the
+weighted average of the criteria. Every placement keeps the value, normalized score
+and weighted contribution of each criterion, to explain the ranking.
+"""
+
+import math
+from collections.abc import Iterable, Sequence
+from datetime import date
+from typing import Any, NamedTuple
+
+import numpy as np
+from neomodel import db
+
+from fedreg.capacity import effective
+from fedreg.provider.enum import ProviderStatus
+from fedreg.provider.status import AVAILABLE_STATUSES
+
+DEFAULT_TOP_K = 5
+STATUS_SCORES = {ProviderStatus.ACTIVE.value: 1.0, ProviderStatus.LIMITED.value: 0.5}
+CRITERIA = (
+    "capacity",
+    "flavors",
+    "bandwidth_in",
+    "bandwidth_out",
+    "distance",
+    "status",
+)
+
+candidates_query = """
+    MATCH (g:UserGroup {uid: $group})-[:`AGREE`]->(sla:SLA)-[:`REFER_TO`]->(p:Project)
+    WHERE sla.start_date <= $day AND sla.end_date >= $day
+    MATCH (p)<-[:`BOOK_PROJECT_FOR_SLA`]-(prov:Provider)-[:`DIVIDED_INTO`]->(r:Region)
+        -[:`SUPPLY`]->(s:ComputeService)<-[:`APPLY_TO`]-(q:ComputeQuota)
+        <-[:`USE_SERVICE_WITH`]-(p)
+    WHERE prov.status IN $statuses AND NOT coalesce(q.per_user, false)
+    WITH DISTINCT p, prov, r, s, q
+    WITH p, prov, r, s,
+        head(collect(CASE WHEN NOT coalesce(q.usage, false) THEN q END)) AS l,
+        head(collect(CASE WHEN q.usage THEN q END)) AS u
+    WITH p, prov, r, s, l, u, COUNT {
+        MATCH (s)-[:`AVAILABLE_VM_FLAVOR`]->(f:Flavor)
+        WHERE f.vcpus >= $cores AND f.ram >= $ram AND f.gpus >= $gpus
+        AND (f:SharedFlavor OR (p)-[:`CAN_USE_VM_FLAVOR`]->(f))
+    } AS flavors
+    WHERE flavors > 0
+    OPTIONAL MATCH (r)-[:`LOCATED_AT`]->(loc:Location)
+    RETURN r.uid, prov.uid, s.uid, p.uid, prov.status, flavors,
+        coalesce(r.overbooking_cpu, 1.0), coalesce(r.overbooking_ram, 1.0),
+        l.cores, l.ram, l.instances, u.cores, u.ram, u.instances,
+        r.bandwidth_in, r.bandwidth_out,
+        CASE
+            WHEN $lat IS NULL OR loc.point IS NULL THEN null
+            ELSE point.distance(loc.point, point({latitude: $lat, longitude: $lon}))
+                / 1000.0
+        END
+    ORDER BY r.uid, s.uid, p.uid
+    """
+
+
+class PlacementRequest(NamedTuple):
+    """Resources needed by a workload.
+
+    Attributes:
+    ----------
+        cores (int): Cores of each instance.
+        ram (int): RAM (MiB) of each instance.
+        gpus (int): GPUs of each instance.
+        instances (int): Number of instances.
+        latitude (float | None): Latitude of the point distances are measured from.
+        longitude (float | None): Longitude of the point distances are measured from.
+    """
+
+    cores: int = 1
+    ram: int = 0
+    gpus: int = 0
+    instances: int = 1
+    latitude: float | None = None
+    longitude: float | None = None
+
+
+class Weights(NamedTuple):
+    """Weight of each ranking criterion. A weight of 0 disables the criterion.
+
+    Attributes:
+    ----------
+        capacity (float): Copies of the request the free quota can host.
+        flavors (float): Number of flavors fitting the request.
+        bandwidth_in (float): Region inbound bandwidth.
+        bandwidth_out (float): Region outbound bandwidth.
+        distance (float): Distance from the request point (closer is better).
+        status (float): Provider status (active is better than limited).
+    """
+
+    capacity: float = 1.0
+    flavors: float = 0.5
+    bandwidth_in: float = 0.5
+    bandwidth_out: float = 0.5
+    distance: float = 1.0
+    status: float = 1.0
+
+
+class Criterion(NamedTuple):
+    """Contribution of a criterion to a placement score.
+
+    Attributes:
+    ----------
+        value (float | None): Raw value, None when missing.
+        score (float): Value normalized in [0, 1] over the candidates.
+        contribution (float): Weighted score, share of the placement score.
+    """
+
+    value: float | None
+    score: float
+    contribution: float
+
+
+class Placement(NamedTuple):
+    """Candidate placement of a workload.
+
+    Attributes:
+    ----------
+        region (str): Region uid.
+        provider (str): Provider uid.
+        service (str): Compute service uid.
+        project (str): Project uid granting access to the service.
+        score (float): Weighted average of the criteria scores, in [0, 1].
+        explanation (dict[str, Criterion]): Details of each criterion.
+    """
+
+    region: str
+    provider: str
+    service: str
+    project: str
+    score: float
+    explanation: dict[str, Criterion]
+
+
+def normalize(values: Sequence[float | None], *, invert: bool = False) -> np.ndarray:
+    """Min-max normalize the values in [0, 1].
+
+    Infinite values score 1 (0 when inverted), missing values score 0. When all the
+    finite values are equal they score 1.
+    """
+    values = np.asarray(values, dtype=float)
+    finite = values[np.isfinite(values)]
+    low, high = (finite.min(), finite.max()) if finite.size else (0.0, 0.0)
+    span = high - low
+    if span:
+        scores = (high - values if invert else values - low) / span
+    else:
+        scores = np.ones_like(values)
+    scores[np.isinf(values)] = 0.0 if invert else 1.0
+    scores[np.isnan(values)] = 0.0
+    return scores
+
+
+def rank(
+    rows: Sequence[Sequence[Any]],
+    request: PlacementRequest,
+    *,
+    weights: Weights | None = None,
+    k: int = DEFAULT_TOP_K,
+) -> list[Placement]:
+    """Score the rows returned by `candidates_query` and return the best k.
+
+    Args:
+    ----
+        rows (Sequence[Sequence[Any]]): Candidates.
+        request (PlacementRequest): Requested resources.
+        weights (Weights | None): Criteria weights. By default `Weights()`.
+        k (int): Maximum number of returned placements.
+
+    Returns:
+    -------
+        list[Placement]. Best placements first.
+    """
+    weights = weights or Weights()
+    columns = list(zip(*rows, strict=True)) or [()] * 17
+    available = np.stack(
+        [
+            effective(columns[8], columns[6], columns[11]),
+            effective(columns[9], columns[7], columns[12]),
+            effective(columns[10], 1.0, columns[13]),
+        ]
+    )
+    needed = np.array(
+        [
+            request.cores * request.instances,
+            request.ram * request.instances,
+            request.instances,
+        ],
+        dtype=float,
+    )
+    asked = needed > 0
+    fits = (available[asked] / needed[asked, None]).min(axis=0, initial=np.inf)
+    keep = np.flatnonzero(fits >= 1)
+    statuses = np.array(columns[4], dtype=object)
+    status = np.zeros(len(rows))
+    for name, value in STATUS_SCORES.items():
+        status[statuses == name] = value
+    values = {
+        "capacity": fits[keep],
+        "flavors": np.asarray(columns[5], dtype=float)[keep],
+        "bandwidth_in": np.asarray(columns[14], dtype=float)[keep],
+        "bandwidth_out": np.asarray(columns[15], dtype=float)[keep],
+        "distance": np.asarray(columns[16], dtype=float)[keep],
+        "status": status[keep],
+    }
+    scores = {
+        name: normalize(column, invert=name == "distance")
+        for name, column in values.items()
+    }
+    total = sum(getattr(weights, name) for name in CRITERIA) or 1.0
+    share = {name: getattr(weights, name) / total for name in CRITERIA}
+    totals = np.zeros(len(keep))
+    for name in CRITERIA:
+        if share[name]:
+            totals += share[name] * scores[name]
+    best = np.argsort(-totals, kind="stable")[:k]
+    return [
+        Placement(
+            *(columns[c][keep[j]] for c in range(4)),
+            float(totals[j]),
+            {
+                name: Criterion(
+                    _value(values[name][j]),
+                    float(scores[name][j]),
+                    share[name] * float(scores[name][j]),
+                )
+                for name in CRITERIA
+            },
+        )
+        for j in best
+    ]
+
+
+def _value(value: float) -> float | None:
+    """Return the raw value of a criterion, None when missing."""
+    return None if math.isnan(value) else float(value)
+
+
+def rank_regions(
+    group: str,
+    request: PlacementRequest,
+    *,
+    weights: Weights | None = None,
+    k: int = DEFAULT_TOP_K,
+    day: date | None = None,
+    statuses: Iterable[str] = AVAILABLE_STATUSES,
+) -> list[Placement]:
+    """Return the best k compute services where the user group can run the request.
+
+    Args:
+    ----
+        group (str): User group uid.
+        request (PlacementRequest): Requested resources.
+        weights (Weights | None): Criteria weights. By default `Weights()`.
+        k (int): Maximum number of returned placements.
+        day (date | None): Consider only the SLAs active on that day. By default
+            today.
+        statuses (Iterable[str]): Provider statuses allowing placements.
+
+    Returns:
+    -------
+        list[Placement]. Best placements first.
+    """
+    results, _ = db.cypher_query(
+        candidates_query,
+        {
+            "group": group,
+            "day": (day or date.today()).isoformat(),
+            "statuses": list(statuses),
+            "cores": request.cores,
+            "ram": request.ram,
+            "gpus": request.gpus,
+            "lat": request.latitude,
+            "lon": request.longitude,
+        },
+    )
+    return rank(results, request, weights=weights, k=k)
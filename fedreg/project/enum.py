@@ -0,0 +1,11 @@
+"""Project custom enumerations."""
+
+from enum import Enum
+
+
+class DefaultNetworkStatus(str, Enum):
+    """Outcome of the default network resolution of a project in a region."""
+
+    FOUND: str = "found"
+    MISSING: str = "missing"
+    AMBIGUOUS: str = "ambiguous"
@@ -1,24 +1,72 @@
 """Neomodel model of the Project owned by a Provider."""
 
+from collections.abc import Iterable
+from typing import NamedTuple
+
 from neomodel import (
-    One,
     RelationshipFrom,
     RelationshipTo,
     StringProperty,
-    StructuredNode,
     UniqueIdProperty,
-    ZeroOrMore,
-    ZeroOrOne,
+    db,
 )
 
+from fedreg.changes import One, TrackedNode, ZeroOrMore, ZeroOrOne
 from fedreg.flavor.models import SharedFlavor
 from fedreg.image.models import SharedImage
-from fedreg.network.models import SharedNetwork
+from fedreg.network.models import Network, SharedNetwork
+from fedreg.project.enum import DefaultNetworkStatus
+from fedreg.provider.status import status_filter
 from fedreg.service.enum import ServiceType
 from fedreg.sla.models import SLA
 
 
-class Project(StructuredNode):
+class DefaultNetwork(NamedTuple):
+    """Default network of a project in a region.
+
+    Attributes:
+    ----------
+        project (str): Project uid.
+        region (str): Region uid.
+        status (DefaultNetworkStatus): Resolution outcome.
+        network (Network | None): Default network, when there is exactly one.
+        candidates (list of Network): Default networks competing for the region.
+    """
+
+    project: str
+    region: str
+    status: DefaultNetworkStatus
+    network: Network | None
+    candidates: list[Network]
+
+
+default_networks_query = """
+    UNWIND $projects AS uid
+    MATCH (p:Project {uid: uid})
+    CALL {
+        WITH p
+        MATCH (p)-[:`CAN_USE_NETWORK`]->(n:PrivateNetwork)
+            <-[:`AVAILABLE_NETWORK`]-(:NetworkService)<-[:`SUPPLY`]-(r:Region)
+        RETURN r, n, true AS private
+        UNION
+        WITH p
+        MATCH (p)-[:`USE_SERVICE_WITH`]->(:NetworkQuota)
+            -[:`APPLY_TO`]->(s:NetworkService)<-[:`SUPPLY`]-(r:Region)
+        OPTIONAL MATCH (s)-[:`AVAILABLE_NETWORK`]->(n:SharedNetwork)
+        RETURN r, n, false AS private
+    }
+    WITH p, r,
+        collect(CASE WHEN private AND n.is_default THEN n END) AS private_defaults,
+        collect(CASE WHEN NOT private AND n.is_default THEN n END) AS shared_defaults
+    RETURN p.uid, r.uid, CASE
+        WHEN size(private_defaults) > 0 THEN private_defaults
+        ELSE shared_defaults
+    END
+    ORDER BY p.uid, r.uid
+    """
+
+
+class Project(TrackedNode):
     """Project owned by a Provider.
 
     A project/tenant/namespace is uniquely identified in the
@@ -78,55 +126,109 @@ class Project(StructuredNode):
         WHERE (elementId(p)=$self)
         MATCH (p)-[:`USE_SERVICE_WITH`]-(q)
         """
+    available_filter = """
+        AND ($statuses IS NULL OR EXISTS {
+            MATCH (p)<-[:`BOOK_PROJECT_FOR_SLA`]-(x:Provider)
+            WHERE x.status IN $statuses
+        })
+        """
 
-    def shared_flavors(self) -> list[SharedFlavor]:
+    def shared_flavors(self, *, available_only: bool = False) -> list[SharedFlavor]:
         """list shared flavors this project can access.
 
         Make a cypher query to retrieve all shared flavors this project can access.
+        With available_only, return nothing when the project provider is not active
+        or limited.
         """
         results, _ = self.cypher(
             f"""
                 {self.query_prefix}
                 WHERE q.type = "{ServiceType.COMPUTE.value}"
+                {self.available_filter}
                 MATCH (q)-[:`APPLY_TO`]-(s)
                 MATCH (s)-[:`AVAILABLE_VM_FLAVOR`]->(u:SharedFlavor)
                 RETURN u
-            """
+            """,
+            {"statuses": status_filter(available_only)},
         )
         return [SharedFlavor.inflate(row[0]) for row in results]
 
-    def shared_images(self) -> list[SharedImage]:
+    def shared_images(self, *, available_only: bool = False) -> list[SharedImage]:
         """list shared images this project can access.
 
         Make a cypher query to retrieve all shared images this project can access.
+        With available_only, return nothing when the project provider is not active
+        or limited.
         """
         results, _ = self.cypher(
             f"""
                 {self.query_prefix}
                 WHERE q.type = "{ServiceType.COMPUTE.value}"
+                {self.available_filter}
                 MATCH (q)-[:`APPLY_TO`]-(s)
                 MATCH (s)-[:`AVAILABLE_VM_IMAGE`]->(u:SharedImage)
                 RETURN u
-            """
+            """,
+            {"statuses": status_filter(available_only)},
         )
         return [SharedImage.inflate(row[0]) for row in results]
 
-    def shared_networks(self) -> list[SharedNetwork]:
+    def shared_networks(self, *, available_only: bool = False) -> list[SharedNetwork]:
         """list shared networks this project can access.
 
         Make a cypher query to retrieve all shared networks this project can access.
+        With available_only, return nothing when the project provider is not active
+        or limited.
         """
         results, _ = self.cypher(
             f"""
                 {self.query_prefix}
                 WHERE q.type = "{ServiceType.NETWORK.value}"
+                {self.available_filter}
                 MATCH (q)-[:`APPLY_TO`]-(s)
                 MATCH (s)-[:`AVAILABLE_NETWORK`]->(u:SharedNetwork)
                 RETURN u
-            """
+            """,
+            {"statuses": status_filter(available_only)},
         )
         return [SharedNetwork.inflate(row[0]) for row in results]
 
+    @classmethod
+    def default_networks(cls, projects: Iterable[str]) -> list[DefaultNetwork]:
+        """Resolve the default network of many projects, in each region, in one query.
+
+        A project has candidate networks in the regions where it can use private
+        networks or has quotas on a network service. Its default network in a region
+        is the private network marked as default or, when there is none, the shared
+        one. Regions with zero or multiple defaults are reported with a *missing* or
+        *ambiguous* status instead of raising.
+
+        Args:
+        ----
+            projects (Iterable[str]): Project uids.
+
+        Returns:
+        -------
+            list[DefaultNetwork]. One item for each project and region, ordered by
+            project and region uid.
+        """
+        results, _ = db.cypher_query(
+            default_networks_query,
+            {"projects": list(projects)},
+            resolve_objects=True,
+        )
+        items = []
+        for project, region, candidates in results:
+            if len(candidates) == 1:
+                status = DefaultNetworkStatus.FOUND
+            elif candidates:
+                status = DefaultNetworkStatus.AMBIGUOUS
+            else:
+                status = DefaultNetworkStatus.MISSING
+            network = candidates[0] if status == DefaultNetworkStatus.FOUND else None
+            items.append(DefaultNetwork(project, region, status, network, candidates))
+        return items
+
     def pre_delete(self):
         """Remove related quotas and SLA.
 
@@ -0,0 +1,574 @@
+"""Subtree hashes of the providers and comparison with the provider create data.
+
+The tree hashes of a provider are rolled up from the leaves:
+
+- flavors, images, networks and quotas hash their content and the uuids of the
+  provider's projects allowed to use them: projects of other providers sharing an
+  item are left out;
+- services hash their content and the hashes of their items and quotas;
+- regions hash their content, the hashes of their services and the content hash of
+  their location;
+- providers hash their content, the hashes of their regions and the content hashes of
+  their projects.
+
+Identity providers are shared by many providers and are not part of provider trees.
+
+`TreeHasher` is a change listener tracing each change back to the providers owning the
+changed nodes and recomputing their trees from the stored content hashes: a query
+reads the hashes, no other property, and one writes the changed tree hashes. Deleted
+nodes can not be traced back: `TrackedNode.delete` resolves their owners before the
+deletion, while code deleting with raw queries reports the disconnection from the
+parent node, as `upsert_catalog` does. Tree hashes are not updated by writes made
+without a registered hasher: `rehash` recomputes them, `refresh` recomputes all the
+hashes, needed after writes made without the hooks.
+
+`compare_provider` compares a `ProviderCreateExtended` with the stored hashes level by
+level: when the provider tree hash matches, it returns after a single query, otherwise
+it reads only the children of the differing nodes and skips the unchanged subtrees.
+
+Example:
+-------
+    add_listener(TreeHasher())
+    ...
+    for change in compare_provider(provider.uid, data):
+        print(change.op, "/".join(change.path))
+"""
+
+import threading
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from typing import Any, NamedTuple
+
+from neomodel import db
+from pydantic import BaseModel
+
+from fedreg.changes import CREATE, DELETE, UPDATE, Change, TrackedNode
+from fedreg.flavor.models import Flavor, PrivateFlavor, SharedFlavor
+from fedreg.hashing import (
+    CONTENT_HASH,
+    TREE_HASH,
+    content_hash,
+    owners_query,
+    tree_hash,
+)
+from fedreg.identity_provider.models import IdentityProvider
+from fedreg.image.models import Image, PrivateImage, SharedImage
+from fedreg.location.models import Location
+from fedreg.network.models import Network, PrivateNetwork, SharedNetwork
+from fedreg.project.models import Project
+from fedreg.provider.models import Provider
+from fedreg.provider.schemas_extended import (
+    ProviderCreateExtended,
+    RegionCreateExtended,
+)
+from fedreg.quota.models import (
+    BlockStorageQuota,
+    ComputeQuota,
+    NetworkQuota,
+    ObjectStoreQuota,
+    Quota,
+)
+from fedreg.region.models import Region
+from fedreg.service.models import (
+    BlockStorageService,
+    ComputeService,
+    IdentityService,
+    NetworkService,
+    ObjectStoreService,
+    Service,
+)
+from fedreg.sla.models import SLA
+from fedreg.user_group.models import UserGroup
+
+REFRESH_BATCH_SIZE = 1000
+TREE_MODELS = (
+    Provider,
+    Project,
+    Region,
+    Location,
+    Service,
+    Flavor,
+    Image,
+    Network,
+    Quota,
+)
+ROOT_MODELS = (*TREE_MODELS, IdentityProvider, UserGroup, SLA)
+SERVICES = {
+    "block_storage_services": (BlockStorageService, BlockStorageQuota),
+    "compute_services": (ComputeService, ComputeQuota),
+    "identity_services": (IdentityService, None),
+    "network_services": (NetworkService, NetworkQuota),
+    "object_store_services": (ObjectStoreService, ObjectStoreQuota),
+}
+ITEMS = {
+    "AVAILABLE_VM_FLAVOR": ("flavors", PrivateFlavor, SharedFlavor),
+    "AVAILABLE_VM_IMAGE": ("images", PrivateImage, SharedImage),
+    "AVAILABLE_NETWORK": ("networks", PrivateNetwork, SharedNetwork),
+}
+ITEM_TYPES = "|".join(f"`{i}`" for i in ITEMS)
+LINK_TYPES = (
+    "`CAN_USE_VM_FLAVOR`|`CAN_USE_VM_IMAGE`|`CAN_USE_NETWORK`|`USE_SERVICE_WITH`"
+)
+
+tree_query = f"""
+    MATCH (p:Provider)
+    WHERE $uids IS NULL OR p.uid IN $uids
+    RETURN elementId(p), p.{CONTENT_HASH}, p.{TREE_HASH},
+        COLLECT {{
+            MATCH (p)-[:`BOOK_PROJECT_FOR_SLA`]->(x:Project)
+            RETURN x.{CONTENT_HASH}
+        }},
+        COLLECT {{
+            MATCH (p)-[:`DIVIDED_INTO`]->(r:Region)
+            RETURN [elementId(r), r.{CONTENT_HASH}, r.{TREE_HASH}, COLLECT {{
+                MATCH (r)-[:`LOCATED_AT`]->(l:Location)
+                RETURN l.{CONTENT_HASH}
+            }}, COLLECT {{
+                MATCH (r)-[:`SUPPLY`]->(s:Service)
+                RETURN [elementId(s), s.{CONTENT_HASH}, s.{TREE_HASH}, COLLECT {{
+                    MATCH (s)-[:{ITEM_TYPES}|`APPLY_TO`]-(i)
+                    RETURN [elementId(i), i.{CONTENT_HASH}, i.{TREE_HASH}, COLLECT {{
+                        MATCH (i)<-[:{LINK_TYPES}]-(x:Project)
+                            <-[:`BOOK_PROJECT_FOR_SLA`]-(p)
+                        RETURN x.uuid
+                    }}]
+                }}]
+            }}]
+        }}
+    """
+provider_hashes_query = f"""
+    MATCH (p:Provider {{uid: $uid}})
+    RETURN p.{CONTENT_HASH}, p.{TREE_HASH},
+        COLLECT {{
+            MATCH (p)-[:`BOOK_PROJECT_FOR_SLA`]->(x:Project)
+            RETURN [x.uuid, x.{CONTENT_HASH}]
+        }},
+        COLLECT {{
+            MATCH (p)-[:`DIVIDED_INTO`]->(r:Region)
+            RETURN [r.name, r.uid, r.{CONTENT_HASH}, r.{TREE_HASH}]
+        }}
+    """
+region_hashes_query = f"""
+    MATCH (r:Region)
+    WHERE r.uid IN $uids
+    RETURN r.uid,
+        COLLECT {{
+            MATCH (r)-[:`LOCATED_AT`]->(l:Location)
+            RETURN [l.site, l.{CONTENT_HASH}]
+        }},
+        COLLECT {{
+            MATCH (r)-[:`SUPPLY`]->(s:Service)
+            RETURN [s.type, s.endpoint, s.uid, s.{CONTENT_HASH}, s.{TREE_HASH}]
+        }}
+    """
+service_hashes_query = f"""
+    MATCH (s:Service)
+    WHERE s.uid IN $uids
+    RETURN s.uid,
+        COLLECT {{
+            MATCH (s)-[r:{ITEM_TYPES}]->(i)
+            RETURN [type(r), i.uuid, i.{CONTENT_HASH}, i.{TREE_HASH}]
+        }},
+        COLLECT {{
+            MATCH (s)<-[:`APPLY_TO`]-(q:Quota)
+            RETURN [
+                COLLECT {{
+                    MATCH (q)<-[:`USE_SERVICE_WITH`]-(x:Project)
+                    RETURN x.uuid
+                }},
+                q.per_user,
+                q.usage,
+                q.{CONTENT_HASH},
+                q.{TREE_HASH}
+            ]
+        }}
+    """
+
+
+def _set_query(name: str) -> str:
+    """Return the query setting a property of nodes identified by element id."""
+    return f"""
+        UNWIND $rows AS row
+        MATCH (n)
+        WHERE elementId(n) = row[0]
+        SET n.{name} = row[1]
+        """
+
+
+def _labels(models: Iterable[type[TrackedNode]]) -> frozenset[str]:
+    """Return the labels of the models and of their subclasses."""
+    labels = set()
+    stack = list(models)
+    while stack:
+        cls = stack.pop()
+        labels.add(cls.__label__)
+        stack.extend(cls.__subclasses__())
+    return frozenset(labels)
+
+
+TREE_LABELS = _labels(TREE_MODELS)
+
+
+class SubtreeChange(NamedTuple):
+    """Difference between the provider create data and the stored provider.
+
+    Attributes:
+    ----------
+        op (str): create when the subtree is missing from the DB, delete when it is
+            missing from the data, update when the content of the node, or the
+            projects allowed to use an item or a quota, differ.
+        path (tuple of str): Pairs of `ProviderCreateExtended` attribute and key
+            leading to the subtree root, empty for the provider itself. Projects,
+            items are keyed by uuid, regions by name, locations by site, services by
+            endpoint and quotas by project uuid, per_user and usage, joined by `/`.
+    """
+
+    op: str
+    path: tuple[str, ...]
+
+
+class _Node(NamedTuple):
+    """Hashes of a node of the provider create data.
+
+    children is None for leaves, whose tree hash does not depend on other nodes.
+    """
+
+    content: str
+    tree: str
+    children: dict[tuple[str, str], "_Node"] | None
+
+
+def rehash(uids: Iterable[str] | None = None) -> int:
+    """Recompute the tree hashes of the providers from the stored content hashes.
+
+    Args:
+    ----
+        uids (Iterable[str] | None): Uids of the providers. By default all of them.
+
+    Returns:
+    -------
+        int. Number of updated tree hashes.
+    """
+    results, _ = db.cypher_query(
+        tree_query, {"uids": None if uids is None else list(uids)}
+    )
+    updates: dict[str, str] = {}
+    for row in results:
+        _roll(row, updates)
+    if updates:
+        db.cypher_query(
+            _set_query(TREE_HASH), {"rows": [list(i) for i in updates.items()]}
+        )
+    return len(updates)
+
+
+def refresh(*, batch_size: int = REFRESH_BATCH_SIZE) -> int:
+    """Recompute the content hashes of all the nodes, then all the tree hashes.
+
+    Needed after nodes have been written without the neomodel hooks. Nodes are read
+    in batches ordered by uid and only the changed hashes are written.
+
+    Args:
+    ----
+        batch_size (int): Number of nodes read by each query.
+
+    Returns:
+    -------
+        int. Number of updated content hashes.
+    """
+    total = 0
+    for model in ROOT_MODELS:
+        query = f"""
+            MATCH (n:{model.__label__})
+            WHERE $last IS NULL OR n.uid > $last
+            RETURN n
+            ORDER BY n.uid
+            LIMIT $limit
+        """
+        last = None
+        while True:
+            results, _ = db.cypher_query(
+                query, {"last": last, "limit": batch_size}, resolve_objects=True
+            )
+            rows = []
+            for (node,) in results:
+                value = content_hash(node.deflate(node.__properties__, node))
+                if value != node.content_hash:
+                    rows.append([node.element_id, value])
+            if rows:
+                db.cypher_query(_set_query(CONTENT_HASH), {"rows": rows})
+            total += len(rows)
+            if len(results) < batch_size:
+                break
+            last = results[-1][0].uid
+    rehash()
+    return total
+
+
+class TreeHasher:
+    """Change listener keeping the tree hashes of the providers up to date.
+
+    Trees are recomputed after each change. Inside `batch` blocks changes are
+    accumulated and the trees recomputed once, at the end of the outermost block.
+    Deletions are traced back through the owners resolved by `TrackedNode.delete`.
+    """
+
+    needs_owners = True
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._depth = 0
+        self._uids: set[str] = set()
+
+    def __call__(self, change: Change) -> None:
+        """Record the changed nodes of provider trees and flush if not in a batch."""
+        with self._lock:
+            if change.op == DELETE:
+                self._uids.update(change.owners)
+            else:
+                for label, uid in (
+                    (change.entity_label, change.entity_uid),
+                    (change.target_label, change.target_uid),
+                ):
+                    if label in TREE_LABELS and uid is not None:
+                        self._uids.add(uid)
+            deferred = self._depth > 0
+        if not deferred:
+            self.flush()
+
+    @contextmanager
+    def batch(self) -> Iterator["TreeHasher"]:
+        """Recompute the trees once, at the end of the block."""
+        with self._lock:
+            self._depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._depth -= 1
+                done = self._depth == 0
+            if done:
+                self.flush()
+
+    def flush(self) -> int:
+        """Recompute the trees of the providers owning the recorded nodes.
+
+        Returns:
+        -------
+            int. Number of updated tree hashes.
+        """
+        with self._lock:
+            uids, self._uids = self._uids, set()
+        if not uids:
+            return 0
+        results, _ = db.cypher_query(owners_query, {"uids": list(uids)})
+        return rehash(results[0][0]) if results[0][0] else 0
+
+
+def compare_provider(uid: str, data: ProviderCreateExtended) -> list[SubtreeChange]:
+    """Compare the provider create data with the stored hashes of a provider.
+
+    Hashes of the data are computed in memory. Stored hashes are read one level at a
+    time, only for the children of the nodes whose tree hash differs: at most one
+    query for the provider, one for its regions and one for its services. Identity
+    providers are not compared. The result is reliable only if the stored tree hashes
+    are up to date: keep a `TreeHasher` registered, or run `rehash` first.
+
+    Args:
+    ----
+        uid (str): Uid of the stored provider.
+        data (ProviderCreateExtended): Provider data, as read from the provider.
+
+    Returns:
+    -------
+        list[SubtreeChange]. Created, deleted and updated subtrees. Empty when the
+        stored provider matches the data.
+
+    Raises:
+    ------
+        LookupError: The provider does not exist.
+    """
+    expected = _provider_node(data)
+    results, _ = db.cypher_query(provider_hashes_query, {"uid": uid})
+    if not results:
+        raise LookupError(f"Provider {uid} not found")
+    content, tree, projects, regions = results[0]
+    changes: list[SubtreeChange] = []
+    if not _compare_node((), expected, content, tree, changes):
+        return changes
+    stored = {("projects", key): (None, value, value) for key, value in projects}
+    stored.update({("regions", i[0]): tuple(i[1:]) for i in regions})
+    pending = _compare_children((), expected.children, stored, changes)
+    pending = _descend(region_hashes_query, pending, _region_children, changes)
+    _descend(service_hashes_query, pending, _service_children, changes)
+    return changes
+
+
+def _roll(row: list[Any], updates: dict[str, str]) -> None:
+    """Compute the tree hashes of a row of tree_query, collecting the changed ones."""
+    element_id, content, stored, projects, regions = row
+    hashes = list(projects)
+    for r_id, r_content, r_stored, locations, services in regions:
+        children = list(locations)
+        for s_id, s_content, s_stored, items in services:
+            leaves = [_update(updates, *i) for i in items]
+            children.append(_update(updates, s_id, s_content, s_stored, leaves))
+        hashes.append(_update(updates, r_id, r_content, r_stored, children))
+    _update(updates, element_id, content, stored, hashes)
+
+
+def _update(
+    updates: dict[str, str],
+    element_id: str,
+    content: str | None,
+    stored: str | None,
+    children: list[str],
+) -> str:
+    """Return the tree hash of a node, recording it when it differs from the stored."""
+    value = tree_hash(content, children)
+    if value != stored:
+        updates[element_id] = value
+    return value
+
+
+def _node(
+    model: type[TrackedNode],
+    data: BaseModel,
+    children: dict[tuple[str, str], _Node] | None = None,
+    *,
+    links: Iterable[str] | None = None,
+) -> _Node:
+    """Return the hashes of the data of a node.
+
+    Nodes with children hash them, leaves the given project uuids. Nodes with neither
+    are rolled up with their content hash, like projects and locations.
+    """
+    names = model.defined_properties(aliases=False, rels=False)
+    content = content_hash(model.deflate({i: getattr(data, i, None) for i in names}))
+    if children is not None:
+        return _Node(
+            content, tree_hash(content, [i.tree for i in children.values()]), children
+        )
+    if links is not None:
+        return _Node(content, tree_hash(content, links), None)
+    return _Node(content, content, None)
+
+
+def _provider_node(data: ProviderCreateExtended) -> _Node:
+    """Return the hashes of the provider create data."""
+    children = {("projects", i.uuid): _node(Project, i) for i in data.projects}
+    children.update({("regions", i.name): _region_node(i) for i in data.regions})
+    return _node(Provider, data, children)
+
+
+def _region_node(data: RegionCreateExtended) -> _Node:
+    """Return the hashes of a region, its location and its services."""
+    children = {}
+    if data.location is not None:
+        children[("location", data.location.site)] = _node(Location, data.location)
+    for name, (model, quota_model) in SERVICES.items():
+        for service in getattr(data, name):
+            items = {}
+            for key, private, shared in ITEMS.values():
+                for item in getattr(service, key, []):
+                    items[(key, item.uuid)] = _node(
+                        shared if item.is_shared else private,
+                        item,
+                        links=getattr(item, "projects", []),
+                    )
+            for quota in getattr(service, "quotas", []):
+                key = _quota_key(quota.project, quota.per_user, quota.usage)
+                items[("quotas", key)] = _node(
+                    quota_model, quota, links=[quota.project]
+                )
+            children[(name, str(service.endpoint))] = _node(model, service, items)
+    return _node(Region, data, children)
+
+
+def _quota_key(project: str | None, per_user: bool, usage: bool) -> str:
+    """Return the key identifying a quota in its service."""
+    return f"{project}/{str(bool(per_user)).lower()}/{str(bool(usage)).lower()}"
+
+
+def _region_children(
+    locations: list[list[Any]], services: list[list[Any]]
+) -> dict[tuple[str, str], tuple[Any, ...]]:
+    """Return the stored hashes of the children of a region, by key."""
+    items: dict[tuple[str, str], tuple[Any, ...]] = {
+        ("location", site): (None, value, value) for site, value in locations
+    }
+    for type_, endpoint, *hashes in services:
+        items[(f"{type_.replace('-', '_')}_services", endpoint)] = tuple(hashes)
+    return items
+
+
+def _service_children(
+    items: list[list[Any]], quotas: list[list[Any]]
+) -> dict[tuple[str, str], tuple[Any, ...]]:
+    """Return the stored hashes of the items and quotas of a service, by key."""
+    children: dict[tuple[str, str], tuple[Any, ...]] = {
+        (ITEMS[rel][0], uuid): (None, content, tree)
+        for rel, uuid, content, tree in items
+    }
+    for projects, per_user, usage, content, tree in quotas:
+        key = _quota_key(projects[0] if projects else None, per_user, usage)
+        children[("quotas", key)] = (None, content, tree)
+    return children
+
+
+def _compare_node(
+    path: tuple[str, ...],
+    node: _Node,
+    content: str | None,
+    tree: str | None,
+    changes: list[SubtreeChange],
+) -> bool:
+    """Record the node when updated and return True when its children differ."""
+    if tree == node.tree:
+        return False
+    if node.children is None or content != node.content:
+        changes.append(SubtreeChange(UPDATE, path))
+    if node.children is None:
+        return False
+    return tree != tree_hash(content, [i.tree for i in node.children.values()])
+
+
+def _compare_children(
+    path: tuple[str, ...],
+    expected: dict[tuple[str, str], _Node],
+    stored: dict[tuple[str, str], tuple[Any, ...]],
+    changes: list[SubtreeChange],
+) -> list[tuple[tuple[str, ...], str, _Node]]:
+    """Record created, deleted and updated children.
+
+    Return path, uid and hashes of the children whose own children differ.
+    """
+    pending = []
+    stored = dict(stored)
+    for key, node in expected.items():
+        if key not in stored:
+            changes.append(SubtreeChange(CREATE, (*path, *key)))
+            continue
+        uid, content, tree = stored.pop(key)
+        if _compare_node((*path, *key), node, content, tree, changes):
+            pending.append(((*path, *key), uid, node))
+    changes.extend(SubtreeChange(DELETE, (*path, *key)) for key in stored)
+    return pending
+
+
+def _descend(
+    query: str,
+    pending: list[tuple[tuple[str, ...], str, _Node]],
+    children: Callable[..., dict[tuple[str, str], tuple[Any, ...]]],
+    changes: list[SubtreeChange],
+) -> list[tuple[tuple[str, ...], str, _Node]]:
+    """Read the stored hashes of the children of the pending nodes and compare them."""
+    if not pending:
+        return []
+    results, _ = db.cypher_query(query, {"uids": [uid for _, uid, _ in pending]})
+    stored = {row[0]: children(*row[1:]) for row in results}
+    return [
+        item
+        for path, uid, node in pending
+        for item in _compare_children(path, node.children, stored.get(uid, {}), changes)
+    ]
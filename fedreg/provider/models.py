@@ -1,22 +1,48 @@
 """Neomodel model of the Resource Provider (openstack, kubernetesapp..)."""
 
+from typing import Any
+
 from neomodel import (
     ArrayProperty,
     BooleanProperty,
     RelationshipTo,
     StringProperty,
-    StructuredNode,
     UniqueIdProperty,
-    ZeroOrMore,
+    db,
 )
 
+from fedreg.auth_method.matrix import ZeroOrMoreAuthMethods
 from fedreg.auth_method.models import AuthMethod
+from fedreg.changes import TrackedNode, ZeroOrMore
+from fedreg.flavor.models import Flavor
 from fedreg.image.models import Image
+from fedreg.network.models import Network
 from fedreg.provider.enum import ProviderStatus
-from fedreg.service.enum import ServiceType
+from fedreg.provider.status import provider_statuses, status_filter
+from fedreg.quota.enum import QuotaType
+from fedreg.quota.models import (
+    BlockStorageQuota,
+    ComputeQuota,
+    NetworkQuota,
+    ObjectStoreQuota,
+    Quota,
+)
+
+QUOTA_MODELS = {
+    QuotaType.BLOCK_STORAGE.value: BlockStorageQuota,
+    QuotaType.COMPUTE.value: ComputeQuota,
+    QuotaType.NETWORK.value: NetworkQuota,
+    QuotaType.OBJECT_STORE.value: ObjectStoreQuota,
+}
+CATALOG_PATTERNS = {
+    "flavors": "(s:ComputeService)-[:`AVAILABLE_VM_FLAVOR`]->(u:Flavor)",
+    "images": "(s:ComputeService)-[:`AVAILABLE_VM_IMAGE`]->(u:Image)",
+    "networks": "(s:NetworkService)-[:`AVAILABLE_NETWORK`]->(u:Network)",
+    "quotas": "(s)<-[:`APPLY_TO`]-(u:Quota)",
+}
 
 
-class Provider(StructuredNode):
+class Provider(TrackedNode):
     """Provider (openstack, kubernetesapp..).
 
     A Provider has a name which could not be unique, providers with
@@ -59,27 +85,268 @@ class Provider(StructuredNode):
     identity_providers = RelationshipTo(
         "fedreg.identity_provider.models.IdentityProvider",
         "ALLOW_AUTH_THROUGH",
-        cardinality=ZeroOrMore,
+        cardinality=ZeroOrMoreAuthMethods,
         model=AuthMethod,
     )
 
-    def images(self) -> list[Image]:
+    catalog_prefix = """
+        MATCH (p:Provider)
+        WHERE (elementId(p)=$self)
+        AND ($statuses IS NULL OR p.status IN $statuses)
+        MATCH (p)-[:`DIVIDED_INTO`]->(r:Region)-[:`SUPPLY`]->(s:Service)
+        WHERE ($region_uid IS NULL OR r.uid = $region_uid)
+        AND ($service_uid IS NULL OR s.uid = $service_uid)
+        """
+
+    def images(
+        self,
+        *,
+        region_uid: str | None = None,
+        service_uid: str | None = None,
+        after: str | None = None,
+        limit: int | None = None,
+        available_only: bool = False,
+    ) -> list[Image]:
         """List provider's available images.
 
-        Make a cypher query to retrieve all provider's images.
+        Make a cypher query to retrieve the provider's images ordered by uid. Images
+        shared between multiple services are returned once.
+
+        Args:
+        ----
+            region_uid (str | None): Return only images supplied in this region.
+            service_uid (str | None): Return only images supplied by this service.
+            after (str | None): Keyset cursor. Return only images with a greater uid.
+            limit (int | None): Maximum number of returned images.
+            available_only (bool): Return nothing if the provider status is not
+                active or limited.
+
+        Returns:
+        -------
+            list[Image].
+        """
+        results = self._catalog(
+            "images",
+            region_uid=region_uid,
+            service_uid=service_uid,
+            after=after,
+            limit=limit,
+            available_only=available_only,
+        )
+        return [Image.inflate(row[0]) for row in results]
+
+    def flavors(
+        self,
+        *,
+        region_uid: str | None = None,
+        service_uid: str | None = None,
+        after: str | None = None,
+        limit: int | None = None,
+        available_only: bool = False,
+    ) -> list[Flavor]:
+        """List provider's available flavors.
+
+        Make a cypher query to retrieve the provider's flavors ordered by uid.
+        Arguments have the same meaning as in `images`.
+        """
+        results = self._catalog(
+            "flavors",
+            region_uid=region_uid,
+            service_uid=service_uid,
+            after=after,
+            limit=limit,
+            available_only=available_only,
+        )
+        return [Flavor.inflate(row[0]) for row in results]
+
+    def networks(
+        self,
+        *,
+        region_uid: str | None = None,
+        service_uid: str | None = None,
+        after: str | None = None,
+        limit: int | None = None,
+        available_only: bool = False,
+    ) -> list[Network]:
+        """List provider's available networks.
+
+        Make a cypher query to retrieve the provider's networks ordered by uid.
+        Arguments have the same meaning as in `images`.
         """
+        results = self._catalog(
+            "networks",
+            region_uid=region_uid,
+            service_uid=service_uid,
+            after=after,
+            limit=limit,
+            available_only=available_only,
+        )
+        return [Network.inflate(row[0]) for row in results]
+
+    def quotas(
+        self,
+        *,
+        region_uid: str | None = None,
+        service_uid: str | None = None,
+        after: str | None = None,
+        limit: int | None = None,
+        available_only: bool = False,
+    ) -> list[Quota]:
+        """List quotas applied to the provider's services.
+
+        Make a cypher query to retrieve the provider's quotas ordered by uid. Each
+        quota is inflated to the model matching its type.
+        Arguments have the same meaning as in `images`.
+        """
+        results = self._catalog(
+            "quotas",
+            region_uid=region_uid,
+            service_uid=service_uid,
+            after=after,
+            limit=limit,
+            available_only=available_only,
+        )
+        return [
+            QUOTA_MODELS.get(row[0].get("type"), Quota).inflate(row[0])
+            for row in results
+        ]
+
+    def count_images(
+        self,
+        *,
+        region_uid: str | None = None,
+        service_uid: str | None = None,
+        available_only: bool = False,
+    ) -> int:
+        """Count provider's distinct images."""
+        return self._catalog_count(
+            "images",
+            region_uid=region_uid,
+            service_uid=service_uid,
+            available_only=available_only,
+        )
+
+    def count_flavors(
+        self,
+        *,
+        region_uid: str | None = None,
+        service_uid: str | None = None,
+        available_only: bool = False,
+    ) -> int:
+        """Count provider's distinct flavors."""
+        return self._catalog_count(
+            "flavors",
+            region_uid=region_uid,
+            service_uid=service_uid,
+            available_only=available_only,
+        )
+
+    def count_networks(
+        self,
+        *,
+        region_uid: str | None = None,
+        service_uid: str | None = None,
+        available_only: bool = False,
+    ) -> int:
+        """Count provider's distinct networks."""
+        return self._catalog_count(
+            "networks",
+            region_uid=region_uid,
+            service_uid=service_uid,
+            available_only=available_only,
+        )
+
+    def count_quotas(
+        self,
+        *,
+        region_uid: str | None = None,
+        service_uid: str | None = None,
+        available_only: bool = False,
+    ) -> int:
+        """Count quotas applied to the provider's services."""
+        return self._catalog_count(
+            "quotas",
+            region_uid=region_uid,
+            service_uid=service_uid,
+            available_only=available_only,
+        )
+
+    def _catalog(
+        self,
+        item: str,
+        *,
+        region_uid: str | None,
+        service_uid: str | None,
+        after: str | None,
+        limit: int | None,
+        available_only: bool,
+    ) -> list[list[Any]]:
+        """Retrieve a page of distinct catalog items ordered by uid.
+
+        The query text depends only on the item type and on the presence of a limit,
+        all the values are passed as parameters, including the statuses of the
+        providers whose items are returned.
+        """
+        query = f"""
+            {self.catalog_prefix}
+            MATCH {CATALOG_PATTERNS[item]}
+            WHERE ($after IS NULL OR u.uid > $after)
+            WITH DISTINCT u
+            ORDER BY u.uid
+            """
+        if limit is not None:
+            query += "LIMIT $limit\n"
+        query += "RETURN u"
+        results, _ = self.cypher(
+            query,
+            {
+                "region_uid": region_uid,
+                "service_uid": service_uid,
+                "after": after,
+                "limit": limit,
+                "statuses": status_filter(available_only),
+            },
+        )
+        return results
+
+    def _catalog_count(
+        self,
+        item: str,
+        *,
+        region_uid: str | None,
+        service_uid: str | None,
+        available_only: bool,
+    ) -> int:
+        """Count the distinct catalog items of the given type."""
         results, _ = self.cypher(
             f"""
-                MATCH (p:Provider)
-                WHERE (elementId(p)=$self)
-                MATCH (p)-[:`DIVIDED_INTO`]-(r)
-                MATCH (r)-[:`SUPPLY`]-(s)
-                WHERE s.type = "{ServiceType.COMPUTE.value}"
-                MATCH (s)-[:`AVAILABLE_VM_IMAGE`]->(i:Image)
-                RETURN DISTINCT i
-            """
+                {self.catalog_prefix}
+                MATCH {CATALOG_PATTERNS[item]}
+                RETURN count(DISTINCT u)
+            """,
+            {
+                "region_uid": region_uid,
+                "service_uid": service_uid,
+                "statuses": status_filter(available_only),
+            },
         )
-        return [Image.inflate(row[0]) for row in results]
+        return results[0][0]
+
+    def post_save(self):
+        """Update the cached status of the provider.
+
+        Within a transaction, which may be rolled back, the cached status is dropped.
+        """
+        if db._active_transaction is None:
+            provider_statuses.update(self.uid, self.status)
+        else:
+            provider_statuses.discard(self.uid)
+        super().post_save()
+
+    def post_delete(self):
+        """Remove the provider from the status cache."""
+        provider_statuses.discard(self.uid)
+        super().post_delete()
 
     def pre_delete(self):
         """Delete related identity providers, projects and regions.
@@ -0,0 +1,149 @@
+"""In-process cache of the providers status.
+
+Browse queries hide the resources of unavailable providers checking `p.status` in
+Cypher, so their results never depend on this cache. The cache is only a hint, for
+callers that need a status without a query. It is loaded with a single query and
+reloaded after `max_age` seconds, to pick up changes made by other processes or
+without hooks. A lookup of an unknown uid reads only that provider, and the result is
+cached even when the provider does not exist. The `Provider` save hook records the
+new status when the save is committed at once; within a transaction, which may be
+rolled back, it drops the entry instead. The delete hook drops the entry.
+
+Extended read schemas built within `available_only` leave unavailable providers out of
+their lists of providers, reading the status of the already loaded nodes.
+"""
+
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from neomodel import db
+
+from fedreg.provider.enum import ProviderStatus
+
+AVAILABLE_STATUSES = frozenset(
+    {ProviderStatus.ACTIVE.value, ProviderStatus.LIMITED.value}
+)
+DEFAULT_MAX_AGE = 60.0
+
+_available_only: ContextVar[bool] = ContextVar("available_only", default=False)
+
+
+class ProviderStatusCache:
+    """Status of all the providers, by uid.
+
+    Attributes:
+    ----------
+        max_age (float): Seconds after which the statuses are reloaded from the DB.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_age: float = DEFAULT_MAX_AGE,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_age = max_age
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._statuses: dict[str, str | None] | None = None
+        self._loaded_at = 0.0
+        self._available: dict[frozenset[str], frozenset[str]] = {}
+
+    def status(self, uid: str) -> str | None:
+        """Return the status of the provider, None if it does not exist.
+
+        An unknown uid is read from the DB and cached, even when missing.
+        """
+        statuses = self._get()
+        with self._lock:
+            if uid in statuses:
+                return statuses[uid]
+        results, _ = db.cypher_query(
+            "MATCH (p:Provider {uid: $uid}) RETURN p.status", {"uid": uid}
+        )
+        status = results[0][0] if results else None
+        with self._lock:
+            if self._statuses is statuses:
+                statuses[uid] = status
+                self._available.clear()
+        return status
+
+    def is_available(
+        self, uid: str, statuses: Iterable[str] = AVAILABLE_STATUSES
+    ) -> bool:
+        """Return True if the provider exists and has one of the given statuses."""
+        return self.status(uid) in frozenset(statuses)
+
+    def available(self, statuses: Iterable[str] = AVAILABLE_STATUSES) -> frozenset[str]:
+        """Return the uids of the providers with one of the given statuses."""
+        key = frozenset(statuses)
+        current = self._get()
+        with self._lock:
+            if key not in self._available:
+                self._available[key] = frozenset(
+                    uid for uid, status in current.items() if status in key
+                )
+            return self._available[key]
+
+    def update(self, uid: str, status: str) -> None:
+        """Record the new status of a provider. Nothing to do if not loaded yet."""
+        with self._lock:
+            if self._statuses is not None and self._statuses.get(uid) != status:
+                self._statuses[uid] = status
+                self._available.clear()
+
+    def discard(self, uid: str) -> None:
+        """Forget a provider: the next lookup reads it from the DB."""
+        with self._lock:
+            if self._statuses is not None and uid in self._statuses:
+                del self._statuses[uid]
+                self._available.clear()
+
+    def invalidate(self) -> None:
+        """Drop all the statuses: the next access reloads them."""
+        with self._lock:
+            self._statuses = None
+            self._available.clear()
+
+    def _get(self) -> dict[str, str | None]:
+        """Return the statuses, loading them when missing or expired."""
+        with self._lock:
+            expired = self._clock() - self._loaded_at > self.max_age
+            if self._statuses is not None and not expired:
+                return self._statuses
+        results, _ = db.cypher_query("MATCH (p:Provider) RETURN p.uid, p.status")
+        with self._lock:
+            self._statuses = {uid: status for uid, status in results}
+            self._loaded_at = self._clock()
+            self._available.clear()
+            return self._statuses
+
+
+provider_statuses = ProviderStatusCache()
+
+
+def status_filter(available_only: bool) -> list[str] | None:
+    """Return the `$statuses` parameter of browse queries. None disables the filter."""
+    return sorted(AVAILABLE_STATUSES) if available_only else None
+
+
+@contextmanager
+def available_only() -> Iterator[None]:
+    """Hide unavailable providers from the extended read schemas built in the block.
+
+    Only lists of providers are filtered: a single provider field is the owner of the
+    read item and is always kept.
+    """
+    token = _available_only.set(True)
+    try:
+        yield
+    finally:
+        _available_only.reset(token)
+
+
+def hides_unavailable() -> bool:
+    """Return True within an `available_only` block."""
+    return _available_only.get()
@@ -0,0 +1,199 @@
+"""Parallel validation of the data used to create a provider.
+
+Validating a `ProviderCreateExtended` is dominated by the validation of the services
+of its regions (flavors, images, networks and quotas), which are independent from
+each other. `validate_provider` validates each service in a process pool, then
+validates regions and provider passing the already validated services: pydantic
+accepts model instances without validating them again, so the region and provider
+level checks run exactly as in the serial validation.
+
+When some items are invalid, their errors are merged, in field order, with the ones
+of the enclosing model, so the resulting `ValidationError` lists the same errors, in
+the same order, of `ProviderCreateExtended.parse_obj`.
+"""
+
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any
+
+from pydantic import BaseModel, ValidationError
+from pydantic.error_wrappers import ErrorWrapper
+
+from fedreg.provider.schemas_extended import (
+    BlockStorageServiceCreateExtended,
+    ComputeServiceCreateExtended,
+    NetworkServiceCreateExtended,
+    ObjectStoreServiceCreateExtended,
+    ProviderCreateExtended,
+    RegionCreateExtended,
+)
+from fedreg.service.schemas import IdentityServiceCreate
+
+SERVICE_SCHEMAS: dict[str, type[BaseModel]] = {
+    "block_storage_services": BlockStorageServiceCreateExtended,
+    "compute_services": ComputeServiceCreateExtended,
+    "identity_services": IdentityServiceCreate,
+    "network_services": NetworkServiceCreateExtended,
+    "object_store_services": ObjectStoreServiceCreateExtended,
+}
+MIN_PARALLEL_ITEMS = 8
+
+
+def validate_provider(
+    data: dict[str, Any],
+    *,
+    executor: Executor | None = None,
+    max_workers: int | None = None,
+    chunksize: int = 1,
+) -> ProviderCreateExtended:
+    """Validate provider data spreading services across multiple processes.
+
+    Args:
+    ----
+        data (dict[str, Any]): Provider data, as accepted by
+            `ProviderCreateExtended.parse_obj`.
+        executor (Executor | None): Executor to use. When None, a process pool with
+            `max_workers` processes is created and shut down.
+        max_workers (int | None): Number of processes of the created pool.
+        chunksize (int): Number of services sent to a process at a time.
+
+    Returns:
+    -------
+        ProviderCreateExtended.
+
+    Raises:
+    ------
+        ValidationError: The same error raised by `ProviderCreateExtended.parse_obj`.
+    """
+    tasks = list(_service_tasks(data))
+    if len(tasks) < MIN_PARALLEL_ITEMS or max_workers == 1:
+        return ProviderCreateExtended.parse_obj(data)
+
+    if executor is None:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            results = list(
+                pool.map(_validate, *zip(*tasks, strict=True), chunksize=chunksize)
+            )
+    else:
+        results = list(
+            executor.map(_validate, *zip(*tasks, strict=True), chunksize=chunksize)
+        )
+
+    services: dict[int, dict[str, dict[int, Any]]] = {}
+    for (i, key, j), result in zip(_service_keys(data), results, strict=True):
+        services.setdefault(i, {}).setdefault(key, {})[j] = result
+
+    regions = []
+    errors = []
+    for i, region in enumerate(data["regions"]):
+        model, raw_errors = _validate_with_items(
+            RegionCreateExtended, region, services.get(i, {})
+        )
+        if raw_errors is None:
+            regions.append(model)
+        else:
+            exc = ValidationError(raw_errors, RegionCreateExtended)
+            errors.append(ErrorWrapper(exc, ("regions", i)))
+
+    if not errors:
+        return ProviderCreateExtended.parse_obj({**data, "regions": regions})
+    _, raw_errors = _validate(ProviderCreateExtended, {**data, "regions": []})
+    raw_errors = _merge(ProviderCreateExtended, raw_errors or [], {"regions": errors})
+    raise ValidationError(raw_errors, ProviderCreateExtended)
+
+
+def _service_keys(data: dict[str, Any]):
+    """Yield region index, service list name and service index of each service.
+
+    Only lists of dicts are considered: pydantic reports errors of other values with a
+    different location when validating them alone. When a region is not a dict, no
+    service is returned, so the whole validation is serial.
+    """
+    regions = data.get("regions")
+    if not isinstance(regions, list) or not all(
+        isinstance(region, dict) for region in regions
+    ):
+        return
+    for i, region in enumerate(regions):
+        for key in SERVICE_SCHEMAS:
+            items = region.get(key)
+            if isinstance(items, list) and all(isinstance(j, dict) for j in items):
+                for j in range(len(items)):
+                    yield i, key, j
+
+
+def _service_tasks(data: dict[str, Any]):
+    """Yield schema and data of each service to validate."""
+    for i, key, j in _service_keys(data):
+        yield SERVICE_SCHEMAS[key], data["regions"][i][key][j]
+
+
+def _validate(
+    schema: type[BaseModel], data: Any
+) -> tuple[BaseModel | None, list[Any] | None]:
+    """Validate data returning the model or the raw errors.
+
+    Raw errors, differently from the ValidationError, can be pickled.
+    """
+    try:
+        return schema.parse_obj(data), None
+    except ValidationError as e:
+        return None, e.raw_errors
+
+
+def _validate_with_items(
+    schema: type[BaseModel],
+    data: Any,
+    items: dict[str, dict[int, tuple[BaseModel | None, list[Any] | None]]],
+) -> tuple[BaseModel | None, list[Any] | None]:
+    """Validate data whose list fields items have already been validated.
+
+    Lists whose items are all valid are replaced by the validated models. Lists with
+    invalid items are replaced by empty lists and their items errors are merged with
+    the ones of the other fields. In this case, as in serial validation, the list
+    validators are not executed.
+    """
+    if not items:
+        return _validate(schema, data)
+    values = dict(data)
+    failed = {}
+    for key, results in items.items():
+        results = sorted(results.items())
+        item_errors = [
+            ErrorWrapper(ValidationError(raw, SERVICE_SCHEMAS[key]), (key, j))
+            for j, (_, raw) in results
+            if raw is not None
+        ]
+        if item_errors:
+            values[key] = []
+            failed[key] = item_errors
+        else:
+            values[key] = [model for _, (model, _) in results]
+    model, raw_errors = _validate(schema, values)
+    if not failed:
+        return model, raw_errors
+    return None, _merge(schema, raw_errors or [], failed)
+
+
+def _merge(
+    schema: type[BaseModel], raw_errors: list[Any], fields_errors: dict[str, list[Any]]
+) -> list[Any]:
+    """Add the errors of the given list fields to the raw errors.
+
+    pydantic reports errors in field definition order, with errors not bound to a
+    field at the end. The errors of each list field are grouped in a single list.
+    """
+    order = {name: pos for pos, name in enumerate(schema.__fields__)}
+    errors = [(order.get(_field(e), len(order)), e) for e in raw_errors]
+    errors += [(order[name], errs) for name, errs in fields_errors.items()]
+    errors.sort(key=lambda i: i[0])
+    return [e for _, e in errors]
+
+
+def _field(error: Any) -> str | None:
+    """Return the name of the top level field of a raw error."""
+    while isinstance(error, list):
+        if not error:
+            return None
+        error = error[0]
+    loc = error.loc_tuple()
+    return loc[0] if loc else None
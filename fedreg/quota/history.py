@@ -0,0 +1,335 @@
+"""History of the resource usage stored in the usage quotas.
+
+Usage quotas hold only the latest values, overwritten at each sync. `record_usage`
+appends the current values of all the usage quotas to a time series, stored in
+`UsageChunk` nodes: one node for each project, service, quota type and day, with an
+array of timestamps and an array of values for each metric. Chunks are not connected
+to the registry graph and have no uid, so they are ignored by snapshots and replicas.
+
+`downsample` replaces the samples of old chunks with their daily rollups (samples
+count, min, max, average and 95th percentile of each metric). `series` returns the
+samples in a time range, `rollups` the daily rollups, computed on the fly for days
+still holding the samples.
+"""
+
+import math
+from collections.abc import Iterable
+from datetime import date, datetime, timezone
+from typing import Any, NamedTuple
+
+from neomodel import IntegerProperty, db
+
+from fedreg.quota.models import (
+    BlockStorageQuota,
+    ComputeQuota,
+    NetworkQuota,
+    ObjectStoreQuota,
+)
+
+MISSING = -1
+STATS = ("min", "max", "avg", "p95")
+DOWNSAMPLE_BATCH_SIZE = 500
+METRICS: dict[str, tuple[str, ...]] = {
+    cls.type.default: tuple(
+        name
+        for name, prop in cls.defined_properties(aliases=False, rels=False).items()
+        if isinstance(prop, IntegerProperty)
+    )
+    for cls in (BlockStorageQuota, ComputeQuota, NetworkQuota, ObjectStoreQuota)
+}
+LABELS = {
+    cls.type.default: cls.__label__
+    for cls in (BlockStorageQuota, ComputeQuota, NetworkQuota, ObjectStoreQuota)
+}
+
+
+class UsageSample(NamedTuple):
+    """Usage of a project on a service at a given time.
+
+    Attributes:
+    ----------
+        timestamp (datetime): Sample time (UTC).
+        project (str): Project uid.
+        service (str): Service uid.
+        type (str): Quota type.
+        per_user (bool): Usage of each user.
+        values (dict[str, int | None]): Value of each metric of the quota type.
+    """
+
+    timestamp: datetime
+    project: str
+    service: str
+    type: str
+    per_user: bool
+    values: dict[str, int | None]
+
+
+class MetricStats(NamedTuple):
+    """Rollup of the samples of a metric. Fields are None without samples.
+
+    Attributes:
+    ----------
+        min (float | None): Minimum value.
+        max (float | None): Maximum value.
+        avg (float | None): Average value.
+        p95 (float | None): 95th percentile (nearest rank).
+    """
+
+    min: float | None
+    max: float | None
+    avg: float | None
+    p95: float | None
+
+
+class DailyUsage(NamedTuple):
+    """Daily rollup of the usage of a project on a service.
+
+    Attributes:
+    ----------
+        day (date): Day.
+        project (str): Project uid.
+        service (str): Service uid.
+        type (str): Quota type.
+        per_user (bool): Usage of each user.
+        samples (int): Number of samples of the day.
+        stats (dict[str, MetricStats]): Rollup of each metric of the quota type.
+    """
+
+    day: date
+    project: str
+    service: str
+    type: str
+    per_user: bool
+    samples: int
+    stats: dict[str, MetricStats]
+
+
+record_query = """
+    MATCH (p:Project)-[:`USE_SERVICE_WITH`]->(q:{label})-[:`APPLY_TO`]->(s:Service)
+    WHERE q.usage
+    MERGE (c:UsageChunk {{
+        project: p.uid,
+        service: s.uid,
+        type: $type,
+        per_user: q.per_user,
+        day: $day
+    }})
+    SET c.ts = coalesce(c.ts, []) + $ts, {metrics}
+    RETURN count(c)
+    """
+chunks_query = """
+    MATCH (c:UsageChunk)
+    WHERE c.project = $project AND c.day >= $start AND c.day <= $end
+    AND ($service IS NULL OR c.service = $service)
+    AND ($type IS NULL OR c.type = $type)
+    RETURN properties(c)
+    ORDER BY c.day, c.service, c.type, c.per_user
+    """
+
+
+def summarize(values: Iterable[int]) -> MetricStats:
+    """Return the rollup of the given values, ignoring missing ones."""
+    items = sorted(i for i in values if i != MISSING)
+    if not items:
+        return MetricStats(None, None, None, None)
+    p95 = items[max(math.ceil(0.95 * len(items)) - 1, 0)]
+    return MetricStats(items[0], items[-1], sum(items) / len(items), p95)
+
+
+def record_usage(at: datetime | None = None) -> int:
+    """Append the current values of all the usage quotas to their time series.
+
+    Missing values are stored as -1, since Neo4j arrays can't hold nulls.
+
+    Args:
+    ----
+        at (datetime | None): Sample time. By default now.
+
+    Returns:
+    -------
+        int. Number of recorded samples.
+    """
+    at = at or datetime.now(timezone.utc)
+    if at.tzinfo is None:
+        at = at.replace(tzinfo=timezone.utc)
+    at = at.astimezone(timezone.utc)
+    total = 0
+    for quota_type, metrics in METRICS.items():
+        sets = ", ".join(
+            f"c.{i} = coalesce(c.{i}, []) + coalesce(q.{i}, {MISSING})" for i in metrics
+        )
+        results, _ = db.cypher_query(
+            record_query.format(label=LABELS[quota_type], metrics=sets),
+            {
+                "type": quota_type,
+                "day": at.date().isoformat(),
+                "ts": int(at.timestamp()),
+            },
+        )
+        total += results[0][0]
+    return total
+
+
+def downsample(before: date, *, batch_size: int = DOWNSAMPLE_BATCH_SIZE) -> int:
+    """Replace the samples of the days before the given one with their rollups.
+
+    Args:
+    ----
+        before (date): First day whose samples are kept.
+        batch_size (int): Number of chunks processed by each query.
+
+    Returns:
+    -------
+        int. Number of downsampled chunks.
+    """
+    total = 0
+    while True:
+        results, _ = db.cypher_query(
+            """
+                MATCH (c:UsageChunk)
+                WHERE c.day < $before AND c.ts IS NOT NULL
+                RETURN elementId(c), properties(c)
+                LIMIT $limit
+            """,
+            {"before": before.isoformat(), "limit": batch_size},
+        )
+        if not results:
+            return total
+        rows = []
+        for element_id, chunk in results:
+            values: dict[str, Any] = {"ts": None, "samples": len(chunk["ts"])}
+            for metric in METRICS[chunk["type"]]:
+                stats = summarize(chunk.get(metric, []))
+                values[metric] = None
+                values.update({f"{metric}_{k}": v for k, v in stats._asdict().items()})
+            rows.append({"id": element_id, "values": values})
+        db.cypher_query(
+            """
+                UNWIND $rows AS row
+                MATCH (c:UsageChunk)
+                WHERE elementId(c) = row.id
+                SET c += row.values
+            """,
+            {"rows": rows},
+        )
+        total += len(rows)
+
+
+def series(
+    project: str,
+    *,
+    start: datetime,
+    end: datetime,
+    service: str | None = None,
+    type: str | None = None,
+) -> list[UsageSample]:
+    """Return the samples of a project in the given time range, in time order.
+
+    Samples of downsampled days are not returned: use `rollups`.
+
+    Args:
+    ----
+        project (str): Project uid.
+        start (datetime): Range start, included. Naive datetimes are UTC.
+        end (datetime): Range end, included. Naive datetimes are UTC.
+        service (str | None): Return only the samples of this service uid.
+        type (str | None): Return only the samples of this quota type.
+
+    Returns:
+    -------
+        list[UsageSample].
+    """
+    start, end = _utc(start), _utc(end)
+    first, last = int(start.timestamp()), int(end.timestamp())
+    items = []
+    for chunk in _chunks(project, start.date(), end.date(), service, type):
+        metrics = METRICS[chunk["type"]]
+        for i, ts in enumerate(chunk.get("ts") or []):
+            if first <= ts <= last:
+                values = {}
+                for metric in metrics:
+                    value = chunk[metric][i]
+                    values[metric] = None if value == MISSING else value
+                items.append(
+                    UsageSample(
+                        datetime.fromtimestamp(ts, timezone.utc),
+                        chunk["project"],
+                        chunk["service"],
+                        chunk["type"],
+                        chunk["per_user"],
+                        values,
+                    )
+                )
+    items.sort(key=lambda i: (i.timestamp, i.service, i.type, i.per_user))
+    return items
+
+
+def rollups(
+    project: str,
+    *,
+    start: date,
+    end: date,
+    service: str | None = None,
+    type: str | None = None,
+) -> list[DailyUsage]:
+    """Return the daily rollups of a project in the given range of days.
+
+    Args:
+    ----
+        project (str): Project uid.
+        start (date): First day.
+        end (date): Last day.
+        service (str | None): Return only the rollups of this service uid.
+        type (str | None): Return only the rollups of this quota type.
+
+    Returns:
+    -------
+        list[DailyUsage]. Rollups ordered by day.
+    """
+    items = []
+    for chunk in _chunks(project, start, end, service, type):
+        metrics = METRICS[chunk["type"]]
+        if chunk.get("ts") is not None:
+            samples = len(chunk["ts"])
+            stats = {i: summarize(chunk.get(i, [])) for i in metrics}
+        else:
+            samples = chunk.get("samples", 0)
+            stats = {
+                i: MetricStats(*(chunk.get(f"{i}_{k}") for k in STATS)) for i in metrics
+            }
+        items.append(
+            DailyUsage(
+                date.fromisoformat(chunk["day"]),
+                chunk["project"],
+                chunk["service"],
+                chunk["type"],
+                chunk["per_user"],
+                samples,
+                stats,
+            )
+        )
+    return items
+
+
+def _chunks(
+    project: str, start: date, end: date, service: str | None, type: str | None
+) -> list[dict[str, Any]]:
+    """Return the properties of the chunks of a project in the range of days."""
+    results, _ = db.cypher_query(
+        chunks_query,
+        {
+            "project": project,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "service": service,
+            "type": type,
+        },
+    )
+    return [row[0] for row in results]
+
+
+def _utc(value: datetime) -> datetime:
+    """Return the datetime in UTC. Naive datetimes are considered UTC."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
@@ -3,18 +3,17 @@
 from neomodel import (
     BooleanProperty,
     IntegerProperty,
-    One,
     RelationshipFrom,
     RelationshipTo,
     StringProperty,
-    StructuredNode,
     UniqueIdProperty,
 )
 
+from fedreg.changes import One, TrackedNode
 from fedreg.quota.enum import QuotaType
 
 
-class Quota(StructuredNode):
+class Quota(TrackedNode):
     """Resource limitations for Projects on Services.
 
     Common attributes to all quota types.
@@ -11,6 +11,7 @@ from fedreg.core import (
     BaseReadPrivate,
     BaseReadPublic,
     create_query_model,
+    create_record_type,
 )
 from fedreg.quota.constants import (
     DOC_BYTES,
@@ -180,6 +181,9 @@ class BlockStorageQuotaRead(BaseNodeRead, BaseReadPrivate, BlockStorageQuotaBase
 BlockStorageQuotaQuery = create_query_model(
     "BlockStorageQuotaQuery", BlockStorageQuotaBase
 )
+BlockStorageQuotaRecord = create_record_type(
+    "BlockStorageQuotaRecord", BlockStorageQuotaRead, label="BlockStorageQuota"
+)
 
 
 class ComputeQuotaBasePublic(QuotaBase):
@@ -302,6 +306,9 @@ class ComputeQuotaRead(BaseNodeRead, BaseReadPrivate, ComputeQuotaBase):
 
 
 ComputeQuotaQuery = create_query_model("ComputeQuotaQuery", ComputeQuotaBase)
+ComputeQuotaRecord = create_record_type(
+    "ComputeQuotaRecord", ComputeQuotaRead, label="ComputeQuota"
+)
 
 
 class NetworkQuotaBasePublic(QuotaBase):
@@ -455,6 +462,9 @@ class NetworkQuotaRead(BaseNodeRead, BaseReadPrivate, NetworkQuotaBase):
 
 
 NetworkQuotaQuery = create_query_model("NetworkQuotaQuery", NetworkQuotaBase)
+NetworkQuotaRecord = create_record_type(
+    "NetworkQuotaRecord", NetworkQuotaRead, label="NetworkQuota"
+)
 
 
 class ObjectStoreQuotaBasePublic(QuotaBase):
@@ -581,3 +591,6 @@ class ObjectStoreQuotaRead(BaseNodeRead, BaseReadPrivate, ObjectStoreQuotaBase):
 ObjectStoreQuotaQuery = create_query_model(
     "ObjectStoreQuotaQuery", ObjectStoreQuotaBase
 )
+ObjectStoreQuotaRecord = create_record_type(
+    "ObjectStoreQuotaRecord", ObjectStoreQuotaRead, label="ObjectStoreQuota"
+)
@@ -2,18 +2,16 @@
 
 from neomodel import (
     FloatProperty,
-    One,
     RelationshipFrom,
     RelationshipTo,
     StringProperty,
-    StructuredNode,
     UniqueIdProperty,
-    ZeroOrMore,
-    ZeroOrOne,
 )
 
+from fedreg.changes import One, TrackedNode, ZeroOrMore, ZeroOrOne
 
-class Region(StructuredNode):
+
+class Region(TrackedNode):
     """Region owned by a Provider.
 
     A Region is used to split a provider resources and limit projects access.
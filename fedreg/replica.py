@@ -0,0 +1,469 @@
+"""In-process read-only replica of the federation registry graph.
+
+The replica loads all the nodes with a uid and the relationships between them in
+compact in-memory structures:
+
+- for each label set, a list of values for each property (columns);
+- for each uid, the label set and the row of its properties;
+- for each uid, the outgoing and incoming adjacency lists grouped by relationship type.
+
+Replica nodes expose properties and relationships with the same names of the neomodel
+models, so they can be passed to the `from_orm` method of the read schemas, and the
+`images` and `shared_*` traversals of providers and projects.
+
+The replica is refreshed by a background timer, when the head of the change log moves.
+Reading the head is a single node lookup, so idle refresh ticks are cheap for the
+primary; writers must register a `fedreg.changes.ChangeLog` for the replica to notice
+their changes.
+"""
+
+import logging
+import threading
+from collections import defaultdict
+from functools import partial
+from typing import Any
+
+from neomodel import One, StructuredNode, ZeroOrOne
+from neomodel.util import INCOMING, OUTGOING
+
+import fedreg.flavor.models
+import fedreg.identity_provider.models
+import fedreg.image.models
+import fedreg.location.models
+import fedreg.network.models
+import fedreg.project.models
+import fedreg.provider.models
+import fedreg.quota.models
+import fedreg.region.models
+import fedreg.service.models
+import fedreg.sla.models
+import fedreg.user_group.models  # noqa: F401
+from fedreg.changes import ChangeLog
+from fedreg.hashing import CONTENT_HASH, ETAG, TREE_HASH
+from fedreg.provider.status import AVAILABLE_STATUSES
+from fedreg.quota.enum import QuotaType
+from fedreg.snapshot import (
+    DEFAULT_BATCH_SIZE,
+    read_label_sets,
+    read_nodes,
+    read_relationships,
+)
+
+logger = logging.getLogger(__name__)
+
+CATALOG_STEPS = {
+    "flavors": ("ComputeService", "AVAILABLE_VM_FLAVOR", OUTGOING, "Flavor"),
+    "images": ("ComputeService", "AVAILABLE_VM_IMAGE", OUTGOING, "Image"),
+    "networks": ("NetworkService", "AVAILABLE_NETWORK", OUTGOING, "Network"),
+    "quotas": ("Service", "APPLY_TO", INCOMING, "Quota"),
+}
+SHARED_STEPS = {
+    "shared_flavors": (QuotaType.COMPUTE, "AVAILABLE_VM_FLAVOR", "SharedFlavor"),
+    "shared_images": (QuotaType.COMPUTE, "AVAILABLE_VM_IMAGE", "SharedImage"),
+    "shared_networks": (QuotaType.NETWORK, "AVAILABLE_NETWORK", "SharedNetwork"),
+}
+
+
+def model_classes() -> dict[frozenset[str], type[StructuredNode]]:
+    """Map the label set of each fedreg neomodel class to the class."""
+    classes = {}
+    todo = [StructuredNode]
+    while todo:
+        cls = todo.pop()
+        todo.extend(cls.__subclasses__())
+        if cls.__module__.startswith("fedreg."):
+            classes[frozenset(cls.inherited_labels())] = cls
+    return classes
+
+
+class ReplicaRelationship(list):
+    """List of related replica nodes.
+
+    Mimic the read methods of a neomodel relationship manager.
+    """
+
+    def all(self) -> list["ReplicaNode"]:
+        """Return all the related nodes."""
+        return list(self)
+
+    def single(self) -> "ReplicaNode | None":
+        """Return the first related node or None."""
+        return self[0] if self else None
+
+    def filter(self, **kwargs: Any) -> "ReplicaRelationship":
+        """Return the related nodes with the given property values."""
+        return ReplicaRelationship(
+            i for i in self if all(getattr(i, k) == v for k, v in kwargs.items())
+        )
+
+
+class ReplicaNode:
+    """Read-only view of a node stored in the replica.
+
+    Attributes:
+    ----------
+        uid (str): Node unique ID.
+        relationship (dict | None): Properties of the relationship used to reach this
+            node, if the relationship has a model.
+    """
+
+    def __init__(
+        self,
+        state: "ReplicaState",
+        uid: str,
+        relationship: dict[str, Any] | None = None,
+    ) -> None:
+        """Bind the view to a replica state and a node uid."""
+        self._state = state
+        self._model = state.model(uid)
+        self.uid = uid
+        if relationship is not None:
+            self.relationship = relationship
+
+    def __getattr__(self, name: str) -> Any:
+        """Resolve properties, relationships and traversals on first access."""
+        if name.startswith("_"):
+            raise AttributeError(name)
+        rels = self._model.defined_properties(
+            aliases=False, properties=False, rels=True
+        )
+        if name in rels:
+            value = self._state.relationship(self.uid, rels[name])
+        elif name in self._model.defined_properties(aliases=False, rels=False):
+            value = self._state.property(self.uid, name)
+        elif name == ETAG:
+            value = self._state.property(self.uid, TREE_HASH) or self._state.property(
+                self.uid, CONTENT_HASH
+            )
+        elif (name in CATALOG_STEPS and self._model.__label__ == "Provider") or (
+            name in SHARED_STEPS and self._model.__label__ == "Project"
+        ):
+            return partial(getattr(self._state, name), self.uid)
+        else:
+            raise AttributeError(name)
+        self.__dict__[name] = value
+        return value
+
+    def __repr__(self) -> str:
+        """Show model name and uid."""
+        return f"<Replica {self._model.__name__}: {self.uid}>"
+
+
+class ReplicaState:
+    """Immutable in-memory copy of the graph."""
+
+    def __init__(self, classes: dict[frozenset[str], type[StructuredNode]]) -> None:
+        """Create empty structures."""
+        self.classes = classes
+        self.label_sets: list[frozenset[str]] = []
+        self.columns: list[dict[str, list[Any]]] = []
+        self.index: dict[str, tuple[int, int]] = {}
+        self.outgoing = defaultdict(lambda: defaultdict(list))
+        self.incoming = defaultdict(lambda: defaultdict(list))
+
+    def add_nodes(self, labels: list[str], rows: list[dict[str, Any]]) -> None:
+        """Append nodes with the given label set."""
+        key = frozenset(labels)
+        if key not in self.label_sets:
+            self.label_sets.append(key)
+            self.columns.append({})
+        pos = self.label_sets.index(key)
+        columns = self.columns[pos]
+        size = len(columns["uid"]) if "uid" in columns else 0
+        for i, row in enumerate(rows):
+            for k, v in row.items():
+                col = columns.setdefault(k, [])
+                col.extend([None] * (size + i - len(col)))
+                col.append(v)
+            self.index[row["uid"]] = (pos, size + i)
+
+    def add_relationships(self, rel_type: str, rows: list[dict[str, Any]]) -> None:
+        """Append relationships of the given type to the adjacency lists."""
+        for row in rows:
+            start = row.pop("start")
+            end = row.pop("end")
+            props = row or None
+            self.outgoing[start][rel_type].append((end, props))
+            self.incoming[end][rel_type].append((start, props))
+
+    def labels(self, uid: str) -> frozenset[str]:
+        """Return the label set of a node."""
+        return self.label_sets[self.index[uid][0]]
+
+    def model(self, uid: str) -> type[StructuredNode]:
+        """Return the neomodel class of a node."""
+        return self.classes[self.labels(uid)]
+
+    def property(self, uid: str, name: str) -> Any:
+        """Return a node property or None."""
+        pos, row = self.index[uid]
+        col = self.columns[pos].get(name, [])
+        return col[row] if row < len(col) else None
+
+    def neighbours(
+        self, uid: str, rel_type: str, direction: int, label: str | None = None
+    ) -> list[tuple[str, dict[str, Any] | None]]:
+        """Return uids and relationship properties of the related nodes."""
+        items = []
+        if direction != INCOMING:
+            items += self.outgoing[uid][rel_type] if uid in self.outgoing else []
+        if direction != OUTGOING:
+            items += self.incoming[uid][rel_type] if uid in self.incoming else []
+        if label is None:
+            return items
+        return [i for i in items if label in self.labels(i[0])]
+
+    def relationship(self, uid: str, rel: Any) -> Any:
+        """Resolve a neomodel relationship definition starting from the given node.
+
+        Single cardinality relationships return a node or None; other relationships
+        return a list of nodes.
+        """
+        rel.lookup_node_class()
+        definition = rel.definition
+        items = self.neighbours(
+            uid,
+            definition["relation_type"],
+            definition["direction"],
+            definition["node_class"].__label__,
+        )
+        with_model = definition.get("model") is not None
+        nodes = ReplicaRelationship(
+            ReplicaNode(self, i, props if with_model else None) for i, props in items
+        )
+        if issubclass(rel.manager, (One, ZeroOrOne)):
+            return nodes.single()
+        return nodes
+
+    def _catalog_uids(
+        self,
+        provider_uid: str,
+        item: str,
+        region_uid: str | None = None,
+        service_uid: str | None = None,
+    ) -> list[str]:
+        """Return the sorted uids of the distinct catalog items of a provider."""
+        service_label, rel_type, direction, label = CATALOG_STEPS[item]
+        uids = set()
+        for region, _ in self.neighbours(
+            provider_uid, "DIVIDED_INTO", OUTGOING, "Region"
+        ):
+            if region_uid is not None and region != region_uid:
+                continue
+            for service, _ in self.neighbours(
+                region, "SUPPLY", OUTGOING, service_label
+            ):
+                if service_uid is not None and service != service_uid:
+                    continue
+                uids.update(
+                    i for i, _ in self.neighbours(service, rel_type, direction, label)
+                )
+        return sorted(uids)
+
+    def _catalog(
+        self,
+        provider_uid: str,
+        item: str,
+        *,
+        region_uid: str | None = None,
+        service_uid: str | None = None,
+        after: str | None = None,
+        limit: int | None = None,
+        available_only: bool = False,
+    ) -> list[ReplicaNode]:
+        """Same as `Provider._catalog` on the in-memory data.
+
+        Provider availability is read from the replica, not from the status cache.
+        """
+        if available_only and not self._is_available(provider_uid):
+            return []
+        uids = self._catalog_uids(provider_uid, item, region_uid, service_uid)
+        if after is not None:
+            uids = [i for i in uids if i > after]
+        if limit is not None:
+            uids = uids[:limit]
+        return [ReplicaNode(self, i) for i in uids]
+
+    def images(self, provider_uid: str, **kwargs: Any) -> list[ReplicaNode]:
+        """Same as `Provider.images`."""
+        return self._catalog(provider_uid, "images", **kwargs)
+
+    def flavors(self, provider_uid: str, **kwargs: Any) -> list[ReplicaNode]:
+        """Same as `Provider.flavors`."""
+        return self._catalog(provider_uid, "flavors", **kwargs)
+
+    def networks(self, provider_uid: str, **kwargs: Any) -> list[ReplicaNode]:
+        """Same as `Provider.networks`."""
+        return self._catalog(provider_uid, "networks", **kwargs)
+
+    def quotas(self, provider_uid: str, **kwargs: Any) -> list[ReplicaNode]:
+        """Same as `Provider.quotas`."""
+        return self._catalog(provider_uid, "quotas", **kwargs)
+
+    def _is_available(self, provider_uid: str) -> bool:
+        """Return True if the provider status is active or limited."""
+        return (
+            provider_uid in self.index
+            and self.property(provider_uid, "status") in AVAILABLE_STATUSES
+        )
+
+    def _shared(
+        self, project_uid: str, item: str, *, available_only: bool = False
+    ) -> list[ReplicaNode]:
+        """Return the shared items reachable through the project's quotas."""
+        if available_only and not any(
+            self._is_available(i)
+            for i, _ in self.neighbours(
+                project_uid, "BOOK_PROJECT_FOR_SLA", INCOMING, "Provider"
+            )
+        ):
+            return []
+        quota_type, rel_type, label = SHARED_STEPS[item]
+        uids = {}
+        for quota, _ in self.neighbours(project_uid, "USE_SERVICE_WITH", OUTGOING):
+            if self.property(quota, "type") != quota_type.value:
+                continue
+            for service, _ in self.neighbours(quota, "APPLY_TO", OUTGOING):
+                for i, _ in self.neighbours(service, rel_type, OUTGOING, label):
+                    uids[i] = None
+        return [ReplicaNode(self, i) for i in uids]
+
+    def shared_flavors(
+        self, project_uid: str, *, available_only: bool = False
+    ) -> list[ReplicaNode]:
+        """Same as `Project.shared_flavors`."""
+        return self._shared(
+            project_uid, "shared_flavors", available_only=available_only
+        )
+
+    def shared_images(
+        self, project_uid: str, *, available_only: bool = False
+    ) -> list[ReplicaNode]:
+        """Same as `Project.shared_images`."""
+        return self._shared(project_uid, "shared_images", available_only=available_only)
+
+    def shared_networks(
+        self, project_uid: str, *, available_only: bool = False
+    ) -> list[ReplicaNode]:
+        """Same as `Project.shared_networks`."""
+        return self._shared(
+            project_uid, "shared_networks", available_only=available_only
+        )
+
+
+class GraphReplica:
+    """Read-only replica of the whole federation registry graph.
+
+    Call `load` to populate the replica and `start` to periodically check for changes
+    and reload it. Each reload builds a new state which atomically replaces the
+    previous one: nodes already retrieved keep pointing to the old state.
+    """
+
+    def __init__(self, *, batch_size: int = DEFAULT_BATCH_SIZE) -> None:
+        """Create an empty replica."""
+        self.batch_size = batch_size
+        self.head: int | None = None
+        self._state = ReplicaState(model_classes())
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def load(self) -> None:
+        """Read all nodes and relationships from the DB."""
+        head = self.get_head()
+        state = ReplicaState(self._state.classes)
+        label_sets = read_label_sets()
+        for labels in label_sets:
+            for rows in read_nodes(labels, self.batch_size):
+                state.add_nodes(labels, rows)
+        for labels in label_sets:
+            for batch in read_relationships(labels, self.batch_size):
+                for rel_type, rows in batch.items():
+                    state.add_relationships(rel_type, rows)
+        self._state = state
+        self.head = head
+
+    def refresh(self) -> bool:
+        """Reload the replica if changes have been logged since the last load.
+
+        Return True if the replica has been reloaded.
+        """
+        if self.get_head() == self.head:
+            return False
+        self.load()
+        return True
+
+    def get_head(self) -> int:
+        """Return the sequence number of the last logged change."""
+        return ChangeLog().head()
+
+    def start(self, interval: float) -> None:
+        """Start a background thread refreshing the replica every interval seconds."""
+        assert self._thread is None, "Replica refresh already started"
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(interval,), name="fedreg-replica", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background refresh thread."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, interval: float) -> None:
+        """Periodically refresh the replica until stopped."""
+        while not self._stop.wait(interval):
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Failed to refresh the graph replica")
+
+    def get(self, uid: str) -> ReplicaNode | None:
+        """Return the node with the given uid or None."""
+        state = self._state
+        return ReplicaNode(state, uid) if uid in state.index else None
+
+    def nodes(self, model: type[StructuredNode]) -> list[ReplicaNode]:
+        """Return all the nodes with the label of the given neomodel class."""
+        state = self._state
+        nodes = []
+        for key, columns in zip(state.label_sets, state.columns):
+            if model.__label__ in key:
+                nodes += [ReplicaNode(state, uid) for uid in columns["uid"]]
+        return nodes
+
+    def images(self, provider_uid: str, **kwargs: Any) -> list[ReplicaNode]:
+        """Same as `Provider.images`."""
+        return self._state.images(provider_uid, **kwargs)
+
+    def flavors(self, provider_uid: str, **kwargs: Any) -> list[ReplicaNode]:
+        """Same as `Provider.flavors`."""
+        return self._state.flavors(provider_uid, **kwargs)
+
+    def networks(self, provider_uid: str, **kwargs: Any) -> list[ReplicaNode]:
+        """Same as `Provider.networks`."""
+        return self._state.networks(provider_uid, **kwargs)
+
+    def quotas(self, provider_uid: str, **kwargs: Any) -> list[ReplicaNode]:
+        """Same as `Provider.quotas`."""
+        return self._state.quotas(provider_uid, **kwargs)
+
+    def shared_flavors(
+        self, project_uid: str, *, available_only: bool = False
+    ) -> list[ReplicaNode]:
+        """Same as `Project.shared_flavors`."""
+        return self._state.shared_flavors(project_uid, available_only=available_only)
+
+    def shared_images(
+        self, project_uid: str, *, available_only: bool = False
+    ) -> list[ReplicaNode]:
+        """Same as `Project.shared_images`."""
+        return self._state.shared_images(project_uid, available_only=available_only)
+
+    def shared_networks(
+        self, project_uid: str, *, available_only: bool = False
+    ) -> list[ReplicaNode]:
+        """Same as `Project.shared_networks`."""
+        return self._state.shared_networks(project_uid, available_only=available_only)
@@ -0,0 +1,95 @@
+"""Full-text search of flavors, images, networks and projects.
+
+The search uses the `catalog_search` full-text index created by
+`fedreg.indexes.install_indexes`: a single index covers all the searched labels, so
+one query returns results of every kind, ranked by relevance.
+"""
+
+import re
+from typing import Any
+
+from neomodel import db
+
+from fedreg.indexes import SEARCH_INDEX, SEARCH_LABELS
+
+LUCENE_SPECIAL_CHARS = re.compile(r'([+\-&|!(){}\[\]^"~*?:\\/])')
+VISIBILITY = """
+    node.uid = $project
+    OR (
+        (node:SharedFlavor OR node:SharedImage OR node:SharedNetwork)
+        AND EXISTS {
+            MATCH (:Project {uid: $project})-[:`USE_SERVICE_WITH`]-(:Quota)
+                -[:`APPLY_TO`]-(:Service)
+                -[:`AVAILABLE_VM_FLAVOR`|`AVAILABLE_VM_IMAGE`|`AVAILABLE_NETWORK`]->
+                (node)
+        }
+    )
+    OR EXISTS {
+        MATCH (:Project {uid: $project})
+            -[:`CAN_USE_VM_FLAVOR`|`CAN_USE_VM_IMAGE`|`CAN_USE_NETWORK`]->(node)
+    }
+    """
+search_query = """
+    CALL db.index.fulltext.queryNodes($index, $text) YIELD node, score
+    WHERE any(label IN labels(node) WHERE label IN $labels)
+    AND ($project IS NULL OR {visibility})
+    RETURN node, score
+    ORDER BY score DESC, node.uid
+    SKIP $skip
+    LIMIT $limit
+    """
+
+
+def lucene_query(text: str) -> str:
+    """Convert free text into a Lucene query.
+
+    Special characters are escaped and terms are lowercased, so user input never
+    breaks the query syntax nor is read as a boolean operator. Each term matches
+    whole words and, with a lower score, words starting with it: for example
+    *ubuntu 22* matches an image with version *22.04*.
+    """
+    terms = [LUCENE_SPECIAL_CHARS.sub(r"\\\1", i.lower()) for i in text.split()]
+    return " ".join(f"{i} {i}*" for i in terms)
+
+
+def search(
+    text: str,
+    *,
+    project: str | None = None,
+    labels: tuple[str, ...] = SEARCH_LABELS,
+    skip: int = 0,
+    limit: int = 20,
+) -> list[tuple[Any, float]]:
+    """Search flavors, images, networks and projects matching the given text.
+
+    Args:
+    ----
+        text (str): Free text.
+        project (str | None): When given, return only the items visible by the
+            project with this uid: the project itself, the shared items of the
+            services it has quotas on and the private items it can use.
+        labels (tuple of str): Labels of the items to return.
+        skip (int): Number of results to skip.
+        limit (int): Maximum number of results.
+
+    Returns:
+    -------
+        list[tuple[Any, float]]. Matching nodes, with their score, from the most
+        relevant one.
+    """
+    query = lucene_query(text)
+    if not query:
+        return []
+    results, _ = db.cypher_query(
+        search_query.format(visibility=VISIBILITY),
+        {
+            "index": SEARCH_INDEX,
+            "text": query,
+            "labels": list(labels),
+            "project": project,
+            "skip": skip,
+            "limit": limit,
+        },
+        resolve_objects=True,
+    )
+    return [(node, score) for node, score in results]
@@ -0,0 +1,434 @@
+"""Bulk upsert of the flavors and images supplied by a compute service.
+
+Sites refresh their catalog far more often than the rest of the provider.
+`upsert_catalog` finds the compute service by endpoint and matches flavors and images
+by uuid. It reads the current catalog, the project links of the service's provider
+and the images equivalent to the new ones with a single query. The diff is computed
+in memory, so unchanged items cost nothing. Inserts, updates, removals and
+`CAN_USE_VM_*` link changes are applied with a few `UNWIND` statements.
+
+Images follow `ComputeService.add_images`: new images reuse an equivalent image, with
+the same fingerprint, when one exists and the service can reuse it (see
+`Image.find_reusable`). An image shared with other services is updated
+in place only when its fingerprint does not change; otherwise it is disconnected
+and the new version is added. Changing the visibility of a flavor or an image replaces
+the node.
+
+Statements run in the caller's transaction: wrap the call in `db.transaction` to
+apply the whole catalog atomically. Changes are sent to the `fedreg.changes` listeners
+only when change capture is enabled.
+"""
+
+from collections.abc import Mapping, Sequence
+from typing import Any, NamedTuple
+
+from neomodel import db
+
+from fedreg.changes import (
+    CONNECT,
+    CREATE,
+    DELETE,
+    DISCONNECT,
+    UPDATE,
+    Change,
+    TrackedNode,
+    is_enabled,
+    notify,
+)
+from fedreg.flavor.models import PrivateFlavor, SharedFlavor
+from fedreg.flavor.schemas import SharedFlavorCreate
+from fedreg.hashing import CONTENT_HASH, content_hash
+from fedreg.image.models import REUSABLE_IMAGE, PrivateImage, SharedImage, fingerprint
+from fedreg.image.schemas import SharedImageCreate
+from fedreg.provider.schemas_extended import (
+    PrivateFlavorCreateExtended,
+    PrivateImageCreateExtended,
+)
+
+catalog_query = f"""
+    MATCH (s:ComputeService {{endpoint: $endpoint}})
+        <-[:`SUPPLY`]-(:Region)<-[:`DIVIDED_INTO`]-(p:Provider)
+    CALL {{
+        WITH p
+        MATCH (p)-[:`BOOK_PROJECT_FOR_SLA`]->(x:Project)
+        WHERE x.uuid IN $projects
+        RETURN collect([x.uuid, x.uid]) AS projects
+    }}
+    CALL {{
+        WITH s, p
+        MATCH (s)-[:`AVAILABLE_VM_FLAVOR`]->(n:Flavor)
+        OPTIONAL MATCH (n)<-[:`CAN_USE_VM_FLAVOR`]-(x:Project)
+            <-[:`BOOK_PROJECT_FOR_SLA`]-(p)
+        WITH n, collect(x.uid) AS links
+        RETURN collect([n, links, 1]) AS flavors
+    }}
+    CALL {{
+        WITH s, p
+        MATCH (s)-[:`AVAILABLE_VM_IMAGE`]->(n:Image)
+        OPTIONAL MATCH (n)<-[:`CAN_USE_VM_IMAGE`]-(x:Project)
+            <-[:`BOOK_PROJECT_FOR_SLA`]-(p)
+        WITH n, collect(x.uid) AS links
+        RETURN collect(
+            [n, links, size([(n)<-[:`AVAILABLE_VM_IMAGE`]-() | 1])]
+        ) AS images
+    }}
+    CALL {{
+        WITH s, p
+        MATCH (n:Image)
+        WHERE n.fingerprint IN $fingerprints
+            AND NOT EXISTS {{ MATCH (s)-[:`AVAILABLE_VM_IMAGE`]->(n) }}
+            AND {REUSABLE_IMAGE}
+        WITH n
+        ORDER BY n.uid
+        RETURN collect([n.fingerprint, n.uid]) AS equivalent
+    }}
+    RETURN s.uid, projects, flavors, images, equivalent
+    """
+
+
+class CatalogKind(NamedTuple):
+    """Flavors or images: labels and relationships of the catalog items.
+
+    Attributes:
+    ----------
+        label (str): Label common to private and shared items.
+        relationship (str): Relationship from the compute service.
+        link (str): Relationship from the projects allowed to use private items.
+        private (type of TrackedNode): Model of the private items.
+        shared (type of TrackedNode): Model of the shared items.
+    """
+
+    label: str
+    relationship: str
+    link: str
+    private: type[TrackedNode]
+    shared: type[TrackedNode]
+
+    def upsert_query(self) -> str:
+        """Create or reuse the items and connect them to the service."""
+        return f"""
+            MATCH (s:ComputeService {{uid: $service}})
+            UNWIND $rows AS row
+            MERGE (n:{self.label} {{uid: row.uid}})
+            ON CREATE SET n += row.properties
+            FOREACH (_ IN CASE WHEN row.shared THEN [1] ELSE [] END |
+                SET n:{self.shared.__label__})
+            FOREACH (_ IN CASE WHEN row.shared THEN [] ELSE [1] END |
+                SET n:{self.private.__label__})
+            MERGE (s)-[:`{self.relationship}`]->(n)
+            """
+
+    def update_query(self) -> str:
+        """Set the changed properties of the items."""
+        return f"""
+            UNWIND $rows AS row
+            MATCH (n:{self.label} {{uid: row.uid}})
+            SET n += row.properties
+            """
+
+    def remove_query(self) -> str:
+        """Disconnect the items and delete the ones no longer used by any service."""
+        return f"""
+            MATCH (:ComputeService {{uid: $service}})
+                -[r:`{self.relationship}`]->(n:{self.label})
+            WHERE n.uid IN $uids
+            DELETE r
+            WITH n
+            WHERE NOT EXISTS {{ MATCH (n)<-[:`{self.relationship}`]-() }}
+            DETACH DELETE n
+            """
+
+    def link_query(self) -> str:
+        """Connect projects to private items."""
+        return f"""
+            UNWIND $rows AS row
+            MATCH (x:Project {{uid: row.project}}), (n:{self.label} {{uid: row.item}})
+            MERGE (x)-[:`{self.link}`]->(n)
+            """
+
+    def unlink_query(self) -> str:
+        """Disconnect projects from private items."""
+        return f"""
+            UNWIND $rows AS row
+            MATCH (x:Project {{uid: row.project}})-[r:`{self.link}`]
+                ->(n:{self.label} {{uid: row.item}})
+            DELETE r
+            """
+
+
+FLAVORS = CatalogKind(
+    "Flavor", "AVAILABLE_VM_FLAVOR", "CAN_USE_VM_FLAVOR", PrivateFlavor, SharedFlavor
+)
+IMAGES = CatalogKind(
+    "Image", "AVAILABLE_VM_IMAGE", "CAN_USE_VM_IMAGE", PrivateImage, SharedImage
+)
+
+
+class ItemCounts(NamedTuple):
+    """Number of changes applied to the flavors or images of a service.
+
+    Attributes:
+    ----------
+        added (int): Items created or, for images, reused and connected.
+        updated (int): Items with changed properties.
+        removed (int): Items disconnected, or deleted, from the service.
+        linked (int): New project links.
+        unlinked (int): Removed project links.
+    """
+
+    added: int = 0
+    updated: int = 0
+    removed: int = 0
+    linked: int = 0
+    unlinked: int = 0
+
+
+class CatalogUpdate(NamedTuple):
+    """Changes applied to the catalog of a compute service.
+
+    Attributes:
+    ----------
+        service (str): Compute service uid.
+        flavors (ItemCounts): Changes of the flavors.
+        images (ItemCounts): Changes of the images.
+    """
+
+    service: str
+    flavors: ItemCounts = ItemCounts()
+    images: ItemCounts = ItemCounts()
+
+
+class _Plan:
+    """Rows of the statements updating the items of a kind, and their changes."""
+
+    def __init__(self, kind: CatalogKind, service: str) -> None:
+        self.kind = kind
+        self.service = service
+        self.added: list[dict[str, Any]] = []
+        self.updated: list[dict[str, Any]] = []
+        self.removed: list[str] = []
+        self.linked: list[dict[str, str]] = []
+        self.unlinked: list[dict[str, str]] = []
+        self.changes: list[Change] = []
+
+    def add(
+        self,
+        model: type[TrackedNode],
+        properties: dict[str, Any],
+        projects: set[str],
+        *,
+        reuse: str | None = None,
+    ) -> None:
+        """Create an item, or connect the existing one with uid reuse."""
+        uid = reuse or properties["uid"]
+        shared = model is self.kind.shared
+        self.added.append(
+            {"uid": uid, "properties": {} if reuse else properties, "shared": shared}
+        )
+        if reuse is None:
+            fields = tuple(
+                sorted(
+                    k
+                    for k, v in properties.items()
+                    if v is not None and k != CONTENT_HASH
+                )
+            )
+            self.changes.append(Change(CREATE, model.__label__, uid, fields))
+        self.changes.append(self._connection(CONNECT, model, uid))
+        self.link(model, uid, projects, set())
+
+    def update(
+        self,
+        model: type[TrackedNode],
+        uid: str,
+        properties: dict[str, Any],
+        stored: dict[str, Any],
+    ) -> None:
+        """Set the properties that differ from the stored ones, and the content hash."""
+        fields = sorted(
+            k
+            for k, v in properties.items()
+            if k not in ("uid", CONTENT_HASH) and v != stored.get(k)
+        )
+        if fields:
+            self.updated.append(
+                {
+                    "uid": uid,
+                    "properties": {k: properties[k] for k in (*fields, CONTENT_HASH)},
+                }
+            )
+            self.changes.append(Change(UPDATE, model.__label__, uid, tuple(fields)))
+
+    def remove(
+        self, model: type[TrackedNode], uid: str, links: set[str], services: int
+    ) -> None:
+        """Disconnect an item, deleting it when no other service uses it."""
+        self.removed.append(uid)
+        self.changes.append(self._connection(DISCONNECT, model, uid))
+        if services > 1:
+            self.link(model, uid, set(), links)
+        else:
+            self.changes.append(Change(DELETE, model.__label__, uid))
+
+    def link(
+        self, model: type[TrackedNode], uid: str, projects: set[str], stored: set[str]
+    ) -> None:
+        """Connect the missing projects and disconnect the ones no longer listed."""
+        for op, rows, items in (
+            (CONNECT, self.linked, projects - stored),
+            (DISCONNECT, self.unlinked, stored - projects),
+        ):
+            for project in sorted(items):
+                rows.append({"project": project, "item": uid})
+                self.changes.append(
+                    Change(
+                        op, "Project", project, (), self.kind.link, model.__label__, uid
+                    )
+                )
+
+    def apply(self) -> ItemCounts:
+        """Run the statements, skipping the ones with nothing to do."""
+        params = {"service": self.service}
+        if self.unlinked:
+            db.cypher_query(self.kind.unlink_query(), {"rows": self.unlinked})
+        if self.removed:
+            db.cypher_query(self.kind.remove_query(), {**params, "uids": self.removed})
+        if self.updated:
+            db.cypher_query(self.kind.update_query(), {"rows": self.updated})
+        if self.added:
+            db.cypher_query(self.kind.upsert_query(), {**params, "rows": self.added})
+        if self.linked:
+            db.cypher_query(self.kind.link_query(), {"rows": self.linked})
+        return ItemCounts(
+            len(self.added),
+            len(self.updated),
+            len(self.removed),
+            len(self.linked),
+            len(self.unlinked),
+        )
+
+    def _connection(self, op: str, model: type[TrackedNode], uid: str) -> Change:
+        """Return the change of the relationship between the service and an item."""
+        return Change(
+            op,
+            "ComputeService",
+            self.service,
+            (),
+            self.kind.relationship,
+            model.__label__,
+            uid,
+        )
+
+
+def upsert_catalog(
+    endpoint: str,
+    *,
+    flavors: Sequence[PrivateFlavorCreateExtended | SharedFlavorCreate] | None = None,
+    images: Sequence[PrivateImageCreateExtended | SharedImageCreate] | None = None,
+) -> CatalogUpdate:
+    """Make the flavors and images of a compute service match the given ones.
+
+    Items are matched by uuid. Listed items are created or updated, and private ones
+    are linked to exactly the listed projects. Items of the service missing from a
+    list are removed. Pass None to leave flavors or images untouched.
+
+    Args:
+    ----
+        endpoint (str): Compute service endpoint.
+        flavors (Sequence[PrivateFlavorCreateExtended | SharedFlavorCreate] | None):
+            Complete list of the service's flavors.
+        images (Sequence[PrivateImageCreateExtended | SharedImageCreate] | None):
+            Complete list of the service's images.
+
+    Returns:
+    -------
+        CatalogUpdate.
+
+    Raises:
+    ------
+        LookupError: No compute service, belonging to a provider, has this endpoint.
+        ValueError: Private items refer to projects missing from the provider.
+    """
+    flavor_data = [i.dict() for i in flavors or []]
+    image_data = [i.dict() for i in images or []]
+    for item in image_data:
+        item["search_tags"] = " ".join(item["tags"])
+        item["fingerprint"] = fingerprint(item)
+    uuids = {j for i in (*flavor_data, *image_data) for j in i.get("projects", [])}
+    results, _ = db.cypher_query(
+        catalog_query,
+        {
+            "endpoint": endpoint,
+            "projects": list(uuids),
+            "fingerprints": list({i["fingerprint"] for i in image_data}),
+        },
+    )
+    if not results:
+        raise LookupError(f"No compute service with endpoint {endpoint}")
+    service, projects, stored_flavors, stored_images, equivalent = results[0]
+    projects = dict(projects)
+    missing = uuids.difference(projects)
+    if missing:
+        raise ValueError(f"Unknown projects: {', '.join(sorted(missing))}")
+
+    counts = {}
+    changes: list[Change] = []
+    for name, kind, data, stored in (
+        ("flavors", FLAVORS, flavor_data, stored_flavors),
+        ("images", IMAGES, image_data, stored_images),
+    ):
+        if (flavors if kind is FLAVORS else images) is None:
+            continue
+        plan = _plan(kind, service, data, stored, projects, equivalent)
+        counts[name] = plan.apply()
+        changes += plan.changes
+    if is_enabled():
+        notify(changes)
+    return CatalogUpdate(service, **counts)
+
+
+def _plan(
+    kind: CatalogKind,
+    service: str,
+    data: list[dict[str, Any]],
+    stored: list[list[Any]],
+    projects: Mapping[str, str],
+    equivalent: list[list[Any]],
+) -> _Plan:
+    """Compare the given items with the stored ones and return the needed writes."""
+    plan = _Plan(kind, service)
+    current = {node["uuid"]: (node, set(links), n) for node, links, n in stored}
+    reusable: dict[str, str] = {}
+    for key, uid in equivalent:
+        reusable.setdefault(key, uid)
+    for item in data:
+        model = kind.shared if item["is_shared"] else kind.private
+        properties = model.deflate(item)
+        properties[CONTENT_HASH] = content_hash(properties)
+        wanted = {projects[i] for i in item.get("projects", [])}
+        node, links, services = current.pop(item["uuid"], (None, set(), 0))
+        if node is not None:
+            same_model = model.__label__ in node.labels
+            same_item = services == 1 or node.get("fingerprint") == item.get(
+                "fingerprint"
+            )
+            if same_model and same_item:
+                instance = model.inflate(node)
+                plan.update(
+                    model,
+                    instance.uid,
+                    properties,
+                    model.deflate(instance.__properties__, instance),
+                )
+                plan.link(model, instance.uid, wanted, links)
+                continue
+            plan.remove(_model(kind, node), node["uid"], links, services)
+        plan.add(model, properties, wanted, reuse=reusable.get(item.get("fingerprint")))
+    for node, links, services in current.values():
+        plan.remove(_model(kind, node), node["uid"], links, services)
+    return plan
+
+
+def _model(kind: CatalogKind, node: Any) -> type[TrackedNode]:
+    """Return the model of a stored item."""
+    return kind.shared if kind.shared.__label__ in node.labels else kind.private
@@ -1,19 +1,24 @@
 """Neomodel models of the Service supplied by a Provider on a specific Region."""
 
+from collections.abc import Sequence
+
 from neomodel import (
-    One,
     RelationshipFrom,
     RelationshipTo,
     StringProperty,
-    StructuredNode,
     UniqueIdProperty,
-    ZeroOrMore,
+    db,
 )
 
+from fedreg.changes import One, TrackedNode, ZeroOrMore, is_enabled, notify
+from fedreg.hashing import CONTENT_HASH, content_hash
+from fedreg.image.models import Image, PrivateImage, SharedImage, fingerprint
+from fedreg.image.schemas import PrivateImageCreate, SharedImageCreate
+from fedreg.service.catalog import IMAGES, _Plan
 from fedreg.service.enum import ServiceType
 
 
-class Service(StructuredNode):
+class Service(TrackedNode):
     """Service supplied by a Provider on a specific Region.
 
     Common attributes to all service types.
@@ -108,6 +113,61 @@ class ComputeService(Service):
             if len(item.services) == 1:
                 item.delete()
 
+    def add_images(
+        self, images: Sequence[PrivateImageCreate | SharedImageCreate]
+    ) -> list[Image]:
+        """Make the given images available on this service, reusing equivalent ones.
+
+        Images already in the DB with the same fingerprint are reused instead of
+        creating a copy: shared images published by any service, private ones only
+        when published by a service of the same provider (see `Image.find_reusable`).
+        Lookup is a single query; missing images and missing relationships are
+        written with a single `UNWIND` statement, as `upsert_catalog` does. Changes
+        are sent to the `fedreg.changes` listeners when change capture is enabled.
+
+        Args:
+        ----
+            images (Sequence[PrivateImageCreate | SharedImageCreate]): Images to add.
+
+        Returns:
+        -------
+            list[Image]. Nodes of the given images, in the same order.
+        """
+        data = [i.dict() for i in images]
+        keys = [fingerprint(i) for i in data]
+        found = Image.find_reusable(keys, self.uid)
+        plan = _Plan(IMAGES, self.uid)
+        created: dict[str, str] = {}
+        uids = []
+        for key, item in zip(keys, data, strict=True):
+            if key in found:
+                node, connected = found[key]
+                if not connected:
+                    plan.add(type(node), {}, set(), reuse=node.uid)
+                    found[key] = (node, True)
+                uids.append(node.uid)
+                continue
+            if key not in created:
+                model = SharedImage if item["is_shared"] else PrivateImage
+                item["search_tags"] = " ".join(item["tags"])
+                item["fingerprint"] = key
+                properties = model.deflate(item)
+                properties[CONTENT_HASH] = content_hash(properties)
+                plan.add(model, properties, set())
+                created[key] = properties["uid"]
+            uids.append(created[key])
+        nodes = {node.uid: node for node, _ in found.values()}
+        if plan.added:
+            results, _ = db.cypher_query(
+                f"{IMAGES.upsert_query()} RETURN n",
+                {"service": self.uid, "rows": plan.added},
+                resolve_objects=True,
+            )
+            nodes.update((i.uid, i) for (i,) in results)
+            if is_enabled():
+                notify(plan.changes)
+        return [nodes[i] for i in uids]
+
 
 class IdentityService(Service):
     """Service managing user access to the Provider.
@@ -1,18 +1,30 @@
-"""Neomodel model of the Service Level Agreement between a Project and a User Group."""
+"""Neomodel model of the Service Level Agreement between a Project and a User Group.
+
+Extended read schemas built within `active_only` leave out the SLAs not active on the
+given day, checking the dates of the already loaded nodes.
+"""
+
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date, timedelta
+from typing import Any
 
 from neomodel import (
     DateProperty,
-    One,
-    OneOrMore,
     RelationshipFrom,
     RelationshipTo,
     StringProperty,
-    StructuredNode,
     UniqueIdProperty,
+    db,
 )
 
+from fedreg.changes import One, OneOrMore, TrackedNode
+
+_active_on: ContextVar[date | None] = ContextVar("active_on", default=None)
 
-class SLA(StructuredNode):
+
+class SLA(TrackedNode):
     """Service Level Agreement between a Project and a User Group.
 
     An SLA defines the services and the resources a single User Group can use on
@@ -20,6 +32,8 @@ class SLA(StructuredNode):
     user group leader and
     the site admin.
     An SLA has a start and end date (which must be greater then the start date).
+    An SLA is active from its start date to its end date, both included. Dates are
+    indexed to efficiently look for active, expiring and lapsed SLAs.
 
     Attributes:
     ----------
@@ -32,8 +46,8 @@ class SLA(StructuredNode):
 
     uid = UniqueIdProperty()
     description = StringProperty(default="")
-    start_date = DateProperty(required=True)
-    end_date = DateProperty(required=True)
+    start_date = DateProperty(required=True, index=True)
+    end_date = DateProperty(required=True, index=True)
     doc_uuid = StringProperty(required=True)
 
     user_group = RelationshipFrom(
@@ -42,3 +56,110 @@ class SLA(StructuredNode):
     projects = RelationshipTo(
         "fedreg.project.models.Project", "REFER_TO", cardinality=OneOrMore
     )
+
+    interval_query = """
+        MATCH (s:SLA)
+        WHERE {condition}
+        MATCH (g:UserGroup)-[:`AGREE`]->(s)
+        OPTIONAL MATCH (s)-[:`REFER_TO`]->(p:Project)
+        WITH s, g, p
+        ORDER BY p.uid
+        RETURN s, g, collect(p)
+        ORDER BY s.end_date, s.uid
+        """
+
+    @classmethod
+    def active_at(cls, day: date | None = None) -> list[tuple[Any, Any, list[Any]]]:
+        """Find the SLAs active on the given day (default today).
+
+        Args:
+        ----
+            day (date | None): Target day.
+
+        Returns:
+        -------
+            list[tuple[SLA, UserGroup, list[Project]]]. SLAs with their user group and
+            target projects, sorted by end date.
+        """
+        return cls._interval(
+            "s.start_date <= $day AND s.end_date >= $day", day=day or date.today()
+        )
+
+    @classmethod
+    def expiring_within(
+        cls, days: int, *, day: date | None = None
+    ) -> list[tuple[Any, Any, list[Any]]]:
+        """Find the SLAs active on the given day and ending in the next `days` days.
+
+        Returns the same rows of `active_at`.
+        """
+        day = day or date.today()
+        return cls._interval(
+            "s.end_date >= $day AND s.end_date <= $until AND s.start_date <= $day",
+            day=day,
+            until=day + timedelta(days=days),
+        )
+
+    @classmethod
+    def lapsed(cls, day: date | None = None) -> list[tuple[Any, Any, list[Any]]]:
+        """Find the SLAs ended before the given day (default today).
+
+        Returns the same rows of `active_at`.
+        """
+        return cls._interval("s.end_date < $day", day=day or date.today())
+
+    @classmethod
+    def active_uids(cls, uids: Iterable[str], day: date | None = None) -> set[str]:
+        """Return the uids, among the given ones, of the SLAs active on the given day.
+
+        Use it to drop expired agreements from multiple read schemas with a single
+        query.
+        """
+        results, _ = db.cypher_query(
+            """
+                MATCH (s:SLA)
+                WHERE s.uid IN $uids AND s.start_date <= $day AND s.end_date >= $day
+                RETURN s.uid
+            """,
+            {"uids": list(uids), "day": (day or date.today()).isoformat()},
+        )
+        return {row[0] for row in results}
+
+    def is_active(self, day: date | None = None) -> bool:
+        """Return True if the SLA is active on the given day (default today)."""
+        day = day or date.today()
+        return self.start_date <= day <= self.end_date
+
+    @classmethod
+    def _interval(
+        cls, condition: str, **dates: date
+    ) -> list[tuple[Any, Any, list[Any]]]:
+        """Run the interval query with the given condition on the SLA dates.
+
+        Dates are stored as ISO strings, whose order matches the dates order.
+        """
+        results, _ = db.cypher_query(
+            cls.interval_query.format(condition=condition),
+            {k: v.isoformat() for k, v in dates.items()},
+            resolve_objects=True,
+        )
+        return [tuple(row) for row in results]
+
+
+@contextmanager
+def active_only(day: date | None = None) -> Iterator[None]:
+    """Hide the SLAs not active on the given day (default today) from the extended
+    read schemas built in the block.
+
+    Both lists of SLAs and the single SLA of a project are filtered.
+    """
+    token = _active_on.set(day or date.today())
+    try:
+        yield
+    finally:
+        _active_on.reset(token)
+
+
+def hides_inactive() -> date | None:
+    """Return the day SLAs must be active on within an `active_only` block."""
+    return _active_on.get()
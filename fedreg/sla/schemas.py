@@ -51,6 +51,11 @@ class SLABase(SLABasePublic):
             assert start < v, f"Start date {start} greater or equal than end date {v}"
         return v
 
+    def is_active(self, day: date | None = None) -> bool:
+        """Return True if the SLA is valid on the given day (default today)."""
+        day = day or date.today()
+        return self.start_date <= day <= self.end_date
+
 
 class SLACreate(BaseNodeCreate, SLABase):
     """Model to create an SLA.
@@ -0,0 +1,291 @@
+"""Compact snapshot export and import of the federation registry graph.
+
+A snapshot is a ZIP archive (deflate compressed) with:
+
+- `manifest.json`: format version and the number of exported nodes and
+  relationships for each label set and relationship type.
+- `nodes/<labels>/<chunk>.json`: columnar chunks with the properties of the nodes
+  having exactly that label set. Each property is a list of values, aligned with the
+  `uid` column.
+- `relationships/<type>/<chunk>.json`: columnar chunks with the `start` and `end`
+  uids of the relationships of that type, the labels used to look up their nodes,
+  `start_label` and `end_label`, and their properties.
+
+Nodes are identified only by their `uid`. Exporter and importer work in batches so
+that neither the whole graph nor the whole archive is kept in memory: relationship
+chunks carry the labels of their nodes, so the importer does not keep the uids of the
+imported nodes. The import runs in a single transaction.
+"""
+
+import json
+import zipfile
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from typing import IO, Any
+
+from neo4j.spatial import Point
+from neomodel import db
+
+from fedreg.location.models import Location
+
+FORMAT = "fedreg-snapshot"
+FORMAT_VERSION = 1
+DEFAULT_BATCH_SIZE = 5000
+MANIFEST = "manifest.json"
+NODES_DIR = "nodes"
+RELS_DIR = "relationships"
+LABEL_SEP = ":"
+REL_KEYS = ["start", "end", "start_label", "end_label"]
+
+
+def export_snapshot(
+    file: str | IO[bytes], *, batch_size: int = DEFAULT_BATCH_SIZE
+) -> dict[str, Any]:
+    """Export all the nodes with a uid, and the relationships between them.
+
+    Args:
+    ----
+        file (str | IO[bytes]): Destination path or binary file object.
+        batch_size (int): Number of nodes read from the DB for each query.
+
+    Returns:
+    -------
+        dict[str, Any]. The snapshot manifest.
+    """
+    manifest = {
+        "format": FORMAT,
+        "version": FORMAT_VERSION,
+        "nodes": {},
+        "relationships": {},
+    }
+    label_sets = read_label_sets()
+    with zipfile.ZipFile(file, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for labels in label_sets:
+            key = LABEL_SEP.join(labels)
+            total = 0
+            for i, rows in enumerate(read_nodes(labels, batch_size)):
+                _write_chunk(zf, f"{NODES_DIR}/{key}/{i}.json", rows, ["uid"])
+                total += len(rows)
+            manifest["nodes"][key] = total
+
+        chunks = defaultdict(int)
+        for labels in label_sets:
+            for batch in read_relationships(labels, batch_size):
+                for rel_type, rows in batch.items():
+                    name = f"{RELS_DIR}/{rel_type}/{chunks[rel_type]}.json"
+                    _write_chunk(zf, name, rows, REL_KEYS)
+                    chunks[rel_type] += 1
+                    tot = manifest["relationships"].get(rel_type, 0)
+                    manifest["relationships"][rel_type] = tot + len(rows)
+
+        zf.writestr(MANIFEST, json.dumps(manifest))
+    return manifest
+
+
+def _read_manifest(zf: zipfile.ZipFile) -> dict[str, Any]:
+    """Read the snapshot manifest and check its format and version."""
+    manifest = json.loads(zf.read(MANIFEST))
+    if manifest.get("format") != FORMAT:
+        raise ValueError("Not a fedreg snapshot")
+    if manifest.get("version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot version {manifest.get('version')}")
+    return manifest
+
+
+def import_snapshot(
+    file: str | IO[bytes], *, batch_size: int = DEFAULT_BATCH_SIZE
+) -> dict[str, Any]:
+    """Bulk load a snapshot into the DB.
+
+    The target DB is expected not to contain nodes with the same uids. Nodes are
+    created first, then the relationships between them. Each batch is written with a
+    single `UNWIND` statement. Derived location points are rebuilt at the end. All
+    writes run in a single transaction, the caller's one if open: a failing import
+    leaves the DB unchanged.
+
+    Args:
+    ----
+        file (str | IO[bytes]): Source path or binary file object.
+        batch_size (int): Number of rows written to the DB for each query.
+
+    Returns:
+    -------
+        dict[str, Any]. The snapshot manifest.
+
+    Raises:
+    ------
+        ValueError: When the file is not a snapshot of a supported version.
+    """
+    with zipfile.ZipFile(file, "r") as zf:
+        manifest = _read_manifest(zf)
+        if db._active_transaction is not None:
+            _import(zf, manifest, batch_size)
+        else:
+            with db.transaction:
+                _import(zf, manifest, batch_size)
+    return manifest
+
+
+def _import(zf: zipfile.ZipFile, manifest: dict[str, Any], batch_size: int) -> None:
+    """Create the nodes and the relationships of the snapshot, chunk by chunk."""
+    for key in manifest["nodes"]:
+        labels = key.split(LABEL_SEP)
+        for rows in _read_chunks(zf, f"{NODES_DIR}/{key}/"):
+            for i in range(0, len(rows), batch_size):
+                _create_nodes(labels, rows[i : i + batch_size])
+
+    for rel_type in manifest["relationships"]:
+        for rows in _read_chunks(zf, f"{RELS_DIR}/{rel_type}/"):
+            groups = defaultdict(list)
+            for row in rows:
+                start, end, start_label, end_label = (row.pop(i) for i in REL_KEYS)
+                groups[(start_label, end_label)].append(
+                    {"start": start, "end": end, "props": row}
+                )
+            for (start_label, end_label), group in groups.items():
+                for i in range(0, len(group), batch_size):
+                    _create_relationships(
+                        rel_type, start_label, end_label, group[i : i + batch_size]
+                    )
+    Location.refresh_points()
+
+
+def read_label_sets() -> list[list[str]]:
+    """Return the sorted label sets of the nodes with a uid."""
+    results, _ = db.cypher_query(
+        """
+            MATCH (n)
+            WHERE n.uid IS NOT NULL
+            RETURN DISTINCT labels(n)
+        """
+    )
+    return [list(i) for i in sorted({tuple(sorted(row[0])) for row in results})]
+
+
+def read_nodes(labels: list[str], batch_size: int) -> Iterator[list[dict[str, Any]]]:
+    """Yield batches of node properties with exactly the given labels.
+
+    Spatial values are derived from other properties and are skipped.
+    """
+    match = "".join(f":`{label}`" for label in labels)
+    after = ""
+    while True:
+        results, _ = db.cypher_query(
+            f"""
+                MATCH (n{match})
+                WHERE n.uid > $after AND size(labels(n)) = $size
+                RETURN properties(n)
+                ORDER BY n.uid
+                LIMIT $limit
+            """,
+            {"after": after, "size": len(labels), "limit": batch_size},
+        )
+        if not results:
+            return
+        yield [
+            {k: v for k, v in row[0].items() if not isinstance(v, Point)}
+            for row in results
+        ]
+        after = results[-1][0]["uid"]
+
+
+def read_relationships(
+    labels: list[str], batch_size: int
+) -> Iterator[dict[str, list[dict[str, Any]]]]:
+    """Yield, grouped by type, the outgoing relationships of batches of nodes.
+
+    Only nodes with exactly the given labels are considered. Nodes are looked up by
+    the first of their sorted labels.
+    """
+    match = "".join(f":`{label}`" for label in labels)
+    after = ""
+    while True:
+        results, _ = db.cypher_query(
+            f"""
+                MATCH (a{match})
+                WHERE a.uid > $after AND size(labels(a)) = $size
+                WITH a
+                ORDER BY a.uid
+                LIMIT $limit
+                OPTIONAL MATCH (a)-[r]->(b)
+                WHERE b.uid IS NOT NULL
+                RETURN a.uid, type(r), b.uid, labels(b), properties(r)
+            """,
+            {"after": after, "size": len(labels), "limit": batch_size},
+        )
+        if not results:
+            return
+        batch = defaultdict(list)
+        for start, rel_type, end, end_labels, props in results:
+            if rel_type is not None:
+                batch[rel_type].append(
+                    {
+                        **props,
+                        "start": start,
+                        "end": end,
+                        "start_label": labels[0],
+                        "end_label": min(end_labels),
+                    }
+                )
+        yield batch
+        after = max(row[0] for row in results)
+
+
+def _write_chunk(
+    zf: zipfile.ZipFile, name: str, rows: list[dict[str, Any]], keys: list[str]
+) -> None:
+    """Write a list of rows as a columnar chunk.
+
+    The given keys come first, then the remaining ones in alphabetical order. Missing
+    values are stored as null.
+    """
+    columns = keys + sorted({k for row in rows for k in row} - set(keys))
+    data = {col: [row.get(col) for row in rows] for col in columns}
+    zf.writestr(name, json.dumps(data, separators=(",", ":")))
+
+
+def _read_chunks(zf: zipfile.ZipFile, prefix: str) -> Iterable[list[dict[str, Any]]]:
+    """Yield the rows of the columnar chunks in the given folder.
+
+    Null values are dropped since neo4j does not store null properties.
+    """
+    names = [i for i in zf.namelist() if i.startswith(prefix)]
+    for name in sorted(names, key=lambda i: int(i[len(prefix) : -len(".json")])):
+        data = json.loads(zf.read(name))
+        columns = list(data.keys())
+        yield [
+            {col: val for col, val in zip(columns, values) if val is not None}
+            for values in zip(*data.values())
+        ]
+
+
+def _create_nodes(labels: list[str], rows: list[dict[str, Any]]) -> None:
+    """Create a batch of nodes with the given labels."""
+    match = "".join(f":`{label}`" for label in labels)
+    db.cypher_query(
+        f"""
+            UNWIND $rows AS row
+            CREATE (n{match})
+            SET n = row
+        """,
+        {"rows": rows},
+    )
+
+
+def _create_relationships(
+    rel_type: str, start_label: str, end_label: str, rows: list[dict[str, Any]]
+) -> None:
+    """Create a batch of relationships of the given type.
+
+    Start and end labels are used to look up the nodes through the uid index.
+    """
+    db.cypher_query(
+        f"""
+            UNWIND $rows AS row
+            MATCH (a:`{start_label}` {{uid: row.start}})
+            MATCH (b:`{end_label}` {{uid: row.end}})
+            CREATE (a)-[r:`{rel_type}`]->(b)
+            SET r = row.props
+        """,
+        {"rows": rows},
+    )
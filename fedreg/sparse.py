@@ -0,0 +1,434 @@
+"""Sparse fieldsets: read only the selected attributes of a node and its neighbours.
+
+Read schemas always hydrate every property, and extended read schemas load every
+nested relationship with a query each. Clients often need only a few attributes.
+
+A selection is a list of dotted paths over a read schema, for example
+`"uid,name,service.endpoint,service.region.name"`. `*` selects all the properties of
+a level and the etag. A relationship without sub-fields selects all the properties of
+the related schema, none of its relationships. `sparse_view` turns a selection into a
+`SparseView`:
+
+- a pydantic model, a subclass of the read schema keeping only the selected fields,
+  so validation runs the same validators on fewer values;
+- a Cypher map projection returning only the selected properties. Relationships are
+  resolved with `COLLECT` subqueries, ordered by uid, so a whole page of nested items
+  is read with a single query. Relationships whose schema is a union, such as the
+  services of a region, pick the projection of each item by label.
+
+`expand_view` selects all the properties of an extended read schema and only the
+relationships listed in an expansion specification, for example
+`"regions.services.quotas"`: shallow requests do not pay for deep graphs.
+
+Views are cached by node class, schema and normalized selection, so repeated requests
+do not rebuild models nor queries.
+
+Example:
+-------
+    view = sparse_view(Flavor, FlavorReadExtended, "uid,name,service.endpoint")
+    items = view.fetch(limit=100)
+    view = expand_view(Provider, ProviderReadExtended, "regions.services.quotas")
+"""
+
+import copy
+import functools
+from collections.abc import Iterable, Sequence
+from types import UnionType
+from typing import Any, NamedTuple, Union, get_args, get_origin
+
+from neomodel import One, StructuredNode, StructuredRel, ZeroOrOne, db
+from neomodel.properties import Property
+from neomodel.util import INCOMING, OUTGOING
+from pydantic import BaseModel, create_model
+from pydantic.fields import SHAPE_LIST, SHAPE_SINGLETON, ModelField
+
+from fedreg.hashing import ETAG, etag_expression
+
+RELATIONSHIP_FIELD = "relationship"
+DISCRIMINATOR = "type"
+WILDCARD = "*"
+SPARSE_CACHE_SIZE = 256
+
+Selection = tuple[tuple[str, "Selection"], ...]
+
+
+class SparseView(NamedTuple):
+    """Trimmed read schema and the matching Cypher projection.
+
+    Attributes:
+    ----------
+        node_class (type of StructuredNode): Model of the read nodes.
+        model (type of BaseModel): Read schema with only the selected fields.
+        projection (str): Cypher map projection of the node `n`.
+    """
+
+    node_class: type[StructuredNode]
+    model: type[BaseModel]
+    projection: str
+
+    def query(self, *, by_uid: bool = False) -> str:
+        """Return the query reading a page of nodes.
+
+        With by_uid, only the nodes with uid in `$uids` are read. The two variants
+        are separate queries so that the filtered one can use the uid index.
+        """
+        where = "WHERE n.uid IN $uids" if by_uid else ""
+        return f"""
+            MATCH (n:{self.node_class.__label__})
+            {where}
+            RETURN {self.projection}
+            ORDER BY n.uid
+            SKIP $skip
+            LIMIT $limit
+            """
+
+    def fetch(
+        self,
+        uids: Sequence[str] | None = None,
+        *,
+        skip: int = 0,
+        limit: int | None = None,
+    ) -> list[BaseModel]:
+        """Read the selected fields of the nodes, ordered by uid.
+
+        Args:
+        ----
+            uids (Sequence[str] | None): Uids of the nodes to read. All when None.
+            skip (int): Number of nodes to skip.
+            limit (int | None): Maximum number of nodes. No limit when None.
+
+        Returns:
+        -------
+            list[BaseModel]. Instances of `model`.
+        """
+        results, _ = db.cypher_query(
+            self.query(by_uid=uids is not None),
+            {
+                "uids": None if uids is None else list(uids),
+                "skip": skip,
+                "limit": (2**63 - 1) if limit is None else limit,
+            },
+        )
+        return [self.model.parse_obj(row[0]) for row in results]
+
+    def parse(self, data: dict[str, Any]) -> BaseModel:
+        """Validate a projected map read by a custom query."""
+        return self.model.parse_obj(data)
+
+
+def parse_fields(fields: str | Iterable[str]) -> Selection:
+    """Normalize a field selection.
+
+    Args:
+    ----
+        fields (str | Iterable[str]): Comma separated string or iterable of dotted
+            paths.
+
+    Returns:
+    -------
+        Selection. Sorted tree of (field name, sub-selection) pairs. Usable as a
+        cache key.
+    """
+    tree = _tree(fields)
+    if not tree:
+        raise ValueError("Empty field selection")
+    return _freeze(tree)
+
+
+def parse_expand(expand: str | Iterable[str]) -> Selection:
+    """Normalize an expansion specification into a field selection.
+
+    Each dotted path lists relationships to load, for example
+    `"regions.services.quotas"`. The returned selection has all the properties of
+    the root and of each expanded relationship; relationships not listed are not
+    loaded.
+
+    Args:
+    ----
+        expand (str | Iterable[str]): Comma separated string or iterable of dotted
+            paths. Empty to read only the root properties.
+
+    Returns:
+    -------
+        Selection.
+    """
+    return _freeze(_tree(expand), wildcard=True)
+
+
+def sparse_view(
+    node_class: type[StructuredNode],
+    schema: type[BaseModel],
+    fields: str | Iterable[str] | Selection,
+) -> SparseView:
+    """Return the cached view of the selected fields of a read schema.
+
+    Args:
+    ----
+        node_class (type[StructuredNode]): Model of the read nodes.
+        schema (type[BaseModel]): Read schema, possibly extended.
+        fields (str | Iterable[str] | Selection): Dotted paths, as accepted by
+            `parse_fields`, or an already parsed selection.
+
+    Returns:
+    -------
+        SparseView.
+
+    Raises:
+    ------
+        ValueError: A field is not in the schema, or is neither a property nor a
+            relationship of the node class.
+    """
+    if isinstance(fields, str) or not _is_selection(fields):
+        fields = parse_fields(fields)
+    return _view(node_class, schema, fields)
+
+
+def expand_view(
+    node_class: type[StructuredNode],
+    schema: type[BaseModel],
+    expand: str | Iterable[str] = (),
+) -> SparseView:
+    """Return the cached view of an extended read schema loading only some relations.
+
+    Args:
+    ----
+        node_class (type[StructuredNode]): Model of the read nodes.
+        schema (type[BaseModel]): Extended read schema.
+        expand (str | Iterable[str]): Relationships to load, as accepted by
+            `parse_expand`.
+
+    Returns:
+    -------
+        SparseView.
+    """
+    return _view(node_class, schema, parse_expand(expand))
+
+
+@functools.lru_cache(maxsize=SPARSE_CACHE_SIZE)
+def _view(
+    node_class: type[StructuredNode], schema: type[BaseModel], selection: Selection
+) -> SparseView:
+    """Build model and projection. Cached."""
+    model, projection = _compile(node_class, schema, selection, "n", None)
+    return SparseView(node_class, model, projection)
+
+
+def _compile(
+    node_class: type[StructuredNode] | type[StructuredRel],
+    schema: type[BaseModel],
+    selection: Selection,
+    var: str,
+    rel: tuple[str, type[StructuredRel] | None] | None,
+) -> tuple[type[BaseModel], str]:
+    """Return the trimmed schema and the map projection of var.
+
+    rel is the variable and model of the relationship leading to var, when var is a
+    related node.
+    """
+    properties, relationships = _definitions(node_class)
+    names = dict(selection)
+    if not names or WILDCARD in names:
+        names.pop(WILDCARD, None)
+        for i in _wildcard(schema, properties, rel is not None and rel[1] is not None):
+            names.setdefault(i, ())
+
+    entries = []
+    overrides: dict[str, Any] = {}
+    for name, sub in sorted(names.items()):
+        field = schema.__fields__.get(name)
+        if field is None:
+            raise ValueError(f"Unknown field {name!r} of {schema.__name__}")
+        if name in properties and not sub:
+            entries.append(f".{name}")
+            continue
+        if name == ETAG and not sub:
+            entries.append(f"{name}: {etag_expression(var)}")
+            continue
+        if name in relationships:
+            type_, expr = _compile_relationship(
+                relationships[name], field, sub, f"{var}_{name}", var
+            )
+        elif name == RELATIONSHIP_FIELD and rel is not None and rel[1] is not None:
+            type_, expr = _compile(rel[1], field.type_, sub, rel[0], None)
+            if field.allow_none:
+                type_ = type_ | None
+        else:
+            raise ValueError(f"Field {name!r} of {schema.__name__} is not stored")
+        entries.append(f"{name}: {expr}")
+        overrides[name] = (type_, copy.copy(field.field_info))
+
+    model = create_model(
+        f"Sparse{schema.__name__}",
+        __base__=schema,
+        __module__=__name__,
+        **overrides,
+    )
+    model.__fields__ = {k: v for k, v in model.__fields__.items() if k in names}
+    return model, f"{var} {{{', '.join(entries)}}}"
+
+
+def _wildcard(
+    schema: type[BaseModel], properties: set[str], rel_model: bool
+) -> list[str]:
+    """Return the fields selected by the wildcard: stored properties and etag.
+
+    The relationship field is selected when the relationship leading to the node has
+    a model.
+    """
+    return [
+        i
+        for i in schema.__fields__
+        if i in properties or i == ETAG or (i == RELATIONSHIP_FIELD and rel_model)
+    ]
+
+
+def _compile_relationship(
+    definition: Any,
+    field: ModelField,
+    selection: Selection,
+    var: str,
+    source: str,
+) -> tuple[Any, str]:
+    """Return type and COLLECT subquery of a relationship field.
+
+    When the field type is a union, each member is matched to the subclass of the
+    related node class with the longest label prefixing the schema name, such as
+    `ComputeService` for `ComputeServiceReadExtended`. Each member gets its own
+    projection, chosen by label, and the sub-selection is applied to the members
+    having the selected fields; the others read only their `type`. Members always
+    keep their `type`, which tells them apart when the read items are validated.
+    """
+    definition.lookup_node_class()
+    target = definition.definition["node_class"]
+    rel_var = f"r_{var}"
+    rel_model = definition.definition.get("model")
+    members = (
+        get_args(field.type_)
+        if get_origin(field.type_) in (Union, UnionType)
+        else (field.type_,)
+    )
+    for name, _ in selection:
+        if name != WILDCARD and all(name not in i.__fields__ for i in members):
+            raise ValueError(f"Unknown field {name!r} of {field.name}")
+
+    models = []
+    cases = []
+    labels = []
+    for member in members:
+        node_class = target if len(members) == 1 else _member_class(target, member)
+        sub = tuple(
+            i for i in selection if i[0] == WILDCARD or i[0] in member.__fields__
+        )
+        if len(members) > 1 and selection and DISCRIMINATOR not in dict(sub):
+            sub = (*sub, (DISCRIMINATOR, ()))
+        model, projection = _compile(node_class, member, sub, var, (rel_var, rel_model))
+        models.append(model)
+        cases.append(f"WHEN {var}:{node_class.__label__} THEN {projection}")
+        labels.append(f"{var}:{node_class.__label__}")
+    pattern = _pattern(
+        source,
+        rel_var,
+        definition.definition["relation_type"],
+        definition.definition["direction"],
+        f"{var}:{target.__label__}",
+    )
+    if len(members) == 1:
+        value = projection
+        where = ""
+    else:
+        value = f"CASE {' '.join(cases)} END"
+        where = f" WHERE {' OR '.join(labels)}"
+    expr = f"COLLECT {{ MATCH {pattern}{where} RETURN {value} ORDER BY {var}.uid }}"
+
+    type_ = models[0] if len(models) == 1 else Union[tuple(models)]
+    if field.shape == SHAPE_LIST:
+        return list[type_], expr
+    if field.shape == SHAPE_SINGLETON and issubclass(
+        definition.manager, (One, ZeroOrOne)
+    ):
+        return (type_ | None if field.allow_none else type_), f"head({expr})"
+    raise ValueError(f"Unsupported relationship field {field.name!r}")
+
+
+def _member_class(target: type[StructuredNode], schema: type[BaseModel]) -> Any:
+    """Return the subclass of target read by a member of a union schema."""
+    candidates = [
+        i for i in _subclasses(target) if schema.__name__.startswith(i.__label__)
+    ]
+    if not candidates:
+        raise ValueError(f"No {target.__label__} class for {schema.__name__}")
+    return max(candidates, key=lambda i: len(i.__label__))
+
+
+def _subclasses(cls: type) -> list[type]:
+    """Return the class and all its subclasses."""
+    classes = [cls]
+    for item in classes:
+        classes.extend(item.__subclasses__())
+    return classes
+
+
+def _definitions(
+    cls: type[StructuredNode] | type[StructuredRel],
+) -> tuple[set[str], dict[str, Any]]:
+    """Return the properties and relationships of a class and of its subclasses.
+
+    Read schemas of a base class list the attributes of all the subclasses, such as
+    the projects of private flavors.
+    """
+    properties: set[str] = set()
+    relationships: dict[str, Any] = {}
+    for item in _subclasses(cls):
+        for name, value in item.defined_properties(aliases=False).items():
+            if isinstance(value, Property):
+                properties.add(name)
+            elif issubclass(item, StructuredNode):
+                relationships.setdefault(name, value)
+    return properties, relationships
+
+
+def _pattern(
+    var: str, rel_var: str, relation_type: str, direction: int, target: str
+) -> str:
+    """Return the pattern from var to the related node."""
+    rel = f"[{rel_var}:`{relation_type}`]"
+    if direction == OUTGOING:
+        return f"({var})-{rel}->({target})"
+    if direction == INCOMING:
+        return f"({var})<-{rel}-({target})"
+    return f"({var})-{rel}-({target})"
+
+
+def _tree(paths: str | Iterable[str]) -> dict[str, Any]:
+    """Return the nested dict of the dotted paths."""
+    if isinstance(paths, str):
+        paths = paths.split(",")
+    tree: dict[str, Any] = {}
+    for path in paths:
+        path = path.strip()
+        if not path:
+            continue
+        node = tree
+        for name in path.split("."):
+            if not name:
+                raise ValueError(f"Invalid field path: {path!r}")
+            node = node.setdefault(name, {})
+    return tree
+
+
+def _freeze(tree: dict[str, Any], *, wildcard: bool = False) -> Selection:
+    """Return the sorted tuple version of a selection tree.
+
+    With wildcard, add all the properties to each level.
+    """
+    items = {k: _freeze(v, wildcard=wildcard) for k, v in tree.items()}
+    if wildcard:
+        items[WILDCARD] = ()
+    return tuple(sorted(items.items()))
+
+
+def _is_selection(fields: Any) -> bool:
+    """Return True if fields is an already parsed selection."""
+    return isinstance(fields, tuple) and all(
+        isinstance(i, tuple) and len(i) == 2 and isinstance(i[1], tuple) for i in fields
+    )
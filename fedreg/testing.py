@@ -0,0 +1,26 @@
+"""Pytest plugin with fixtures to test the DB usage of fedreg objects.
+
+Enable it in a `conftest.py` with:
+
+    pytest_plugins = ["fedreg.testing"]
+"""
+
+from collections.abc import Callable
+from contextlib import AbstractContextManager
+
+import pytest
+
+from fedreg.instrumentation import QueryCollector, query_budget
+
+
+@pytest.fixture
+def query_budget_guard() -> Callable[..., AbstractContextManager[QueryCollector]]:
+    """Return the `query_budget` context manager.
+
+    Example:
+    -------
+        def test_read(query_budget_guard, provider_model):
+            with query_budget_guard(10, name="ProviderReadExtended"):
+                ProviderReadExtended.from_orm(provider_model)
+    """
+    return query_budget
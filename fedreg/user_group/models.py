@@ -1,21 +1,41 @@
 """Neomodel model of the User Group owned by an Identity Provider."""
 
+from collections.abc import Iterable
+from datetime import date
+from typing import Any
+
 from neomodel import (
-    One,
     RelationshipTo,
     StringProperty,
-    StructuredNode,
     UniqueIdProperty,
-    ZeroOrMore,
+    db,
 )
 
-# from app.flavor.models import Flavor
-# from app.image.models import Image
-# from app.provider.models import Provider
-# from app.service.models import Service
-
-
-class UserGroup(StructuredNode):
+from fedreg.changes import One, TrackedNode, ZeroOrMore
+
+ACCESS_PATTERNS = {
+    "flavors": [
+        "(p)-[:`CAN_USE_VM_FLAVOR`]->(u:Flavor)",
+        "(p)-[:`USE_SERVICE_WITH`]->(:ComputeQuota)-[:`APPLY_TO`]->(:ComputeService)"
+        "-[:`AVAILABLE_VM_FLAVOR`]->(u:SharedFlavor)",
+    ],
+    "images": [
+        "(p)-[:`CAN_USE_VM_IMAGE`]->(u:Image)",
+        "(p)-[:`USE_SERVICE_WITH`]->(:ComputeQuota)-[:`APPLY_TO`]->(:ComputeService)"
+        "-[:`AVAILABLE_VM_IMAGE`]->(u:SharedImage)",
+    ],
+    "networks": [
+        "(p)-[:`CAN_USE_NETWORK`]->(u:Network)",
+        "(p)-[:`USE_SERVICE_WITH`]->(:NetworkQuota)-[:`APPLY_TO`]->(:NetworkService)"
+        "-[:`AVAILABLE_NETWORK`]->(u:SharedNetwork)",
+    ],
+    "providers": ["(p)<-[:`BOOK_PROJECT_FOR_SLA`]-(u:Provider)"],
+    "services": ["(p)-[:`USE_SERVICE_WITH`]->(:Quota)-[:`APPLY_TO`]->(u:Service)"],
+    "quotas": ["(p)-[:`USE_SERVICE_WITH`]->(u:Quota)"],
+}
+
+
+class UserGroup(TrackedNode):
     """User Group owned by an Identity Provider.
 
     A User Group has a name which could not be unique
@@ -42,74 +62,149 @@ class UserGroup(StructuredNode):
         cardinality=One,
     )
 
+    access_prefix = """
+        UNWIND $uids AS uid
+        MATCH (g:UserGroup {uid: uid})-[:`AGREE`]->(s:SLA)-[:`REFER_TO`]->(p:Project)
+        WHERE $day IS NULL OR (s.start_date <= $day AND s.end_date >= $day)
+        """
+
+    @classmethod
+    def flavors(
+        cls, uids: Iterable[str], *, day: date | None = None
+    ) -> dict[str, list[tuple[Any, list[tuple[str, str]]]]]:
+        """List the flavors the given user groups can access.
+
+        A single query retrieves, for all the user groups, the private flavors of
+        their projects and the shared flavors of the compute services their projects
+        have quotas on. Each flavor is returned once per user group, with all the
+        projects, and related SLAs, granting access to it.
+
+        Args:
+        ----
+            uids (Iterable[str]): User groups uids.
+            day (date | None): If set, consider only the SLAs active on that day.
+
+        Returns:
+        -------
+            dict[str, list[tuple[Flavor, list[tuple[str, str]]]]]. For each user group
+            uid, the flavors sorted by uid with the list of (project uid, SLA uid).
+        """
+        return cls._access("flavors", uids, day=day)
+
+    @classmethod
+    def images(
+        cls, uids: Iterable[str], *, day: date | None = None
+    ) -> dict[str, list[tuple[Any, list[tuple[str, str]]]]]:
+        """List the images the given user groups can access.
+
+        Arguments and results have the same meaning as in `flavors`.
+        """
+        return cls._access("images", uids, day=day)
+
+    @classmethod
+    def networks(
+        cls, uids: Iterable[str], *, day: date | None = None
+    ) -> dict[str, list[tuple[Any, list[tuple[str, str]]]]]:
+        """List the networks the given user groups can access.
+
+        Arguments and results have the same meaning as in `flavors`.
+        """
+        return cls._access("networks", uids, day=day)
+
+    @classmethod
+    def providers(
+        cls, uids: Iterable[str], *, day: date | None = None
+    ) -> dict[str, list[tuple[Any, list[tuple[str, str]]]]]:
+        """List the providers hosting the projects of the given user groups.
+
+        Arguments and results have the same meaning as in `flavors`.
+        """
+        return cls._access("providers", uids, day=day)
+
+    @classmethod
+    def services(
+        cls,
+        uids: Iterable[str],
+        *,
+        day: date | None = None,
+        type: str | None = None,
+        name: str | None = None,
+    ) -> dict[str, list[tuple[Any, list[tuple[str, str]]]]]:
+        """List the services the projects of the given user groups have quotas on.
+
+        Arguments and results have the same meaning as in `flavors`. Services can be
+        filtered by type and name.
+        """
+        return cls._access(
+            "services",
+            uids,
+            day=day,
+            filters={"type": type, "name": name},
+        )
+
+    @classmethod
+    def quotas(
+        cls,
+        uids: Iterable[str],
+        *,
+        day: date | None = None,
+        type: str | None = None,
+    ) -> dict[str, list[tuple[Any, list[tuple[str, str]]]]]:
+        """List the quotas of the projects of the given user groups.
+
+        Arguments and results have the same meaning as in `flavors`. Quotas can be
+        filtered by type.
+        """
+        return cls._access("quotas", uids, day=day, filters={"type": type})
+
+    @classmethod
+    def _access(
+        cls,
+        item: str,
+        uids: Iterable[str],
+        *,
+        day: date | None,
+        filters: dict[str, Any] | None = None,
+    ) -> dict[str, list[tuple[Any, list[tuple[str, str]]]]]:
+        """Resolve the items of the given type reachable by the user groups.
+
+        Filter names are fixed by the callers, values are always passed as
+        parameters.
+        """
+        filters = filters or {}
+        union = "UNION".join(
+            f"""
+                WITH p
+                MATCH {pattern}
+                RETURN u
+            """
+            for pattern in ACCESS_PATTERNS[item]
+        )
+        conditions = " AND ".join(f"(${k} IS NULL OR u.{k} = ${k})" for k in filters)
+        results, _ = db.cypher_query(
+            f"""
+                {cls.access_prefix}
+                CALL {{
+                    {union}
+                }}
+                WITH g, u, p, s
+                WHERE {conditions or "true"}
+                RETURN g.uid, u, collect(DISTINCT [p.uid, s.uid])
+                ORDER BY g.uid, u.uid
+            """,
+            {
+                "uids": list(uids),
+                "day": day.isoformat() if day is not None else None,
+                **filters,
+            },
+            resolve_objects=True,
+        )
+        access = {}
+        for group, node, via in results:
+            access.setdefault(group, []).append((node, sorted(tuple(i) for i in via)))
+        return access
+
     def pre_delete(self):
         """Remove related SLAs."""
         for item in self.slas:
             item.delete()
-
-    # TODO Evaluate if they are useful depending on the dashboard communication
-    # procedure.
-
-    # query_prefix = """
-    #     MATCH (g:UserGroup)
-    #     WHERE (elementId(g)=$self)
-    #     MATCH (g)-[:AGREE]-(s)-[:REFER_TO]->(p)
-    #     """
-
-    # def flavors(self) -> list[Flavor]:
-    #     results, _ = self.cypher(
-    #         f"""
-    #             {self.query_prefix}
-    #             MATCH (p)-[:CAN_USE_VM_FLAVOR]->(u)
-    #             RETURN u
-    #         """
-    #     )
-    #     return [Flavor.inflate(row[0]) for row in results]
-
-    # def images(self) -> list[Image]:
-    #     results, _ = self.cypher(
-    #         f"""
-    #             {self.query_prefix}
-    #             MATCH (p)-[:CAN_USE_VM_IMAGE]->(u)
-    #             RETURN u
-    #         """
-    #     )
-    #     return [Image.inflate(row[0]) for row in results]
-
-    # def providers(self) -> list[Provider]:
-    #     results, _ = self.cypher(
-    #         f"""
-    #             {self.query_prefix}
-    #             MATCH (p)<-[:BOOK_PROJECT_FOR_SLA]-(u)
-    #             RETURN u
-    #         """
-    #     )
-    #     return [Provider.inflate(row[0]) for row in results]
-
-    # def services(self, **kwargs) -> list[Service]:
-    #     if not kwargs:
-    #         filters = ""
-    #     else:
-    #         filters = []
-    #         for k in kwargs.keys():
-    #             if k.startswith("service_"):
-    #                 start_idx = len("service_")
-    #                 attr = k[start_idx:]
-    #                 filters.append(f"u.{attr} = ${k}")
-    #             elif k.startswith("quota_"):
-    #                 start_idx = len("quota_")
-    #                 attr = k[start_idx:]
-    #                 filters.append(f"q.{attr} = ${k}")
-    #         filters = ", ".join(filters)
-    #         filters = "WHERE " + filters
-
-    #     results, _ = self.cypher(
-    #         f"""
-    #             {self.query_prefix}
-    #             MATCH (p)-[:USE_SERVICE_WITH]->(q)-[:APPLY_TO]->(u)
-    #             {filters}
-    #             RETURN u
-    #         """,
-    #         kwargs,
-    #     )
-    #     return [Service.inflate(row[0]) for row in results]
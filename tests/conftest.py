@@ -10,6 +10,7 @@ from neomodel import config, db
 from fedreg.flavor.models import Flavor, PrivateFlavor, SharedFlavor
 from fedreg.identity_provider.models import IdentityProvider
 from fedreg.image.models import Image, PrivateImage, SharedImage
+from fedreg.indexes import install_indexes
 from fedreg.location.models import Location
 from fedreg.network.models import Network, PrivateNetwork, SharedNetwork
 from fedreg.project.models import Project
@@ -48,6 +49,8 @@ from tests.models.utils import (
     user_group_model_dict,
 )
 
+pytest_plugins = ["fedreg.testing"]
+
 
 def pytest_addoption(parser):
     """
@@ -62,6 +65,12 @@ def pytest_addoption(parser):
         help="Ensures that the database is clear prior to running tests for neomodel",
         default=False,
     )
+    parser.addoption(
+        "--update-query-budgets",
+        action="store_true",
+        help="Overwrite the baseline query budgets with the measured values",
+        default=False,
+    )
 
 
 @pytest.fixture(scope="session", autouse=True)
@@ -91,6 +100,7 @@ def setup_neo4j_session(request):
 
         db.clear_neo4j_database(clear_constraints=True, clear_indexes=True)
         db.install_all_labels()
+    install_indexes()
 
     db.cypher_query(
         "CREATE OR REPLACE USER test SET PASSWORD 'foobarbaz' CHANGE NOT REQUIRED"
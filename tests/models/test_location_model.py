@@ -5,8 +5,14 @@ from neomodel import RelationshipManager, RequiredProperty
 from pytest_cases import parametrize_with_cases
 
 from fedreg.location.models import Location
+from fedreg.location.spatial import SpatialIndex
+from fedreg.provider.models import Provider
 from fedreg.region.models import Region
-from tests.models.utils import region_model_dict
+from tests.models.utils import (
+    location_model_dict,
+    provider_model_dict,
+    region_model_dict,
+)
 
 
 @parametrize_with_cases("data", has_tag=("dict", "valid"))
@@ -81,3 +87,60 @@ def test_multiple_linked_regions(location_model: Location) -> None:
     item = Region(**region_model_dict()).save()
     location_model.regions.connect(item)
     assert len(location_model.regions.all()) == 2
+
+
+def located_region(latitude: float, longitude: float) -> Region:
+    """Create a region, with its provider, at the given coordinates."""
+    location = Location(
+        **location_model_dict(), latitude=latitude, longitude=longitude
+    ).save()
+    region = Region(**region_model_dict()).save()
+    provider = Provider(**provider_model_dict()).save()
+    provider.regions.connect(region)
+    region.location.connect(location)
+    return region
+
+
+def test_nearest_regions() -> None:
+    """Find regions from closest to farthest, with their provider."""
+    bologna = located_region(44.49, 11.34)
+    rome = located_region(41.90, 12.50)
+    located_region(52.52, 13.40)
+    Region(**region_model_dict()).save()
+
+    rows = Location.nearest_regions(44.0, 11.0, limit=2)
+    assert [row[0].uid for row in rows] == [bologna.uid, rome.uid]
+    assert isinstance(rows[0][1], Provider)
+    assert rows[0][1].uid == bologna.provider.single().uid
+    assert 50 < rows[0][2] < 70
+
+    rows = Location.regions_within(44.0, 11.0, 400)
+    assert [row[0].uid for row in rows] == [bologna.uid, rome.uid]
+
+    index = SpatialIndex.regions()
+    assert len(index) == 3
+    cached = index.nearest(44.0, 11.0, 2)
+    assert [i[0][0].uid for i in cached] == [bologna.uid, rome.uid]
+    assert cached[0][1] == pytest.approx(rows[0][2], rel=1e-3)
+    assert [i[0][0].uid for i in index.within(44.0, 11.0, 400)] == [
+        bologna.uid,
+        rome.uid,
+    ]
+
+
+def test_point_follows_coordinates(location_model: Location) -> None:
+    """The indexed point is updated when coordinates change."""
+    location_model.latitude = 10.0
+    location_model.longitude = 20.0
+    location_model.save()
+    results, _ = location_model.cypher(
+        "MATCH (n) WHERE elementId(n)=$self RETURN n.point.y, n.point.x"
+    )
+    assert results[0] == [10.0, 20.0]
+
+    location_model.latitude = None
+    location_model.save()
+    results, _ = location_model.cypher(
+        "MATCH (n) WHERE elementId(n)=$self RETURN n.point"
+    )
+    assert results[0][0] is None
@@ -10,7 +10,9 @@ from fedreg.image.models import Image
 from fedreg.project.models import Project
 from fedreg.provider.enum import ProviderStatus
 from fedreg.provider.models import Provider
+from fedreg.quota.models import ComputeQuota
 from fedreg.region.models import Region
+from fedreg.service.models import ComputeService
 from tests.models.utils import (
     auth_method_model_dict,
     identity_provider_model_dict,
@@ -220,3 +222,38 @@ def test_provider_images(provider: Provider, tot_images: int) -> None:
     images = provider.images()
     assert len(images) == tot_images
     assert isinstance(images[0], Image)
+
+
+@parametrize_with_cases("provider, region, service", has_tag="catalog")
+def test_provider_catalog_filters(
+    provider: Provider, region: Region, service: ComputeService
+) -> None:
+    assert len(provider.images()) == 6
+    assert provider.count_images() == 6
+    assert len(provider.flavors()) == 6
+    assert provider.count_flavors() == 6
+    assert len(provider.images(region_uid=region.uid)) == 3
+    assert provider.count_images(region_uid=region.uid) == 3
+    assert len(provider.flavors(service_uid=service.uid)) == 3
+    assert provider.count_flavors(service_uid=service.uid) == 3
+    assert provider.networks() == []
+    assert provider.count_networks() == 0
+
+    quotas = provider.quotas()
+    assert len(quotas) == 1
+    assert isinstance(quotas[0], ComputeQuota)
+    assert provider.count_quotas(region_uid=region.uid) == 1
+
+
+@parametrize_with_cases("provider, region, service", has_tag="catalog")
+def test_provider_catalog_keyset_paging(
+    provider: Provider, region: Region, service: ComputeService
+) -> None:
+    uids = [i.uid for i in provider.images()]
+    assert uids == sorted(uids)
+
+    page1 = provider.images(limit=4)
+    assert [i.uid for i in page1] == uids[:4]
+    page2 = provider.images(after=page1[-1].uid, limit=4)
+    assert [i.uid for i in page2] == uids[4:]
+    assert provider.images(after=uids[-1]) == []
@@ -2,14 +2,18 @@ from typing import Any, Literal
 
 from pytest_cases import case
 
+from fedreg.flavor.models import SharedFlavor
 from fedreg.image.models import SharedImage
 from fedreg.provider.models import Provider
+from fedreg.quota.models import ComputeQuota
 from fedreg.region.models import Region
 from fedreg.service.enum import ServiceType
 from fedreg.service.models import ComputeService
 from tests.models.utils import (
+    flavor_model_dict,
     image_model_dict,
     provider_model_dict,
+    quota_model_dict,
     region_model_dict,
     service_model_dict,
 )
@@ -116,3 +120,28 @@ class CaseProviderImages:
         service1.images.connect(image1)
         service2.images.connect(image1)
         return provider, 1
+
+
+class CaseProviderCatalog:
+    @case(tags="catalog")
+    def case_two_regions(self) -> tuple[Provider, Region, ComputeService]:
+        provider = Provider(**provider_model_dict()).save()
+        region1 = Region(**region_model_dict()).save()
+        region2 = Region(**region_model_dict()).save()
+        service1 = ComputeService(
+            **service_model_dict(srv_type=ServiceType.COMPUTE)
+        ).save()
+        service2 = ComputeService(
+            **service_model_dict(srv_type=ServiceType.COMPUTE)
+        ).save()
+        provider.regions.connect(region1)
+        provider.regions.connect(region2)
+        region1.services.connect(service1)
+        region2.services.connect(service2)
+        for service in (service1, service2):
+            for _ in range(3):
+                service.images.connect(SharedImage(**image_model_dict()).save())
+                service.flavors.connect(SharedFlavor(**flavor_model_dict()).save())
+        quota = ComputeQuota(**quota_model_dict()).save()
+        quota.service.connect(service1)
+        return provider, region1, service1
@@ -1,3 +1,4 @@
+from datetime import date, timedelta
 from typing import Any
 from unittest.mock import patch
 
@@ -11,9 +12,15 @@ from neomodel import (
 from pytest_cases import parametrize_with_cases
 
 from fedreg.project.models import Project
-from fedreg.sla.models import SLA
+from fedreg.project.schemas_extended import ProjectReadExtended
+from fedreg.sla.models import SLA, active_only
 from fedreg.user_group.models import UserGroup
-from tests.models.utils import project_model_dict, user_group_model_dict
+from fedreg.user_group.schemas_extended import UserGroupReadExtended
+from tests.models.utils import (
+    project_model_dict,
+    sla_model_dict,
+    user_group_model_dict,
+)
 
 
 @parametrize_with_cases("data", has_tag=("dict", "valid"))
@@ -132,3 +139,68 @@ def test_multiple_linked_projects(sla_model: SLA) -> None:
     item = Project(**project_model_dict()).save()
     sla_model.projects.connect(item)
     assert len(sla_model.projects.all()) == 2
+
+
+def agreement(start: int, end: int, n_projects: int = 1) -> SLA:
+    """Create an SLA valid between today + start and today + end days."""
+    today = date.today()
+    data = sla_model_dict()
+    data["start_date"] = today + timedelta(days=start)
+    data["end_date"] = today + timedelta(days=end)
+    sla = SLA(**data).save()
+    UserGroup(**user_group_model_dict()).save().slas.connect(sla)
+    for _ in range(n_projects):
+        sla.projects.connect(Project(**project_model_dict()).save())
+    return sla
+
+
+def test_sla_interval_queries() -> None:
+    """Look for active, expiring and lapsed SLAs."""
+    active = agreement(-10, 100, n_projects=2)
+    expiring = agreement(-10, 5)
+    lapsed = agreement(-20, -1)
+    future = agreement(10, 20)
+
+    rows = SLA.active_at()
+    assert [row[0].uid for row in rows] == [expiring.uid, active.uid]
+    sla, user_group, projects = rows[1]
+    assert isinstance(user_group, UserGroup)
+    assert user_group.uid == active.user_group.single().uid
+    assert sorted(i.uid for i in projects) == sorted(
+        i.uid for i in active.projects.all()
+    )
+
+    assert [row[0].uid for row in SLA.expiring_within(30)] == [expiring.uid]
+    assert [row[0].uid for row in SLA.lapsed()] == [lapsed.uid]
+    day = date.today() + timedelta(days=15)
+    assert [row[0].uid for row in SLA.active_at(day)] == [future.uid, active.uid]
+
+    uids = [i.uid for i in (active, expiring, lapsed, future)]
+    assert SLA.active_uids(uids) == {active.uid, expiring.uid}
+    assert SLA.active_uids([]) == set()
+
+
+def test_active_only_schemas() -> None:
+    """Extended reads built within active_only leave out inactive SLAs."""
+    user_group = UserGroup(**user_group_model_dict()).save()
+    slas = []
+    for start, end in ((-10, 10), (-20, -1)):
+        data = sla_model_dict()
+        data["start_date"] = date.today() + timedelta(days=start)
+        data["end_date"] = date.today() + timedelta(days=end)
+        sla = SLA(**data).save()
+        user_group.slas.connect(sla)
+        sla.projects.connect(Project(**project_model_dict()).save())
+        slas.append(sla)
+
+    assert len(UserGroupReadExtended.from_orm(user_group).slas) == 2
+    with active_only():
+        item = UserGroupReadExtended.from_orm(user_group)
+    assert [i.uid for i in item.slas] == [slas[0].uid]
+
+    project = slas[1].projects.single()
+    assert ProjectReadExtended.from_orm(project).sla.uid == slas[1].uid
+    with active_only():
+        assert ProjectReadExtended.from_orm(project).sla is None
+    with active_only(date.today() - timedelta(days=5)):
+        assert ProjectReadExtended.from_orm(project).sla.uid == slas[1].uid
@@ -1,3 +1,4 @@
+from datetime import timedelta
 from typing import Any
 from unittest.mock import patch
 
@@ -11,10 +12,25 @@ from neomodel import (
 )
 from pytest_cases import parametrize_with_cases
 
+from fedreg.flavor.models import PrivateFlavor, SharedFlavor
 from fedreg.identity_provider.models import IdentityProvider
+from fedreg.project.models import Project
+from fedreg.provider.models import Provider
+from fedreg.quota.models import ComputeQuota
+from fedreg.service.enum import ServiceType
+from fedreg.service.models import ComputeService
 from fedreg.sla.models import SLA
 from fedreg.user_group.models import UserGroup
-from tests.models.utils import identity_provider_model_dict, sla_model_dict
+from tests.models.utils import (
+    flavor_model_dict,
+    identity_provider_model_dict,
+    project_model_dict,
+    provider_model_dict,
+    quota_model_dict,
+    service_model_dict,
+    sla_model_dict,
+    user_group_model_dict,
+)
 
 
 @parametrize_with_cases("data", has_tag=("dict", "valid"))
@@ -152,3 +168,49 @@ def test_pre_delete_hook(user_group_model: UserGroup) -> None:
         item1.refresh()
     with pytest.raises(DoesNotExist):
         item2.refresh()
+
+
+def test_access_resolution(user_group_model: UserGroup) -> None:
+    """Resolve resources reachable by multiple user groups with one query each.
+
+    Two projects of the same group reach the same shared flavor: it is returned once
+    with both projects.
+    """
+    other_group = UserGroup(**user_group_model_dict()).save()
+    provider = Provider(**provider_model_dict()).save()
+    service = ComputeService(**service_model_dict(ServiceType.COMPUTE)).save()
+    shared = SharedFlavor(**flavor_model_dict()).save()
+    service.flavors.connect(shared)
+    private = PrivateFlavor(**flavor_model_dict()).save()
+
+    sla = SLA(**sla_model_dict()).save()
+    user_group_model.slas.connect(sla)
+    projects = []
+    for _ in range(2):
+        project = Project(**project_model_dict()).save()
+        provider.projects.connect(project)
+        sla.projects.connect(project)
+        quota = ComputeQuota(**quota_model_dict()).save()
+        quota.service.connect(service)
+        project.quotas.connect(quota)
+        projects.append(project)
+    projects[0].private_flavors.connect(private)
+
+    uids = [user_group_model.uid, other_group.uid]
+    flavors = UserGroup.flavors(uids)
+    assert list(flavors) == [user_group_model.uid]
+    items = {i[0].uid: i for i in flavors[user_group_model.uid]}
+    assert set(items) == {shared.uid, private.uid}
+    assert isinstance(items[shared.uid][0], SharedFlavor)
+    assert items[shared.uid][1] == sorted((p.uid, sla.uid) for p in projects)
+    assert items[private.uid][1] == [(projects[0].uid, sla.uid)]
+
+    assert [i[0].uid for i in UserGroup.providers(uids)[user_group_model.uid]] == [
+        provider.uid
+    ]
+    services = UserGroup.services(uids, type=ServiceType.COMPUTE.value)
+    assert [i[0].uid for i in services[user_group_model.uid]] == [service.uid]
+    assert UserGroup.services(uids, type=ServiceType.NETWORK.value) == {}
+    assert len(UserGroup.quotas(uids)[user_group_model.uid]) == 2
+    assert UserGroup.images(uids) == {}
+    assert UserGroup.flavors(uids, day=sla.end_date + timedelta(days=1)) == {}
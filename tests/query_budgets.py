@@ -0,0 +1,153 @@
+"""Canonical graph and baseline query budgets.
+
+The canonical graph has one node for each kind of entity, all linked together: every
+extended read schema has at least one item for each relationship field. Budgets in
+`query_budgets.json` are the number of DB round trips measured on this graph; run
+`pytest --update-query-budgets` against Neo4j to regenerate them after an intended
+change. Checks without a recorded budget are skipped, with the command to run.
+"""
+
+import json
+from pathlib import Path
+from typing import Any
+
+from neomodel import StructuredNode
+
+from fedreg.flavor.models import PrivateFlavor, SharedFlavor
+from fedreg.identity_provider.models import IdentityProvider
+from fedreg.image.models import PrivateImage, SharedImage
+from fedreg.location.models import Location
+from fedreg.network.models import PrivateNetwork, SharedNetwork
+from fedreg.project.models import Project
+from fedreg.provider.models import Provider
+from fedreg.quota.models import (
+    BlockStorageQuota,
+    ComputeQuota,
+    NetworkQuota,
+    ObjectStoreQuota,
+)
+from fedreg.region.models import Region
+from fedreg.service.enum import ServiceType
+from fedreg.service.models import (
+    BlockStorageService,
+    ComputeService,
+    IdentityService,
+    NetworkService,
+    ObjectStoreService,
+)
+from fedreg.sla.models import SLA
+from fedreg.user_group.models import UserGroup
+from tests.models.utils import (
+    auth_method_model_dict,
+    flavor_model_dict,
+    identity_provider_model_dict,
+    image_model_dict,
+    location_model_dict,
+    network_model_dict,
+    project_model_dict,
+    provider_model_dict,
+    quota_model_dict,
+    region_model_dict,
+    service_model_dict,
+    sla_model_dict,
+    user_group_model_dict,
+)
+
+BUDGETS_FILE = Path(__file__).parent / "query_budgets.json"
+
+NODES = {
+    "provider": (Provider, provider_model_dict),
+    "identity_provider": (IdentityProvider, identity_provider_model_dict),
+    "user_group": (UserGroup, user_group_model_dict),
+    "sla": (SLA, sla_model_dict),
+    "project": (Project, project_model_dict),
+    "region": (Region, region_model_dict),
+    "location": (Location, location_model_dict),
+    "block_storage_service": (
+        BlockStorageService,
+        lambda: service_model_dict(ServiceType.BLOCK_STORAGE),
+    ),
+    "compute_service": (
+        ComputeService,
+        lambda: service_model_dict(ServiceType.COMPUTE),
+    ),
+    "identity_service": (
+        IdentityService,
+        lambda: service_model_dict(ServiceType.IDENTITY),
+    ),
+    "network_service": (
+        NetworkService,
+        lambda: service_model_dict(ServiceType.NETWORK),
+    ),
+    "object_store_service": (
+        ObjectStoreService,
+        lambda: service_model_dict(ServiceType.OBJECT_STORE),
+    ),
+    "block_storage_quota": (BlockStorageQuota, quota_model_dict),
+    "compute_quota": (ComputeQuota, quota_model_dict),
+    "network_quota": (NetworkQuota, quota_model_dict),
+    "object_store_quota": (ObjectStoreQuota, quota_model_dict),
+    "shared_flavor": (SharedFlavor, flavor_model_dict),
+    "private_flavor": (PrivateFlavor, flavor_model_dict),
+    "shared_image": (SharedImage, image_model_dict),
+    "private_image": (PrivateImage, image_model_dict),
+    "shared_network": (SharedNetwork, network_model_dict),
+    "private_network": (PrivateNetwork, network_model_dict),
+}
+
+EDGES = [
+    ("provider", "identity_providers", "identity_provider", auth_method_model_dict),
+    ("identity_provider", "user_groups", "user_group", None),
+    ("user_group", "slas", "sla", None),
+    ("provider", "projects", "project", None),
+    ("sla", "projects", "project", None),
+    ("provider", "regions", "region", None),
+    ("region", "location", "location", None),
+    ("region", "services", "block_storage_service", None),
+    ("region", "services", "compute_service", None),
+    ("region", "services", "identity_service", None),
+    ("region", "services", "network_service", None),
+    ("region", "services", "object_store_service", None),
+    ("block_storage_quota", "service", "block_storage_service", None),
+    ("compute_quota", "service", "compute_service", None),
+    ("network_quota", "service", "network_service", None),
+    ("object_store_quota", "service", "object_store_service", None),
+    ("project", "quotas", "block_storage_quota", None),
+    ("project", "quotas", "compute_quota", None),
+    ("project", "quotas", "network_quota", None),
+    ("project", "quotas", "object_store_quota", None),
+    ("compute_service", "flavors", "shared_flavor", None),
+    ("compute_service", "flavors", "private_flavor", None),
+    ("compute_service", "images", "shared_image", None),
+    ("compute_service", "images", "private_image", None),
+    ("network_service", "networks", "shared_network", None),
+    ("network_service", "networks", "private_network", None),
+    ("project", "private_flavors", "private_flavor", None),
+    ("project", "private_images", "private_image", None),
+    ("project", "private_networks", "private_network", None),
+]
+
+
+def build_canonical_graph() -> dict[str, StructuredNode]:
+    """Create the canonical graph in the DB and return its nodes by name."""
+    nodes = {name: cls(**data()).save() for name, (cls, data) in NODES.items()}
+    for start, rel, end, props in EDGES:
+        manager = getattr(nodes[start], rel)
+        if props is None:
+            manager.connect(nodes[end])
+        else:
+            manager.connect(nodes[end], props())
+    return nodes
+
+
+def load_budgets() -> dict[str, Any]:
+    """Return the committed baselines."""
+    with BUDGETS_FILE.open() as f:
+        return json.load(f)
+
+
+def dump_budgets(budgets: dict[str, Any]) -> None:
+    """Overwrite the committed baselines."""
+    with BUDGETS_FILE.open("w") as f:
+        json.dump(dict(sorted(budgets.items())), f, indent=2)
+        f.write("\n")
@@ -1,3 +1,4 @@
+from datetime import date, timedelta
 from typing import Any
 from uuid import uuid4
 
@@ -178,3 +179,15 @@ def test_invalid_read(data: dict[str, Any], attr: str) -> None:
     err_msg = rf"1 validation error for SLARead\s{attr}"
     with pytest.raises(ValueError, match=err_msg):
         SLARead(**data, uid=uid)
+
+
+def test_is_active() -> None:
+    """Start and end dates are both included in the validity interval."""
+    today = date.today()
+    item = SLABase(
+        doc_uuid=uuid4(), start_date=today, end_date=today + timedelta(days=1)
+    )
+    assert item.is_active()
+    assert item.is_active(today + timedelta(days=1))
+    assert not item.is_active(today - timedelta(days=1))
+    assert not item.is_active(today + timedelta(days=2))
@@ -0,0 +1,113 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+import pytest
+from pydantic import ValidationError
+
+from fedreg.provider.schemas_extended import ProviderCreateExtended
+from fedreg.provider.validation import MIN_PARALLEL_ITEMS, validate_provider
+from fedreg.service.enum import ServiceType
+from tests.schemas.utils import (
+    flavor_schema_dict,
+    image_schema_dict,
+    network_schema_dict,
+    project_schema_dict,
+    provider_schema_dict,
+    quota_schema_dict,
+    region_schema_dict,
+    service_schema_dict,
+)
+
+
+def provider_data(regions: int = 2, services: int = MIN_PARALLEL_ITEMS) -> dict:
+    project = project_schema_dict()
+    data = {**provider_schema_dict(), "projects": [project], "regions": []}
+    for _ in range(regions):
+        region = region_schema_dict()
+        region["compute_services"] = [
+            {
+                **service_schema_dict(ServiceType.COMPUTE),
+                "flavors": [flavor_schema_dict()],
+                "images": [image_schema_dict()],
+                "quotas": [{**quota_schema_dict(), "project": project["uuid"]}],
+            }
+            for _ in range(services)
+        ]
+        region["network_services"] = [
+            {
+                **service_schema_dict(ServiceType.NETWORK),
+                "networks": [network_schema_dict()],
+            }
+        ]
+        region["identity_services"] = [service_schema_dict(ServiceType.IDENTITY)]
+        data["regions"].append(region)
+    return data
+
+
+def check_same_result(data: dict[str, Any]) -> None:
+    """Parallel and serial validation return the same model or the same errors."""
+    try:
+        expected = ProviderCreateExtended.parse_obj(data)
+    except ValidationError as e:
+        with ThreadPoolExecutor() as executor:
+            with pytest.raises(ValidationError) as exc_info:
+                validate_provider(data, executor=executor)
+        assert exc_info.value.errors() == e.errors()
+        assert exc_info.value.model == ProviderCreateExtended
+    else:
+        with ThreadPoolExecutor() as executor:
+            assert validate_provider(data, executor=executor) == expected
+
+
+def test_valid() -> None:
+    check_same_result(provider_data())
+
+
+def test_process_pool() -> None:
+    data = provider_data()
+    assert validate_provider(data, max_workers=2) == ProviderCreateExtended.parse_obj(
+        data
+    )
+
+
+def test_serial_fallback() -> None:
+    data = provider_data(regions=1, services=1)
+    assert validate_provider(data, max_workers=2) == ProviderCreateExtended.parse_obj(
+        data
+    )
+
+
+def test_invalid_service() -> None:
+    data = provider_data()
+    data["regions"][1]["compute_services"][3]["endpoint"] = "not-an-url"
+    data["regions"][1]["compute_services"][5]["flavors"] *= 2
+    check_same_result(data)
+
+
+def test_invalid_service_list() -> None:
+    data = provider_data()
+    services = data["regions"][0]["compute_services"]
+    services[1]["endpoint"] = services[0]["endpoint"]
+    check_same_result(data)
+
+
+def test_invalid_region_and_provider() -> None:
+    data = provider_data()
+    data["name"] = None
+    data["regions"][0]["name"] = None
+    data["regions"][0]["network_services"][0]["networks"][0]["name"] = None
+    data["regions"][1]["name"] = data["regions"][0]["name"]
+    check_same_result(data)
+
+
+def test_project_not_in_provider() -> None:
+    data = provider_data()
+    data["regions"][1]["compute_services"][0]["quotas"][0]["project"] = "unknown"
+    check_same_result(data)
+
+
+def test_non_dict_items() -> None:
+    data = provider_data()
+    data["regions"][0]["compute_services"][0] = "invalid"
+    data["regions"].append("invalid")
+    check_same_result(data)
@@ -0,0 +1,116 @@
+from datetime import date
+
+from fedreg.changes import capture, has_listener, is_enabled, remove_listener
+from fedreg.identity_provider.access import (
+    AccessResolver,
+    access_resolver,
+    fetch_access,
+    install,
+)
+from fedreg.identity_provider.models import IdentityProvider
+from fedreg.instrumentation import QueryCollector, instrument
+from fedreg.project.models import Project
+from fedreg.provider.models import Provider
+from fedreg.sla.models import SLA
+from fedreg.user_group.models import UserGroup
+from tests.models.utils import (
+    identity_provider_model_dict,
+    project_model_dict,
+    provider_model_dict,
+    sla_model_dict,
+    user_group_model_dict,
+)
+
+
+def test_fetch_access() -> None:
+    idp = IdentityProvider(**identity_provider_model_dict()).save()
+    group = UserGroup(**user_group_model_dict()).save()
+    group.identity_provider.connect(idp)
+    provider = Provider(**provider_model_dict()).save()
+    project = Project(**project_model_dict()).save()
+    provider.projects.connect(project)
+    sla = SLA(
+        **{
+            **sla_model_dict(),
+            "start_date": date(2024, 1, 1),
+            "end_date": date(2024, 12, 31),
+        }
+    ).save()
+    group.slas.connect(sla)
+    sla.projects.connect(project)
+
+    collector = QueryCollector()
+    with instrument(collector):
+        access = fetch_access(idp.endpoint, group.name)
+    assert collector.count == 1
+    assert access.identity_provider == idp.uid
+    assert access.group_claim == idp.group_claim
+    assert access.user_groups == (group.uid,)
+    [item] = access.projects
+    assert item.user_group == group.uid
+    assert item.sla == sla.uid
+    assert (item.start_date, item.end_date) == (date(2024, 1, 1), date(2024, 12, 31))
+    assert (item.project, item.project_uuid) == (project.uid, project.uuid)
+    assert (item.provider, item.provider_status) == (provider.uid, provider.status)
+    assert access.active(date(2025, 1, 1)).projects == ()
+
+    assert fetch_access(idp.endpoint, "missing") == access._replace(
+        user_groups=(), projects=()
+    )
+    assert fetch_access("https://missing.example", group.name) is None
+
+
+def test_resolver() -> None:
+    now = [0.0]
+    resolver = AccessResolver(ttl=10, maxsize=2, clock=lambda: now[0])
+    idp = IdentityProvider(**identity_provider_model_dict()).save()
+    group = UserGroup(**user_group_model_dict()).save()
+    group.identity_provider.connect(idp)
+    day = date(2024, 6, 1)
+
+    collector = QueryCollector()
+    with instrument(collector):
+        access = resolver.resolve(idp.endpoint, group.name, day=day)
+        assert resolver.resolve(idp.endpoint, group.name, day=day) == access
+        assert resolver.resolve("https://missing.example", group.name) is None
+        assert resolver.resolve("https://missing.example", group.name) is None
+    assert collector.count == 2
+    assert access.projects == ()
+
+    with capture(resolver):
+        sla = SLA(**{**sla_model_dict(), "start_date": day, "end_date": day}).save()
+        group.slas.connect(sla)
+        project = Project(**project_model_dict()).save()
+        Provider(**provider_model_dict()).save().projects.connect(project)
+        sla.projects.connect(project)
+    assert len(resolver) == 0
+    access = resolver.resolve(idp.endpoint, group.name, day=day)
+    assert [i.project for i in access.projects] == [project.uid]
+    assert resolver.resolve(idp.endpoint, group.name, day=date(2025, 1, 1)) == (
+        access._replace(projects=())
+    )
+    assert resolver.resolve(idp.endpoint, group.name, all_slas=True) == access
+
+    resolver.resolve("a", "b")
+    resolver.resolve("c", "d")
+    assert len(resolver) == 2
+    now[0] = 11
+    collector = QueryCollector()
+    with instrument(collector):
+        resolver.resolve("c", "d")
+    assert collector.count == 1
+
+
+def test_install() -> None:
+    assert install() is access_resolver
+    try:
+        assert install() is access_resolver
+        assert has_listener(access_resolver)
+        idp = IdentityProvider(**identity_provider_model_dict()).save()
+        access_resolver.resolve(idp.endpoint, "group")
+        assert len(access_resolver) == 1
+        UserGroup(**user_group_model_dict()).save()
+        assert len(access_resolver) == 0
+    finally:
+        remove_listener(access_resolver)
+    assert not is_enabled()
@@ -0,0 +1,92 @@
+from fedreg.auth_method.matrix import AuthMatrix, auth_matrix, invalidate
+from fedreg.auth_method.models import AuthMethod
+from fedreg.identity_provider.models import IdentityProvider
+from fedreg.identity_provider.schemas_extended import IdentityProviderReadExtended
+from fedreg.instrumentation import QueryCollector, instrument
+from fedreg.provider.models import Provider
+from fedreg.provider.schemas_extended import ProviderReadExtended
+from tests.models.utils import (
+    auth_method_model_dict,
+    identity_provider_model_dict,
+    provider_model_dict,
+)
+
+
+def test_auth_matrix() -> None:
+    providers = [Provider(**provider_model_dict()).save() for _ in range(2)]
+    idps = [IdentityProvider(**identity_provider_model_dict()).save() for _ in range(2)]
+    methods = {}
+    for provider in providers:
+        for idp in idps:
+            methods[(provider.uid, idp.uid)] = auth_method_model_dict()
+            provider.identity_providers.connect(idp, methods[(provider.uid, idp.uid)])
+
+    matrix = AuthMatrix.load()
+    assert len(matrix) == 4
+    assert {(p, i): props for p, i, props in matrix.items()} == methods
+    assert (
+        matrix.get(providers[0].uid, idps[1].uid)
+        == methods[(providers[0].uid, idps[1].uid)]
+    )
+    assert matrix.get(idps[0].uid, providers[0].uid) is None
+    assert set(matrix.identity_providers(providers[1].uid)) == {i.uid for i in idps}
+    assert set(matrix.providers(idps[0].uid)) == {i.uid for i in providers}
+    rel = matrix.relationship(providers[0].uid, idps[0].uid, AuthMethod)
+    assert isinstance(rel, AuthMethod)
+    assert rel.idp_name == methods[(providers[0].uid, idps[0].uid)]["idp_name"]
+
+
+def test_shared_matrix() -> None:
+    provider = Provider(**provider_model_dict()).save()
+    idps = [IdentityProvider(**identity_provider_model_dict()).save() for _ in range(3)]
+    for idp in idps[:2]:
+        provider.identity_providers.connect(idp, auth_method_model_dict())
+
+    invalidate()
+    matrix = auth_matrix()
+    assert auth_matrix() is matrix
+    provider.identity_providers.connect(idps[2], auth_method_model_dict())
+    assert auth_matrix() is not matrix
+    matrix = auth_matrix()
+    rel = provider.identity_providers.relationship(idps[0])
+    rel.protocol = "changed"
+    rel.save()
+    assert auth_matrix() is not matrix
+    assert auth_matrix().get(provider.uid, idps[0].uid)["protocol"] == "changed"
+    provider.identity_providers.disconnect(idps[2])
+    assert len(auth_matrix().identity_providers(provider.uid)) == 2
+
+
+def test_read_extended() -> None:
+    provider = Provider(**provider_model_dict()).save()
+    idps = [IdentityProvider(**identity_provider_model_dict()).save() for _ in range(5)]
+    for idp in idps:
+        provider.identity_providers.connect(idp, auth_method_model_dict())
+    auth_matrix()
+
+    collector = QueryCollector()
+    with instrument(collector):
+        item = ProviderReadExtended.from_orm(provider)
+    assert len(item.identity_providers) == 5
+    assert {i.relationship.idp_name for i in item.identity_providers} == {
+        idp.providers.relationship(provider).idp_name for idp in idps
+    }
+    baseline = collector.count
+
+    provider.identity_providers.connect(
+        IdentityProvider(**identity_provider_model_dict()).save(),
+        auth_method_model_dict(),
+    )
+    auth_matrix()
+    collector = QueryCollector()
+    with instrument(collector):
+        item = ProviderReadExtended.from_orm(provider)
+    assert len(item.identity_providers) == 6
+    assert collector.count == baseline
+
+    collector = QueryCollector()
+    with instrument(collector):
+        item = IdentityProviderReadExtended.from_orm(idps[0])
+    assert item.providers[0].relationship.protocol == (
+        provider.identity_providers.relationship(idps[0]).protocol
+    )
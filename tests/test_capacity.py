@@ -0,0 +1,72 @@
+import math
+
+from fedreg.capacity import (
+    Capacity,
+    CapacityTable,
+    capacity_table,
+    effective,
+    invalidate,
+)
+from fedreg.project.models import Project
+from fedreg.quota.models import ComputeQuota
+from fedreg.region.models import Region
+from fedreg.service.enum import ServiceType
+from fedreg.service.models import ComputeService
+from tests.models.utils import (
+    project_model_dict,
+    quota_model_dict,
+    region_model_dict,
+    service_model_dict,
+)
+
+
+def test_effective() -> None:
+    assert list(effective([10, -1, None, 4], [2.0, 2.0, 1.0, 1.0], [5, 3, 1, 6])) == [
+        15,
+        math.inf,
+        math.inf,
+        0,
+    ]
+    assert list(effective([8], [1.0], [None])) == [8]
+
+
+def test_ranked() -> None:
+    table = CapacityTable(
+        [
+            ("r1", "s1", "p", 1.0, 1.0, 4, 4096, 10, 0, 0, 0),
+            ("r2", "s2", "p", 4.0, 1.0, 4, 8192, -1, 0, 0, 0),
+            ("r3", "s3", "p", 1.0, 1.0, 1, 8192, 10, 0, 0, 0),
+            ("r4", "s4", "q", 1.0, 1.0, -1, -1, -1, 0, 0, 0),
+        ]
+    )
+    assert len(table) == 4
+    assert [i.region for i in table.rows(project="q")] == ["r4"]
+    assert table[1] == Capacity("r2", "s2", "p", 16, 8192, math.inf)
+    ranked = table.ranked("p", cores=2, ram=2048)
+    assert [i.region for i in ranked] == ["r2", "r1"]
+    assert table.ranked("p", cores=32) == []
+    assert len(CapacityTable([])) == 0
+
+
+def test_load() -> None:
+    region = Region(**region_model_dict(), overbooking_cpu=2.0).save()
+    service = ComputeService(**service_model_dict(ServiceType.COMPUTE)).save()
+    region.services.connect(service)
+    project = Project(**project_model_dict()).save()
+    for values in (
+        {"cores": 10, "ram": -1, "instances": 5},
+        {"cores": 4, "ram": 1024, "instances": 2, "usage": True},
+        {"cores": 1, "per_user": True},
+    ):
+        quota = ComputeQuota(**quota_model_dict(), **values).save()
+        quota.project.connect(project)
+        quota.service.connect(service)
+
+    invalidate()
+    table = capacity_table()
+    assert capacity_table() is table
+    assert table.rows(project=project.uid) == [
+        Capacity(region.uid, service.uid, project.uid, 16, math.inf, 3)
+    ]
+    invalidate()
+    assert capacity_table() is not table
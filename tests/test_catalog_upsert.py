@@ -0,0 +1,165 @@
+import pytest
+
+from fedreg.changes import CONNECT, CREATE, DELETE, DISCONNECT, UPDATE, capture
+from fedreg.flavor.models import PrivateFlavor, SharedFlavor
+from fedreg.flavor.schemas import SharedFlavorCreate
+from fedreg.image.models import PrivateImage, SharedImage
+from fedreg.image.schemas import SharedImageCreate
+from fedreg.instrumentation import QueryCollector, instrument
+from fedreg.project.models import Project
+from fedreg.provider.models import Provider
+from fedreg.provider.schemas_extended import (
+    PrivateFlavorCreateExtended,
+    PrivateImageCreateExtended,
+)
+from fedreg.region.models import Region
+from fedreg.service.catalog import ItemCounts, upsert_catalog
+from fedreg.service.enum import ServiceType
+from fedreg.service.models import ComputeService
+from tests.models.utils import (
+    flavor_model_dict,
+    image_model_dict,
+    project_model_dict,
+    provider_model_dict,
+    region_model_dict,
+    service_model_dict,
+)
+
+
+def compute_service(provider: Provider) -> ComputeService:
+    region = Region(**region_model_dict()).save()
+    provider.regions.connect(region)
+    service = ComputeService(**service_model_dict(ServiceType.COMPUTE)).save()
+    region.services.connect(service)
+    return service
+
+
+def test_upsert_catalog() -> None:
+    provider = Provider(**provider_model_dict()).save()
+    projects = [Project(**project_model_dict()).save() for _ in range(2)]
+    for project in projects:
+        provider.projects.connect(project)
+    service = compute_service(provider)
+
+    private_flavor = PrivateFlavorCreateExtended(
+        **flavor_model_dict(), projects=[projects[0].uuid]
+    )
+    shared_flavor = SharedFlavorCreate(**flavor_model_dict())
+    private_image = PrivateImageCreateExtended(
+        **image_model_dict(), projects=[i.uuid for i in projects]
+    )
+    shared_image = SharedImageCreate(**image_model_dict(), tags=["a", "b"])
+    flavors = [private_flavor, shared_flavor]
+    images = [private_image, shared_image]
+
+    result = upsert_catalog(service.endpoint, flavors=flavors, images=images)
+    assert result.service == service.uid
+    assert result.flavors == ItemCounts(added=2, linked=1)
+    assert result.images == ItemCounts(added=2, linked=2)
+    items = {i.uuid: i for i in service.flavors.all()}
+    assert isinstance(items[private_flavor.uuid], PrivateFlavor)
+    assert isinstance(items[shared_flavor.uuid], SharedFlavor)
+    assert items[private_flavor.uuid].projects.single() == projects[0]
+    items = {i.uuid: i for i in service.images.all()}
+    assert isinstance(items[private_image.uuid], PrivateImage)
+    assert isinstance(items[shared_image.uuid], SharedImage)
+    assert items[shared_image.uuid].search_tags == "a b"
+    assert items[shared_image.uuid].fingerprint is not None
+    assert len(projects[1].private_images) == 1
+
+    collector = QueryCollector()
+    with instrument(collector):
+        result = upsert_catalog(service.endpoint, flavors=flavors, images=images)
+    assert collector.count == 1
+    assert result.flavors == result.images == ItemCounts()
+
+    private_flavor.name = "renamed"
+    private_flavor.projects = [projects[1].uuid]
+    changes = []
+    with capture(changes.append):
+        result = upsert_catalog(service.endpoint, flavors=flavors, images=images[:1])
+    assert result.flavors == ItemCounts(updated=1, linked=1, unlinked=1)
+    assert result.images == ItemCounts(removed=1)
+    flavor = service.flavors.get(uuid=private_flavor.uuid)
+    assert flavor.name == "renamed"
+    assert flavor.projects.single() == projects[1]
+    assert [i.uuid for i in service.images.all()] == [private_image.uuid]
+    assert {(i.op, i.entity_label, i.relationship) for i in changes} == {
+        (UPDATE, "PrivateFlavor", None),
+        (CONNECT, "Project", "CAN_USE_VM_FLAVOR"),
+        (DISCONNECT, "Project", "CAN_USE_VM_FLAVOR"),
+        (DISCONNECT, "ComputeService", "AVAILABLE_VM_IMAGE"),
+        (DELETE, "SharedImage", None),
+    }
+
+    result = upsert_catalog(service.endpoint, flavors=[private_flavor])
+    assert result.flavors == ItemCounts(removed=1)
+    assert result.images == ItemCounts()
+    assert len(service.images) == 1
+
+
+def test_upsert_replaced_and_reused() -> None:
+    provider = Provider(**provider_model_dict()).save()
+    project = Project(**project_model_dict()).save()
+    provider.projects.connect(project)
+    services = [compute_service(provider) for _ in range(2)]
+
+    image = SharedImageCreate(**image_model_dict())
+    first = upsert_catalog(services[0].endpoint, images=[image])
+    changes = []
+    with capture(changes.append):
+        second = upsert_catalog(services[1].endpoint, images=[image])
+    assert second.images == ItemCounts(added=1)
+    assert [i.op for i in changes] == [CONNECT]
+    assert services[0].images.single() == services[1].images.single()
+    assert first.flavors == second.flavors == ItemCounts()
+
+    image = PrivateImageCreateExtended(
+        **{**image.dict(), "is_shared": False}, projects=[project.uuid]
+    )
+    result = upsert_catalog(services[1].endpoint, images=[image])
+    assert result.images == ItemCounts(added=1, removed=1, linked=1)
+    assert isinstance(services[0].images.single(), SharedImage)
+    assert isinstance(services[1].images.single(), PrivateImage)
+
+    flavor = SharedFlavorCreate(**flavor_model_dict())
+    upsert_catalog(services[0].endpoint, flavors=[flavor])
+    flavor = PrivateFlavorCreateExtended(
+        **{**flavor.dict(), "is_shared": False}, projects=[project.uuid]
+    )
+    changes = []
+    with capture(changes.append):
+        result = upsert_catalog(services[0].endpoint, flavors=[flavor])
+    assert result.flavors == ItemCounts(added=1, removed=1, linked=1)
+    assert {i.op for i in changes} == {CREATE, CONNECT, DISCONNECT, DELETE}
+    assert project.private_flavors.single().uuid == flavor.uuid
+
+
+def test_private_image_reuse_is_scoped_to_provider() -> None:
+    providers = [Provider(**provider_model_dict()).save() for _ in range(2)]
+    services = [compute_service(i) for i in providers]
+    project = project_model_dict()
+    for provider in providers:
+        provider.projects.connect(Project(**project).save())
+    image = PrivateImageCreateExtended(**image_model_dict(), projects=[project["uuid"]])
+    upsert_catalog(services[0].endpoint, images=[image])
+    result = upsert_catalog(services[1].endpoint, images=[image])
+    assert result.images == ItemCounts(added=1, linked=1)
+    assert services[0].images.single() != services[1].images.single()
+
+    sibling = compute_service(providers[0])
+    upsert_catalog(sibling.endpoint, images=[image])
+    assert sibling.images.single() == services[0].images.single()
+
+
+def test_upsert_errors() -> None:
+    provider = Provider(**provider_model_dict()).save()
+    service = compute_service(provider)
+    flavor = PrivateFlavorCreateExtended(
+        **flavor_model_dict(), projects=[project_model_dict()["uuid"]]
+    )
+    with pytest.raises(ValueError):
+        upsert_catalog(service.endpoint, flavors=[flavor])
+    assert len(service.flavors) == 0
+    with pytest.raises(LookupError):
+        upsert_catalog("https://missing.example", flavors=[])
@@ -0,0 +1,186 @@
+from datetime import timedelta
+
+import pytest
+from neomodel import RelationshipManager
+
+from fedreg.changes import (
+    CONNECT,
+    CREATE,
+    DELETE,
+    DISCONNECT,
+    UPDATE,
+    Change,
+    ChangeLog,
+    CursorExpiredError,
+    TrackedRelationshipManager,
+    capture,
+    is_enabled,
+)
+from fedreg.identity_provider.models import IdentityProvider
+from fedreg.instrumentation import QueryCollector, instrument
+from fedreg.location.models import Location
+from fedreg.project.models import Project
+from fedreg.provider.models import Provider
+from tests.models.utils import (
+    auth_method_model_dict,
+    identity_provider_model_dict,
+    location_model_dict,
+    project_model_dict,
+    provider_model_dict,
+)
+
+
+def test_disabled() -> None:
+    """neomodel managers are not patched and without listeners no query is added."""
+    connect = RelationshipManager.connect
+    with capture(lambda change: None):
+        assert is_enabled()
+        assert RelationshipManager.connect is connect
+    assert not is_enabled()
+    assert isinstance(Provider().projects, TrackedRelationshipManager)
+
+    def count_queries() -> int:
+        collector = QueryCollector()
+        with instrument(collector):
+            provider = Provider(**provider_model_dict()).save()
+            provider.delete()
+        return collector.count
+
+    baseline = count_queries()
+    with capture(ChangeLog()):
+        assert count_queries() == baseline + 2
+
+
+def test_changes_are_atomic() -> None:
+    """A failing listener rolls back the change it has been notified."""
+
+    def fail(change: Change) -> None:
+        raise RuntimeError(change.op)
+
+    provider = Provider(**provider_model_dict())
+    with capture(fail), pytest.raises(RuntimeError):
+        provider.save()
+    assert Provider.nodes.get_or_none(uid=provider.uid) is None
+
+    provider = Provider(**provider_model_dict()).save()
+    project = Project(**project_model_dict()).save()
+    with capture(fail), pytest.raises(RuntimeError):
+        provider.projects.connect(project)
+    assert len(provider.projects) == 0
+    with capture(fail), pytest.raises(RuntimeError):
+        provider.delete()
+    assert Provider.nodes.get_or_none(uid=provider.uid) is not None
+
+
+def test_node_changes() -> None:
+    changes: list[Change] = []
+    with capture(changes.append):
+        provider = Provider(**provider_model_dict()).save()
+        provider.name = "new name"
+        provider.save()
+        provider.save()
+        item = Provider.nodes.get(uid=provider.uid)
+        item.description = "changed description"
+        item.save()
+        location = Location(**location_model_dict()).save()
+        location.country = "changed country"
+        location.save()
+        item.delete()
+
+    assert [i.op for i in changes] == [CREATE, UPDATE, UPDATE, CREATE, UPDATE, DELETE]
+    assert {i.entity_uid for i in changes} == {provider.uid, location.uid}
+    assert "name" in changes[0].fields
+    assert changes[1].fields == ("name",)
+    assert changes[2].fields == ("description",)
+    assert changes[4].fields == ("country",)
+    assert changes[0].entity_label == "Provider"
+
+
+def test_relationship_changes() -> None:
+    provider = Provider(**provider_model_dict()).save()
+    project = Project(**project_model_dict()).save()
+    idp = IdentityProvider(**identity_provider_model_dict()).save()
+    changes: list[Change] = []
+    with capture(changes.append):
+        provider.projects.connect(project)
+        idp.providers.connect(provider, auth_method_model_dict())
+        provider.projects.disconnect(project)
+        provider.identity_providers.disconnect_all()
+
+    assert changes == [
+        Change(
+            CONNECT,
+            "Provider",
+            provider.uid,
+            (),
+            "BOOK_PROJECT_FOR_SLA",
+            "Project",
+            project.uid,
+        ),
+        Change(
+            CONNECT,
+            "Provider",
+            provider.uid,
+            tuple(sorted(auth_method_model_dict())),
+            "ALLOW_AUTH_THROUGH",
+            "IdentityProvider",
+            idp.uid,
+        ),
+        Change(
+            DISCONNECT,
+            "Provider",
+            provider.uid,
+            (),
+            "BOOK_PROJECT_FOR_SLA",
+            "Project",
+            project.uid,
+        ),
+        Change(
+            DISCONNECT,
+            "Provider",
+            provider.uid,
+            (),
+            "ALLOW_AUTH_THROUGH",
+            "IdentityProvider",
+            None,
+        ),
+    ]
+
+
+def test_change_log() -> None:
+    log = ChangeLog()
+    assert log.head() == 0
+    assert log.read() == []
+    with capture(log):
+        provider = Provider(**provider_model_dict()).save()
+        project = Project(**project_model_dict()).save()
+        provider.projects.connect(project)
+        provider.name = "new name"
+        provider.save()
+        provider.description = "new description"
+        provider.save()
+
+    assert log.head() == 5
+    changes = log.read()
+    assert [i.seq for i in changes] == [1, 2, 3, 4, 5]
+    assert [i.op for i in changes] == [CREATE, CREATE, CONNECT, UPDATE, UPDATE]
+    assert changes[2].target_uid == project.uid
+    assert changes[0].timestamp is not None
+    assert log.read(3) == changes[3:]
+    assert log.read(0, limit=2) == changes[:2]
+
+    assert log.compact(upto=4) == 1
+    changes = log.read()
+    assert [i.seq for i in changes] == [2, 3, 4, 5]
+    assert changes[2].op == CREATE
+    assert "name" in changes[2].fields
+    assert log.compact() == 1
+    assert [i.seq for i in log.read()] == [2, 3, 5]
+
+    assert log.truncate(upto=3) == 2
+    assert [i.seq for i in log.read(3)] == [5]
+    with pytest.raises(CursorExpiredError):
+        log.read(2)
+    assert log.truncate(older_than=timedelta(0)) == 1
+    assert log.read(5) == []
+    assert log.head() == 5
@@ -0,0 +1,76 @@
+from fedreg.network.models import PrivateNetwork, SharedNetwork
+from fedreg.project.enum import DefaultNetworkStatus
+from fedreg.project.models import DefaultNetwork, Project
+from fedreg.quota.models import NetworkQuota
+from fedreg.region.models import Region
+from fedreg.service.enum import ServiceType
+from fedreg.service.models import NetworkService
+from tests.models.utils import (
+    network_model_dict,
+    project_model_dict,
+    quota_model_dict,
+    region_model_dict,
+    service_model_dict,
+)
+
+
+def network_service(region: Region, *projects: Project) -> NetworkService:
+    service = NetworkService(**service_model_dict(ServiceType.NETWORK)).save()
+    region.services.connect(service)
+    for project in projects:
+        quota = NetworkQuota(**quota_model_dict()).save()
+        quota.project.connect(project)
+        quota.service.connect(service)
+    return service
+
+
+def test_default_networks() -> None:
+    project = Project(**project_model_dict()).save()
+    other = Project(**project_model_dict()).save()
+    regions = sorted(
+        (Region(**region_model_dict()).save() for _ in range(3)), key=lambda i: i.uid
+    )
+
+    # First region: the private default wins over the shared one.
+    service = network_service(regions[0], project, other)
+    shared = SharedNetwork(**network_model_dict(), is_default=True).save()
+    service.networks.connect(shared)
+    private = PrivateNetwork(
+        **network_model_dict(), is_default=True, proxy_host="10.0.0.1"
+    ).save()
+    service.networks.connect(private)
+    project.private_networks.connect(private)
+    # Second region: two shared defaults.
+    service = network_service(regions[1], project)
+    candidates = []
+    for _ in range(2):
+        item = SharedNetwork(**network_model_dict(), is_default=True).save()
+        service.networks.connect(item)
+        candidates.append(item)
+    # Third region: no default.
+    service = network_service(regions[2], project)
+    service.networks.connect(SharedNetwork(**network_model_dict()).save())
+
+    items = {
+        (i.project, i.region): i
+        for i in Project.default_networks([project.uid, other.uid, "missing"])
+    }
+    assert set(items) == {
+        (project.uid, regions[0].uid),
+        (project.uid, regions[1].uid),
+        (project.uid, regions[2].uid),
+        (other.uid, regions[0].uid),
+    }
+    item = items[(project.uid, regions[0].uid)]
+    assert item == DefaultNetwork(
+        project.uid, regions[0].uid, DefaultNetworkStatus.FOUND, private, [private]
+    )
+    assert item.network.proxy_host == "10.0.0.1"
+    assert items[(other.uid, regions[0].uid)].network == shared
+    item = items[(project.uid, regions[1].uid)]
+    assert item.status == DefaultNetworkStatus.AMBIGUOUS
+    assert item.network is None
+    assert {i.uid for i in item.candidates} == {i.uid for i in candidates}
+    item = items[(project.uid, regions[2].uid)]
+    assert item.status == DefaultNetworkStatus.MISSING
+    assert item.candidates == []
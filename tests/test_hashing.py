@@ -0,0 +1,210 @@
+import pytest
+
+from fedreg.changes import CREATE, DELETE, UPDATE, Change, capture
+from fedreg.flavor.models import PrivateFlavor
+from fedreg.flavor.schemas import FlavorRead
+from fedreg.hashing import content_hash, etag, tree_hash
+from fedreg.instrumentation import QueryCollector, instrument
+from fedreg.location.models import Location
+from fedreg.location.schemas import LocationCreate
+from fedreg.project.models import Project
+from fedreg.project.schemas import ProjectCreate
+from fedreg.provider.hashes import (
+    SubtreeChange,
+    TreeHasher,
+    compare_provider,
+    refresh,
+    rehash,
+)
+from fedreg.provider.models import Provider
+from fedreg.provider.schemas_extended import (
+    ComputeQuotaCreateExtended,
+    ComputeServiceCreateExtended,
+    PrivateFlavorCreateExtended,
+    ProviderCreateExtended,
+    RegionCreateExtended,
+)
+from fedreg.quota.models import ComputeQuota
+from fedreg.region.models import Region
+from fedreg.service.enum import ServiceType
+from fedreg.service.models import ComputeService
+from tests.models.utils import (
+    flavor_model_dict,
+    location_model_dict,
+    project_model_dict,
+    provider_model_dict,
+    quota_model_dict,
+    region_model_dict,
+    service_model_dict,
+)
+
+
+def stored_etag(node: Provider) -> str | None:
+    return type(node).nodes.get(uid=node.uid).etag
+
+
+def test_content_hash() -> None:
+    properties = {"uid": "a", "name": "name", "ram": 1, "gpu_model": None}
+    assert content_hash(properties) == content_hash({"ram": 1, "name": "name"})
+    assert content_hash(properties) != content_hash({**properties, "ram": 2})
+    assert tree_hash("a", ["b", "c"]) == tree_hash("a", ["c", "b"])
+    assert tree_hash("a", ["b"]) != tree_hash("a", ["b", "c"])
+    assert etag({"content_hash": "a"}) == "a"
+    assert etag({"content_hash": "a", "tree_hash": "b"}) == "b"
+    assert etag({}) is None
+
+
+def test_node_etag() -> None:
+    flavor = PrivateFlavor(**flavor_model_dict())
+    assert flavor.etag is None
+    flavor.pre_save()
+    value = flavor.content_hash
+    assert value is not None
+    assert flavor.etag == value
+    assert FlavorRead.from_orm(flavor).etag == value
+    flavor.name = "changed"
+    flavor.pre_save()
+    assert flavor.content_hash != value
+
+
+def test_tree_hasher() -> None:
+    changes: list[Change] = []
+    with capture(TreeHasher()) as hasher:
+        provider = Provider(**provider_model_dict()).save()
+        project = Project(**project_model_dict()).save()
+        provider.projects.connect(project)
+        regions = [Region(**region_model_dict()).save() for _ in range(2)]
+        services = []
+        for region in regions:
+            provider.regions.connect(region)
+            service = ComputeService(**service_model_dict(ServiceType.COMPUTE)).save()
+            region.services.connect(service)
+            services.append(service)
+        flavor = PrivateFlavor(**flavor_model_dict()).save()
+        services[0].flavors.connect(flavor)
+        project.private_flavors.connect(flavor)
+
+        nodes = [provider, *regions, *services, flavor]
+        etags = [stored_etag(i) for i in nodes]
+        assert etags[0] != Provider.nodes.get(uid=provider.uid).content_hash
+        flavor.name = "changed"
+        flavor.save()
+        changed = [stored_etag(i) for i in nodes]
+        assert [i != j for i, j in zip(etags, changed, strict=True)] == [
+            True,
+            True,
+            False,
+            True,
+            False,
+            True,
+        ]
+
+        project.private_flavors.disconnect(flavor)
+        assert stored_etag(flavor) != changed[-1]
+
+        etags = [stored_etag(i) for i in nodes]
+        with hasher.batch():
+            flavor.name = "again"
+            flavor.save()
+            project.private_flavors.connect(flavor)
+            assert stored_etag(flavor) == etags[-1]
+        assert stored_etag(flavor) != etags[-1]
+        etags = [stored_etag(i) for i in nodes]
+        with capture(changes.append):
+            flavor.delete()
+        assert changes[-1].op == DELETE
+        assert changes[-1].owners == (provider.uid,)
+        assert stored_etag(services[0]) != etags[3]
+        assert stored_etag(regions[1]) == etags[2]
+
+
+def test_refresh() -> None:
+    provider = Provider(**provider_model_dict()).save()
+    region = Region(**region_model_dict()).save()
+    provider.regions.connect(region)
+    assert stored_etag(provider) == provider.content_hash
+    assert refresh() == 0
+    assert stored_etag(provider) != provider.content_hash
+    assert rehash([provider.uid]) == 0
+
+
+def test_compare_provider() -> None:
+    provider = provider_model_dict()
+    project = project_model_dict()
+    location = location_model_dict()
+    region = region_model_dict()
+    service = service_model_dict(ServiceType.COMPUTE)
+    flavor = flavor_model_dict()
+    quota = quota_model_dict()
+    data = ProviderCreateExtended(
+        **provider,
+        projects=[ProjectCreate(**project)],
+        regions=[
+            RegionCreateExtended(
+                **region,
+                location=LocationCreate(**location),
+                compute_services=[
+                    ComputeServiceCreateExtended(
+                        **service,
+                        flavors=[
+                            PrivateFlavorCreateExtended(
+                                **flavor, projects=[project["uuid"]]
+                            )
+                        ],
+                        quotas=[
+                            ComputeQuotaCreateExtended(**quota, project=project["uuid"])
+                        ],
+                    )
+                ],
+            )
+        ],
+    )
+
+    provider = Provider(**provider).save()
+    project_node = Project(**project).save()
+    provider.projects.connect(project_node)
+    region_node = Region(**region).save()
+    provider.regions.connect(region_node)
+    region_node.location.connect(Location(**location).save())
+    service_node = ComputeService(**service).save()
+    region_node.services.connect(service_node)
+    flavor_node = PrivateFlavor(**flavor).save()
+    service_node.flavors.connect(flavor_node)
+    project_node.private_flavors.connect(flavor_node)
+    quota_node = ComputeQuota(**quota).save()
+    quota_node.service.connect(service_node)
+    project_node.quotas.connect(quota_node)
+    other = Provider(**provider_model_dict()).save()
+    other_project = Project(**project_model_dict()).save()
+    other.projects.connect(other_project)
+    other_project.private_flavors.connect(flavor_node)
+    rehash([provider.uid])
+
+    collector = QueryCollector()
+    with instrument(collector):
+        assert compare_provider(provider.uid, data) == []
+    assert collector.count == 1
+
+    service_path = (
+        "regions",
+        region["name"],
+        "compute_services",
+        service["endpoint"],
+    )
+    data.regions[0].compute_services[0].flavors[0].name = "changed"
+    data.regions[0].compute_services[0].quotas = []
+    data.projects.append(ProjectCreate(**project_model_dict()))
+    collector = QueryCollector()
+    with instrument(collector):
+        changes = compare_provider(provider.uid, data)
+    assert collector.count == 3
+    assert set(changes) == {
+        SubtreeChange(CREATE, ("projects", data.projects[1].uuid)),
+        SubtreeChange(UPDATE, (*service_path, "flavors", flavor["uuid"])),
+        SubtreeChange(
+            DELETE, (*service_path, "quotas", f"{project['uuid']}/false/false")
+        ),
+    }
+
+    with pytest.raises(LookupError):
+        compare_provider("missing", data)
@@ -0,0 +1,102 @@
+from neomodel import db
+
+from fedreg.changes import CONNECT, CREATE, capture
+from fedreg.image.models import Image, PrivateImage, SharedImage, fingerprint
+from fedreg.image.schemas import PrivateImageCreate, SharedImageCreate
+from fedreg.provider.models import Provider
+from fedreg.region.models import Region
+from fedreg.service.enum import ServiceType
+from fedreg.service.models import ComputeService
+from tests.models.utils import (
+    image_model_dict,
+    provider_model_dict,
+    region_model_dict,
+    service_model_dict,
+)
+from tests.schemas.utils import image_schema_dict
+
+
+def test_fingerprint() -> None:
+    d = {**image_model_dict(), "tags": ["b", "a"], "is_shared": True}
+    assert fingerprint(d) == fingerprint({**d, "tags": ["a", "b", "a"]})
+    assert fingerprint(d) == fingerprint({**d, "description": "other"})
+    assert fingerprint(d) == fingerprint(SharedImageCreate(**d).dict())
+    assert fingerprint(d) != fingerprint({**d, "is_shared": False})
+    assert fingerprint(d) != fingerprint({**d, "os_version": "22.04"})
+    assert fingerprint(d) != fingerprint({**d, "uuid": image_model_dict()["uuid"]})
+
+
+def test_fingerprint_property() -> None:
+    item = SharedImage(**image_model_dict()).save()
+    assert item.fingerprint == fingerprint(
+        {"uuid": item.uuid, "name": item.name, "is_shared": True}
+    )
+    assert Image.find_by_fingerprints([item.fingerprint, "missing"]) == {
+        item.fingerprint: item
+    }
+
+    db.cypher_query(
+        "MATCH (n:Image {uid: $uid}) REMOVE n.fingerprint", {"uid": item.uid}
+    )
+    assert Image.refresh_fingerprints(batch_size=1) >= 1
+    item.refresh()
+    assert item.fingerprint is not None
+    assert Image.find_by_fingerprints([item.fingerprint]) == {item.fingerprint: item}
+
+
+def test_add_images() -> None:
+    service = ComputeService(**service_model_dict(ServiceType.COMPUTE)).save()
+    other = ComputeService(**service_model_dict(ServiceType.COMPUTE)).save()
+    shared = SharedImageCreate(**image_schema_dict())
+    private = PrivateImageCreate(**image_schema_dict())
+
+    items = service.add_images([shared, private, shared])
+    assert isinstance(items[0], SharedImage)
+    assert isinstance(items[1], PrivateImage)
+    assert items[0] == items[2]
+    assert len(service.images) == 2
+
+    assert other.add_images([shared]) == items[:1]
+    assert len(items[0].services) == 2
+    assert service.add_images([shared, private]) == items[:2]
+    assert len(service.images) == 2
+    assert items[0].fingerprint == fingerprint(shared.dict())
+    assert items[0].content_hash is not None
+
+
+def test_add_images_changes() -> None:
+    service = ComputeService(**service_model_dict(ServiceType.COMPUTE)).save()
+    other = ComputeService(**service_model_dict(ServiceType.COMPUTE)).save()
+    shared = SharedImageCreate(**image_schema_dict())
+
+    changes = []
+    with capture(changes.append):
+        (item,) = service.add_images([shared])
+        other.add_images([shared])
+        service.add_images([shared])
+    assert [(i.op, i.entity_label, i.entity_uid) for i in changes] == [
+        (CREATE, "SharedImage", item.uid),
+        (CONNECT, "ComputeService", service.uid),
+        (CONNECT, "ComputeService", other.uid),
+    ]
+
+
+def test_add_images_scope() -> None:
+    providers = [Provider(**provider_model_dict()).save() for _ in range(2)]
+    services = []
+    for provider in [*providers, providers[0]]:
+        region = Region(**region_model_dict()).save()
+        provider.regions.connect(region)
+        service = ComputeService(**service_model_dict(ServiceType.COMPUTE)).save()
+        region.services.connect(service)
+        services.append(service)
+    shared = SharedImageCreate(**image_schema_dict())
+    private = PrivateImageCreate(**image_schema_dict())
+
+    items = services[0].add_images([shared, private])
+    assert services[1].add_images([shared])[0] == items[0]
+    assert services[1].add_images([private])[0] != items[1]
+    assert services[2].add_images([private])[0] == items[1]
+    found = Image.find_reusable([i.fingerprint for i in items], services[1].uid)
+    assert found[items[0].fingerprint] == (items[0], True)
+    assert found[items[1].fingerprint][0] != items[1]
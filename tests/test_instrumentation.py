@@ -0,0 +1,80 @@
+import logging
+
+import pytest
+from neo4j.exceptions import CypherSyntaxError
+from neomodel import db
+
+from fedreg.instrumentation import (
+    LoggingSink,
+    OpenMetricsSink,
+    QueryCollector,
+    instrument,
+    is_enabled,
+    query_hash,
+)
+from fedreg.provider.models import Provider
+from fedreg.provider.schemas_extended import ProviderReadExtended
+from fedreg.region.models import Region
+from tests.models.utils import provider_model_dict, region_model_dict
+
+
+def test_disabled_by_default() -> None:
+    assert not is_enabled()
+    assert "cypher_query" not in vars(db)
+    with instrument(QueryCollector()):
+        assert is_enabled()
+        assert "cypher_query" in vars(db)
+    assert not is_enabled()
+    assert "cypher_query" not in vars(db)
+
+
+def test_query_hash_ignores_indentation() -> None:
+    assert query_hash("MATCH (n)\n    RETURN n") == query_hash("MATCH (n) RETURN n")
+    assert query_hash("MATCH (n) RETURN n") != query_hash("MATCH (m) RETURN m")
+
+
+def test_collect_schema_queries() -> None:
+    provider = Provider(**provider_model_dict()).save()
+    provider.regions.connect(Region(**region_model_dict()).save())
+
+    collector = QueryCollector()
+    metrics = OpenMetricsSink()
+    with instrument(collector), instrument(metrics):
+        ProviderReadExtended.from_orm(provider)
+        provider.images(limit=1)
+
+    assert collector.count > 0
+    assert collector.duration > 0
+    callers = collector.by_caller()
+    assert "fedreg.core:ProviderReadExtended.get_relationships" in callers
+    assert "fedreg.provider.models:Provider._catalog" in callers
+    assert sum(callers.values()) == collector.count
+    assert all(i.error is None for i in collector.records)
+
+    text = metrics.render()
+    assert text.endswith("# EOF\n")
+    assert (
+        f'fedreg_db_queries_total{{caller="fedreg.provider.models:Provider._catalog"}} '
+        f"{callers['fedreg.provider.models:Provider._catalog']}"
+    ) in text
+
+
+def test_failed_query_is_recorded(caplog: pytest.LogCaptureFixture) -> None:
+    collector = QueryCollector()
+    caplog.set_level(logging.DEBUG, logger="fedreg.instrumentation")
+    with instrument(collector), instrument(LoggingSink()):
+        with pytest.raises(CypherSyntaxError):
+            db.cypher_query("NOT A QUERY")
+    assert collector.count == 1
+    assert collector.records[0].error is not None
+    assert collector.records[0].rows == 0
+    assert collector.records[0].query_hash in caplog.text
+
+
+def test_wrapper_outlives_instrumentation() -> None:
+    collector = QueryCollector()
+    with instrument(collector):
+        cypher_query = db.cypher_query
+    results, _ = cypher_query("RETURN 1")
+    assert results == [[1]]
+    assert collector.count == 1
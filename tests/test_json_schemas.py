@@ -0,0 +1,56 @@
+import json
+from pathlib import Path
+
+from fedreg.json_schemas import (
+    build_registry,
+    load_registry,
+    models,
+    registry_key,
+)
+from fedreg.project.schemas_extended import ProjectReadExtended
+from fedreg.provider.schemas import ProviderQuery
+from fedreg.provider.schemas_extended import (
+    ProviderCreateExtended,
+    ProviderReadExtended,
+)
+
+
+def test_models() -> None:
+    items = models()
+    assert items["fedreg.provider.schemas_extended.ProviderCreateExtended"] is (
+        ProviderCreateExtended
+    )
+    assert items["fedreg.provider.schemas.ProviderQuery"] is ProviderQuery
+    assert len(set(items.values())) == len(items)
+
+
+def test_build_registry() -> None:
+    registry = build_registry()
+    assert registry["key"] == registry_key()
+    name = "fedreg.project.schemas_extended.ProjectReadExtended"
+    assert registry["schemas"][name] == ProjectReadExtended.schema()
+
+
+def test_load_registry(tmp_path: Path) -> None:
+    path = tmp_path / "schemas.json"
+    assert not load_registry(path, rebuild=False)
+    assert load_registry(path)
+    registry = json.loads(path.read_text())
+    assert registry["key"] == registry_key()
+
+    name = "fedreg.provider.schemas_extended.ProviderReadExtended"
+    registry["schemas"][name] = {"title": "Cached"}
+    path.write_text(json.dumps(registry))
+    assert load_registry(path, rebuild=False)
+    assert ProviderReadExtended.schema() == {"title": "Cached"}
+    assert json.loads(ProviderReadExtended.schema_json()) == {"title": "Cached"}
+    ProviderReadExtended.__schema_cache__.clear()
+    assert ProviderReadExtended.schema()["title"] == "ProviderReadExtended"
+
+
+def test_stale_registry(tmp_path: Path) -> None:
+    path = tmp_path / "schemas.json"
+    path.write_text(json.dumps({"key": "old", "schemas": {}}))
+    assert not load_registry(path, rebuild=False)
+    assert load_registry(path)
+    assert json.loads(path.read_text())["key"] == registry_key()
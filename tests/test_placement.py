@@ -0,0 +1,165 @@
+import math
+from datetime import date, timedelta
+
+from fedreg.flavor.models import PrivateFlavor, SharedFlavor
+from fedreg.location.models import Location
+from fedreg.placement import (
+    CRITERIA,
+    PlacementRequest,
+    Weights,
+    normalize,
+    rank,
+    rank_regions,
+)
+from fedreg.project.models import Project
+from fedreg.provider.enum import ProviderStatus
+from fedreg.provider.models import Provider
+from fedreg.quota.models import ComputeQuota
+from fedreg.region.models import Region
+from fedreg.service.enum import ServiceType
+from fedreg.service.models import ComputeService
+from fedreg.sla.models import SLA
+from fedreg.user_group.models import UserGroup
+from tests.models.utils import (
+    flavor_model_dict,
+    location_model_dict,
+    project_model_dict,
+    provider_model_dict,
+    quota_model_dict,
+    region_model_dict,
+    service_model_dict,
+    sla_model_dict,
+    user_group_model_dict,
+)
+
+
+def row(region: str, **kwargs) -> tuple:
+    values = {
+        "status": "active",
+        "flavors": 1,
+        "cpu": 1.0,
+        "ram": 1.0,
+        "limits": (-1, -1, -1),
+        "usages": (0, 0, 0),
+        "bandwidth": (10.0, 10.0),
+        "distance": None,
+        **kwargs,
+    }
+    return (
+        region,
+        f"provider-{region}",
+        f"service-{region}",
+        "project",
+        values["status"],
+        values["flavors"],
+        values["cpu"],
+        values["ram"],
+        *values["limits"],
+        *values["usages"],
+        *values["bandwidth"],
+        values["distance"],
+    )
+
+
+def test_normalize() -> None:
+    assert normalize([1, None, math.inf, 3]).tolist() == [0, 0, 1, 1]
+    assert normalize([1, None, math.inf, 3], invert=True).tolist() == [1, 0, 0, 0]
+    assert normalize([2, 2]).tolist() == [1, 1]
+    assert normalize([]).tolist() == []
+
+
+def test_rank() -> None:
+    rows = [
+        row("a", limits=(4, 4096, 10), distance=500.0),
+        row("b", limits=(4, 4096, 10), distance=100.0, status="limited"),
+        row("c", limits=(1, 4096, 10), distance=10.0),
+        row("d", flavors=3, bandwidth=(20.0, 20.0)),
+    ]
+    request = PlacementRequest(cores=2, ram=1024)
+    placements = rank(rows, request)
+    assert [i.region for i in placements] == ["d", "a", "b"]
+    assert placements[0].provider == "provider-d"
+    assert set(placements[0].explanation) == set(CRITERIA)
+    assert math.isclose(
+        placements[0].score,
+        sum(i.contribution for i in placements[0].explanation.values()),
+    )
+    assert placements[0].explanation["capacity"].value == math.inf
+    assert placements[0].explanation["distance"].score == 0
+    assert placements[2].explanation["status"].value == 0.5
+
+    weights = Weights(capacity=0, flavors=0, bandwidth_in=0, bandwidth_out=0)
+    placements = rank(rows, request, weights=weights, k=2)
+    assert [i.region for i in placements] == ["a", "b"]
+    placements = rank(rows, request, weights=Weights(0, 0, 0, 0, 1, 0))
+    assert [i.region for i in placements[:2]] == ["b", "a"]
+    assert rank(rows, request._replace(instances=100), k=10) == rank(
+        rows[3:], request._replace(instances=100)
+    )
+    assert rank([], request) == []
+
+
+def test_rank_dimensions() -> None:
+    rows = [row("a", limits=(4, 4096, 10)), row("b", limits=(4, 4096, 0))]
+    placements = rank(rows, PlacementRequest(cores=0, ram=0, instances=1))
+    assert [i.region for i in placements] == ["a"]
+    assert placements[0].explanation["capacity"].value == 10
+    placements = rank(rows, PlacementRequest(cores=2, ram=0, instances=0))
+    assert {i.region for i in placements} == {"a", "b"}
+    assert placements[0].explanation["capacity"].value == math.inf
+
+
+def test_rank_regions() -> None:
+    group = UserGroup(**user_group_model_dict()).save()
+    today = date.today()
+    sla = SLA(
+        **{
+            **sla_model_dict(),
+            "start_date": today - timedelta(days=1),
+            "end_date": today + timedelta(days=1),
+        }
+    ).save()
+    group.slas.connect(sla)
+    project = Project(**project_model_dict()).save()
+    sla.projects.connect(project)
+
+    services = []
+    for status in (
+        ProviderStatus.ACTIVE,
+        ProviderStatus.LIMITED,
+        ProviderStatus.REMOVED,
+    ):
+        provider = Provider(**provider_model_dict(), status=status.value).save()
+        provider.projects.connect(project)
+        region = Region(**region_model_dict()).save()
+        provider.regions.connect(region)
+        location = Location(**location_model_dict(), latitude=45, longitude=9).save()
+        region.location.connect(location)
+        service = ComputeService(**service_model_dict(ServiceType.COMPUTE)).save()
+        region.services.connect(service)
+        quota = ComputeQuota(**quota_model_dict(), cores=8, ram=8192).save()
+        quota.project.connect(project)
+        quota.service.connect(service)
+        services.append(service)
+    for service in services:
+        service.flavors.connect(
+            SharedFlavor(**flavor_model_dict(), vcpus=2, ram=2048).save()
+        )
+    flavor = PrivateFlavor(**flavor_model_dict(), vcpus=4, ram=2048).save()
+    services[1].flavors.connect(flavor)
+    project.private_flavors.connect(flavor)
+    services[0].flavors.connect(
+        PrivateFlavor(**flavor_model_dict(), vcpus=4, ram=2048).save()
+    )
+
+    request = PlacementRequest(cores=2, ram=1024, latitude=45, longitude=9)
+    placements = rank_regions(group.uid, request)
+    assert [i.service for i in placements] == [services[0].uid, services[1].uid]
+    assert placements[0].project == project.uid
+    assert placements[0].explanation["distance"].value == 0
+    assert placements[1].explanation["flavors"].value == 2
+
+    placements = rank_regions(group.uid, request._replace(cores=4))
+    assert [i.service for i in placements] == [services[1].uid]
+    assert rank_regions(group.uid, request._replace(gpus=1)) == []
+    assert rank_regions(group.uid, request, day=today + timedelta(days=2)) == []
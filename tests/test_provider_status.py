@@ -0,0 +1,132 @@
+import pytest
+from neomodel import db
+
+from fedreg.identity_provider.models import IdentityProvider
+from fedreg.identity_provider.schemas_extended import IdentityProviderReadExtended
+from fedreg.image.models import SharedImage
+from fedreg.instrumentation import QueryCollector, instrument
+from fedreg.project.models import Project
+from fedreg.provider.enum import ProviderStatus
+from fedreg.provider.models import Provider
+from fedreg.provider.status import (
+    ProviderStatusCache,
+    available_only,
+    provider_statuses,
+)
+from fedreg.quota.models import ComputeQuota
+from fedreg.region.models import Region
+from fedreg.service.enum import ServiceType
+from fedreg.service.models import ComputeService
+from tests.models.utils import (
+    auth_method_model_dict,
+    identity_provider_model_dict,
+    image_model_dict,
+    project_model_dict,
+    provider_model_dict,
+    quota_model_dict,
+    region_model_dict,
+    service_model_dict,
+)
+
+
+def test_cache() -> None:
+    now = [0.0]
+    cache = ProviderStatusCache(max_age=10, clock=lambda: now[0])
+    active = Provider(**provider_model_dict()).save()
+    removed = Provider(
+        **provider_model_dict(), status=ProviderStatus.REMOVED.value
+    ).save()
+
+    collector = QueryCollector()
+    with instrument(collector):
+        assert cache.available() == {active.uid}
+        assert cache.is_available(active.uid)
+        assert not cache.is_available(removed.uid)
+        assert cache.available([ProviderStatus.REMOVED.value]) == {removed.uid}
+    assert collector.count == 1
+
+    cache.update(removed.uid, ProviderStatus.ACTIVE.value)
+    assert cache.available() == {active.uid, removed.uid}
+    cache.discard(removed.uid)
+    assert cache.available() == {active.uid}
+
+    db.cypher_query(
+        "MATCH (p:Provider {uid: $uid}) SET p.status = $status",
+        {"uid": active.uid, "status": ProviderStatus.MAINTENANCE.value},
+    )
+    assert cache.is_available(active.uid)
+    now[0] = 11
+    assert not cache.is_available(active.uid)
+    cache.invalidate()
+    assert cache.status("missing") is None
+
+    late = Provider(**provider_model_dict()).save()
+    collector = QueryCollector()
+    with instrument(collector):
+        assert cache.status("missing") is None
+        assert cache.is_available(late.uid)
+        assert cache.status("missing") is None
+        assert cache.is_available(late.uid)
+    assert collector.count == 1
+
+
+def test_hooks() -> None:
+    provider = Provider(**provider_model_dict()).save()
+    assert provider_statuses.is_available(provider.uid)
+    provider.status = ProviderStatus.MAINTENANCE.value
+    provider.save()
+    assert not provider_statuses.is_available(provider.uid)
+    assert provider.uid in provider_statuses.available(
+        [ProviderStatus.MAINTENANCE.value]
+    )
+    with pytest.raises(RuntimeError), db.transaction:
+        provider.status = ProviderStatus.ACTIVE.value
+        provider.save()
+        raise RuntimeError
+    assert not provider_statuses.is_available(provider.uid)
+    provider.delete()
+    assert provider_statuses.status(provider.uid) is None
+
+
+def test_available_only() -> None:
+    provider = Provider(**provider_model_dict()).save()
+    region = Region(**region_model_dict()).save()
+    provider.regions.connect(region)
+    service = ComputeService(**service_model_dict(ServiceType.COMPUTE)).save()
+    region.services.connect(service)
+    image = SharedImage(**image_model_dict()).save()
+    service.images.connect(image)
+    project = Project(**project_model_dict()).save()
+    provider.projects.connect(project)
+    quota = ComputeQuota(**quota_model_dict()).save()
+    quota.project.connect(project)
+    quota.service.connect(service)
+
+    assert provider.images(available_only=True) == [image]
+    assert provider.count_images(available_only=True) == 1
+    assert project.shared_images(available_only=True) == [image]
+
+    db.cypher_query(
+        "MATCH (p:Provider {uid: $uid}) SET p.status = $status",
+        {"uid": provider.uid, "status": ProviderStatus.REMOVED.value},
+    )
+    assert provider_statuses.is_available(provider.uid)
+    assert provider.images(available_only=True) == []
+    assert provider.count_images(available_only=True) == 0
+    assert project.shared_images(available_only=True) == []
+    assert provider.images() == [image]
+    assert project.shared_images() == [image]
+
+
+def test_available_only_schemas() -> None:
+    idp = IdentityProvider(**identity_provider_model_dict()).save()
+    providers = [Provider(**provider_model_dict()).save() for _ in range(2)]
+    for provider in providers:
+        provider.identity_providers.connect(idp, auth_method_model_dict())
+    providers[1].status = ProviderStatus.MAINTENANCE.value
+    providers[1].save()
+
+    assert len(IdentityProviderReadExtended.from_orm(idp).providers) == 2
+    with available_only():
+        item = IdentityProviderReadExtended.from_orm(idp)
+    assert [i.uid for i in item.providers] == [providers[0].uid]
@@ -0,0 +1,186 @@
+from collections.abc import Callable, Generator
+from typing import Any
+
+import pytest
+from pydantic import BaseModel
+
+from fedreg.flavor.schemas_extended import (
+    FlavorReadExtended,
+    FlavorReadExtendedPublic,
+)
+from fedreg.identity_provider.schemas_extended import (
+    IdentityProviderReadExtended,
+    IdentityProviderReadExtendedPublic,
+)
+from fedreg.image.schemas_extended import ImageReadExtended, ImageReadExtendedPublic
+from fedreg.instrumentation import QueryBudgetExceededError, query_budget
+from fedreg.location.schemas_extended import (
+    LocationReadExtended,
+    LocationReadExtendedPublic,
+)
+from fedreg.network.schemas_extended import (
+    NetworkReadExtended,
+    NetworkReadExtendedPublic,
+)
+from fedreg.project.schemas_extended import (
+    ProjectReadExtended,
+    ProjectReadExtendedPublic,
+)
+from fedreg.provider.schemas_extended import (
+    ProviderReadExtended,
+    ProviderReadExtendedPublic,
+)
+from fedreg.quota.schemas_extended import (
+    BlockStorageQuotaReadExtended,
+    BlockStorageQuotaReadExtendedPublic,
+    ComputeQuotaReadExtended,
+    ComputeQuotaReadExtendedPublic,
+    NetworkQuotaReadExtended,
+    NetworkQuotaReadExtendedPublic,
+    ObjectStoreQuotaReadExtended,
+    ObjectStoreQuotaReadExtendedPublic,
+)
+from fedreg.region.schemas_extended import (
+    RegionReadExtended,
+    RegionReadExtendedPublic,
+)
+from fedreg.service.schemas_extended import (
+    BlockStorageServiceReadExtended,
+    BlockStorageServiceReadExtendedPublic,
+    ComputeServiceReadExtended,
+    ComputeServiceReadExtendedPublic,
+    IdentityServiceReadExtended,
+    IdentityServiceReadExtendedPublic,
+    NetworkServiceReadExtended,
+    NetworkServiceReadExtendedPublic,
+    ObjectStoreServiceReadExtended,
+    ObjectStoreServiceReadExtendedPublic,
+)
+from fedreg.sla.schemas_extended import SLAReadExtended, SLAReadExtendedPublic
+from fedreg.user_group.schemas_extended import (
+    UserGroupReadExtended,
+    UserGroupReadExtendedPublic,
+)
+from tests.query_budgets import build_canonical_graph, dump_budgets, load_budgets
+
+SCHEMAS = [
+    (FlavorReadExtended, "private_flavor"),
+    (FlavorReadExtendedPublic, "private_flavor"),
+    (IdentityProviderReadExtended, "identity_provider"),
+    (IdentityProviderReadExtendedPublic, "identity_provider"),
+    (ImageReadExtended, "private_image"),
+    (ImageReadExtendedPublic, "private_image"),
+    (LocationReadExtended, "location"),
+    (LocationReadExtendedPublic, "location"),
+    (NetworkReadExtended, "private_network"),
+    (NetworkReadExtendedPublic, "private_network"),
+    (ProjectReadExtended, "project"),
+    (ProjectReadExtendedPublic, "project"),
+    (ProviderReadExtended, "provider"),
+    (ProviderReadExtendedPublic, "provider"),
+    (BlockStorageQuotaReadExtended, "block_storage_quota"),
+    (BlockStorageQuotaReadExtendedPublic, "block_storage_quota"),
+    (ComputeQuotaReadExtended, "compute_quota"),
+    (ComputeQuotaReadExtendedPublic, "compute_quota"),
+    (NetworkQuotaReadExtended, "network_quota"),
+    (NetworkQuotaReadExtendedPublic, "network_quota"),
+    (ObjectStoreQuotaReadExtended, "object_store_quota"),
+    (ObjectStoreQuotaReadExtendedPublic, "object_store_quota"),
+    (RegionReadExtended, "region"),
+    (RegionReadExtendedPublic, "region"),
+    (BlockStorageServiceReadExtended, "block_storage_service"),
+    (BlockStorageServiceReadExtendedPublic, "block_storage_service"),
+    (ComputeServiceReadExtended, "compute_service"),
+    (ComputeServiceReadExtendedPublic, "compute_service"),
+    (IdentityServiceReadExtended, "identity_service"),
+    (IdentityServiceReadExtendedPublic, "identity_service"),
+    (NetworkServiceReadExtended, "network_service"),
+    (NetworkServiceReadExtendedPublic, "network_service"),
+    (ObjectStoreServiceReadExtended, "object_store_service"),
+    (ObjectStoreServiceReadExtendedPublic, "object_store_service"),
+    (SLAReadExtended, "sla"),
+    (SLAReadExtendedPublic, "sla"),
+    (UserGroupReadExtended, "user_group"),
+    (UserGroupReadExtendedPublic, "user_group"),
+]
+DELETES = ["provider", "identity_provider", "user_group", "project", "region"]
+
+
+@pytest.fixture(scope="module")
+def budgets(request: pytest.FixtureRequest) -> Generator[dict[str, Any], Any, None]:
+    """Committed baselines, overwritten at the end when updating them."""
+    values = load_budgets()
+    yield values
+    if request.config.getoption("update_query_budgets"):
+        dump_budgets(values)
+
+
+def check(
+    budgets: dict[str, Any],
+    key: str,
+    request: pytest.FixtureRequest,
+    guard: Callable,
+    func: Callable[[], Any],
+) -> None:
+    """Run func within the budget or record the measured value.
+
+    Baselines are only ever measured, never guessed: a missing one skips the check
+    until it is recorded.
+    """
+    if request.config.getoption("update_query_budgets"):
+        with guard(float("inf")) as collector:
+            func()
+        budgets[key] = collector.count
+    elif key not in budgets:
+        pytest.skip(
+            f"No measured baseline for {key}: run pytest "
+            "tests/test_query_budgets.py --update-query-budgets against Neo4j"
+        )
+    else:
+        with guard(budgets[key], name=key):
+            func()
+
+
+@pytest.mark.parametrize("schema, node", SCHEMAS, ids=[i[0].__name__ for i in SCHEMAS])
+def test_read_extended_budget(
+    schema: type[BaseModel],
+    node: str,
+    budgets: dict[str, Any],
+    request: pytest.FixtureRequest,
+    query_budget_guard: Callable,
+) -> None:
+    """Serialization of each extended schema stays within its baseline."""
+    item = build_canonical_graph()[node]
+    check(
+        budgets,
+        schema.__name__,
+        request,
+        query_budget_guard,
+        lambda: schema.from_orm(item),
+    )
+
+
+@pytest.mark.parametrize("node", DELETES)
+def test_delete_budget(
+    node: str,
+    budgets: dict[str, Any],
+    request: pytest.FixtureRequest,
+    query_budget_guard: Callable,
+) -> None:
+    """Delete cascades stay within their baseline."""
+    item = build_canonical_graph()[node]
+    check(
+        budgets,
+        f"{type(item).__name__}.delete",
+        request,
+        query_budget_guard,
+        item.delete,
+    )
+
+
+def test_budget_exceeded() -> None:
+    """The error reports the queries issued by each caller."""
+    item = build_canonical_graph()["provider"]
+    with pytest.raises(QueryBudgetExceededError, match="ProviderReadExtended"):
+        with query_budget(1, name="ProviderReadExtended"):
+            ProviderReadExtended.from_orm(item)
@@ -0,0 +1,102 @@
+from datetime import date, datetime, timedelta, timezone
+
+from fedreg.project.models import Project
+from fedreg.quota.history import (
+    METRICS,
+    DailyUsage,
+    MetricStats,
+    downsample,
+    record_usage,
+    rollups,
+    series,
+    summarize,
+)
+from fedreg.quota.models import ComputeQuota
+from fedreg.service.enum import ServiceType
+from fedreg.service.models import ComputeService
+from tests.models.utils import (
+    project_model_dict,
+    quota_model_dict,
+    service_model_dict,
+)
+
+DAY = datetime(2024, 3, 1, tzinfo=timezone.utc)
+
+
+def test_metrics() -> None:
+    assert METRICS["compute"] == ("cores", "instances", "ram")
+    assert set(METRICS) == {"block-storage", "compute", "network", "object-store"}
+
+
+def test_summarize() -> None:
+    assert summarize([]) == MetricStats(None, None, None, None)
+    assert summarize([-1, -1]) == MetricStats(None, None, None, None)
+    assert summarize([4, -1, 2]) == MetricStats(2, 4, 3, 4)
+    assert summarize(range(1, 101)) == MetricStats(1, 100, 50.5, 95)
+
+
+def test_history() -> None:
+    project = Project(**project_model_dict()).save()
+    service = ComputeService(**service_model_dict(ServiceType.COMPUTE)).save()
+    usage = ComputeQuota(**quota_model_dict(), usage=True, cores=1, ram=100).save()
+    usage.project.connect(project)
+    usage.service.connect(service)
+    limit = ComputeQuota(**quota_model_dict(), cores=10).save()
+    limit.project.connect(project)
+    limit.service.connect(service)
+
+    for i in range(3):
+        usage.cores = i + 1
+        usage.save()
+        assert record_usage(DAY + timedelta(hours=i)) >= 1
+    usage.cores = 8
+    usage.save()
+    record_usage(DAY + timedelta(days=1))
+
+    samples = series(project.uid, start=DAY, end=DAY + timedelta(days=2))
+    assert [i.values["cores"] for i in samples] == [1, 2, 3, 8]
+    assert samples[0].timestamp == DAY
+    assert samples[0].values == {"cores": 1, "instances": None, "ram": 100}
+    assert samples[0].service == service.uid
+    samples = series(
+        project.uid, start=DAY + timedelta(minutes=30), end=DAY + timedelta(hours=2)
+    )
+    assert [i.values["cores"] for i in samples] == [2, 3]
+    assert series(project.uid, start=DAY, end=DAY, type="network") == []
+
+    expected = [
+        DailyUsage(
+            DAY.date(),
+            project.uid,
+            service.uid,
+            "compute",
+            False,
+            3,
+            {
+                "cores": MetricStats(1, 3, 2, 3),
+                "instances": MetricStats(None, None, None, None),
+                "ram": MetricStats(100, 100, 100, 100),
+            },
+        ),
+        DailyUsage(
+            DAY.date() + timedelta(days=1),
+            project.uid,
+            service.uid,
+            "compute",
+            False,
+            1,
+            {
+                "cores": MetricStats(8, 8, 8, 8),
+                "instances": MetricStats(None, None, None, None),
+                "ram": MetricStats(100, 100, 100, 100),
+            },
+        ),
+    ]
+    days = {"start": DAY.date(), "end": date(2024, 3, 2)}
+    assert rollups(project.uid, **days) == expected
+
+    assert downsample(date(2024, 3, 2), batch_size=1) == 1
+    assert downsample(date(2024, 3, 2)) == 0
+    assert rollups(project.uid, **days) == expected
+    samples = series(project.uid, start=DAY, end=DAY + timedelta(days=2))
+    assert [i.values["cores"] for i in samples] == [8]
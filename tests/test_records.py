@@ -0,0 +1,56 @@
+import pytest
+
+from fedreg.flavor.models import PrivateFlavor, SharedFlavor
+from fedreg.flavor.schemas import FlavorRead, FlavorReadPublic, FlavorRecord
+from fedreg.quota.models import ComputeQuota
+from fedreg.quota.schemas import ComputeQuotaRead, ComputeQuotaRecord
+from tests.models.utils import flavor_model_dict, quota_model_dict
+
+
+def test_record_fields() -> None:
+    assert FlavorRecord.__fields__[0] == "uid"
+    assert "schema_type" not in FlavorRecord.__fields__
+    assert set(FlavorRecord.__fields__) == set(FlavorRead.__fields__) - {"schema_type"}
+    assert FlavorRecord.__module__ == "fedreg.flavor.schemas"
+    assert not hasattr(FlavorRecord(uid="uid", name="a", uuid="b"), "__dict__")
+
+
+def test_record_constructors() -> None:
+    d = {"uid": "uid", "name": "name", "uuid": "uuid"}
+    item = FlavorRecord.from_mapping(d)
+    assert item == FlavorRecord(**d)
+    assert item == FlavorRecord("uid", "", "name", "uuid")
+    assert item == FlavorRecord.from_row([item.to_dict()[i] for i in item.__fields__])
+    assert item.ram == 0
+    assert item.gpu_model is None
+
+    with pytest.raises(TypeError):
+        FlavorRecord(uid="uid", unknown=1)
+    with pytest.raises(TypeError):
+        FlavorRecord("uid", uid="uid")
+    with pytest.raises(ValueError):
+        FlavorRecord.from_row(["uid"])
+
+
+def test_record_to_schema() -> None:
+    item = FlavorRecord(uid="uid", name="name", uuid="uuid", is_shared=True)
+    schema = item.to_schema()
+    assert isinstance(schema, FlavorRead)
+    assert schema.dict(exclude={"schema_type"}) == item.to_dict()
+    assert isinstance(item.to_schema(FlavorReadPublic), FlavorReadPublic)
+
+
+def test_fetch() -> None:
+    flavors = [PrivateFlavor(**flavor_model_dict()).save() for _ in range(3)]
+    flavors += [SharedFlavor(**flavor_model_dict()).save() for _ in range(2)]
+    ComputeQuota(**quota_model_dict()).save()
+
+    items = list(FlavorRecord.fetch(batch_size=2))
+    assert [i.uid for i in items] == sorted(i.uid for i in flavors)
+    for item in items:
+        flavor = next(i for i in flavors if i.uid == item.uid)
+        assert item.to_schema() == FlavorRead.from_orm(flavor)
+
+    items = list(ComputeQuotaRecord.fetch())
+    assert len(items) == 1
+    assert isinstance(items[0].to_schema(), ComputeQuotaRead)
@@ -0,0 +1,93 @@
+from fedreg.changes import ChangeLog, capture
+from fedreg.image.models import PrivateImage, SharedImage
+from fedreg.project.models import Project
+from fedreg.project.schemas_extended import ProjectReadExtended
+from fedreg.provider.enum import ProviderStatus
+from fedreg.provider.models import Provider
+from fedreg.provider.schemas_extended import ProviderReadExtended
+from fedreg.quota.models import ComputeQuota
+from fedreg.region.models import Region
+from fedreg.replica import GraphReplica
+from fedreg.service.enum import ServiceType
+from fedreg.service.models import ComputeService
+from tests.models.utils import (
+    image_model_dict,
+    project_model_dict,
+    provider_model_dict,
+    quota_model_dict,
+    region_model_dict,
+    service_model_dict,
+)
+
+
+def build_graph() -> tuple[Provider, Project]:
+    provider = Provider(**provider_model_dict()).save()
+    region = Region(**region_model_dict()).save()
+    service = ComputeService(**service_model_dict(ServiceType.COMPUTE)).save()
+    project = Project(**project_model_dict()).save()
+    quota = ComputeQuota(**quota_model_dict()).save()
+    shared = SharedImage(**image_model_dict()).save()
+    private = PrivateImage(**image_model_dict()).save()
+    provider.regions.connect(region)
+    provider.projects.connect(project)
+    region.services.connect(service)
+    service.images.connect(shared)
+    service.images.connect(private)
+    service.quotas.connect(quota)
+    project.quotas.connect(quota)
+    project.private_images.connect(private)
+    return provider, project
+
+
+def test_replica_matches_db() -> None:
+    provider, project = build_graph()
+    replica = GraphReplica(batch_size=2)
+    replica.load()
+
+    item = replica.get(provider.uid)
+    assert item is not None
+    assert replica.get("missing") is None
+    assert len(replica.nodes(Provider)) == 1
+    assert len(replica.nodes(ComputeService)) == 1
+
+    assert ProviderReadExtended.from_orm(item) == ProviderReadExtended.from_orm(
+        provider
+    )
+    assert [i.uid for i in item.images()] == [i.uid for i in provider.images()]
+    assert [i.uid for i in item.images(limit=1)] == [
+        i.uid for i in provider.images(limit=1)
+    ]
+
+    item = replica.get(project.uid)
+    assert item.provider.uid == provider.uid
+    assert [i.uid for i in item.shared_images()] == [
+        i.uid for i in project.shared_images()
+    ]
+    assert ProjectReadExtended.from_orm(item) == ProjectReadExtended.from_orm(project)
+
+
+def test_replica_available_only() -> None:
+    provider, project = build_graph()
+    provider.status = ProviderStatus.REMOVED.value
+    provider.save()
+    replica = GraphReplica()
+    replica.load()
+    assert replica.images(provider.uid, available_only=True) == []
+    assert replica.shared_images(project.uid, available_only=True) == []
+    assert len(replica.images(provider.uid)) == 2
+    assert len(replica.shared_images(project.uid)) == 1
+
+
+def test_replica_refresh() -> None:
+    provider, _ = build_graph()
+    replica = GraphReplica()
+    replica.load()
+    assert not replica.refresh()
+
+    old = replica.get(provider.uid)
+    provider.name = "new-name"
+    with capture(ChangeLog()):
+        provider.save()
+    assert replica.refresh()
+    assert replica.get(provider.uid).name == "new-name"
+    assert old.name != "new-name"
@@ -0,0 +1,69 @@
+from fedreg.flavor.models import SharedFlavor
+from fedreg.image.models import PrivateImage, SharedImage
+from fedreg.network.models import SharedNetwork
+from fedreg.project.models import Project
+from fedreg.quota.models import ComputeQuota
+from fedreg.search import lucene_query, search
+from fedreg.service.enum import ServiceType
+from fedreg.service.models import ComputeService
+from tests.models.utils import (
+    flavor_model_dict,
+    image_model_dict,
+    network_model_dict,
+    project_model_dict,
+    quota_model_dict,
+    service_model_dict,
+)
+
+
+def test_lucene_query() -> None:
+    assert lucene_query("Ubuntu 22") == "ubuntu ubuntu* 22 22*"
+    assert lucene_query("gpu:a100 OR") == r"gpu\:a100 gpu\:a100* or or*"
+    assert lucene_query("  ") == ""
+    assert search("  ") == []
+
+
+def test_search() -> None:
+    project = Project(**project_model_dict()).save()
+    other_project = Project(**project_model_dict()).save()
+    service = ComputeService(**service_model_dict(ServiceType.COMPUTE)).save()
+    quota = ComputeQuota(**quota_model_dict()).save()
+    quota.project.connect(project)
+    quota.service.connect(service)
+
+    shared_image = SharedImage(**{**image_model_dict(), "tags": ["gpu", "ubuntu"]})
+    shared_image.save()
+    service.images.connect(shared_image)
+    private_image = PrivateImage(**{**image_model_dict(), "os_distro": "ubuntu"})
+    private_image.save()
+    service.images.connect(private_image)
+    project.private_images.connect(private_image)
+    hidden_image = PrivateImage(**{**image_model_dict(), "os_distro": "ubuntu"})
+    hidden_image.save()
+    service.images.connect(hidden_image)
+    other_project.private_images.connect(hidden_image)
+    flavor = SharedFlavor(**{**flavor_model_dict(), "name": "gpu.large"}).save()
+    service.flavors.connect(flavor)
+    SharedNetwork(**{**network_model_dict(), "tags": ["ubuntu"]}).save()
+
+    assert shared_image.search_tags == "gpu ubuntu"
+
+    uids = {node.uid for node, _ in search("ubuntu")}
+    assert uids >= {shared_image.uid, private_image.uid, hidden_image.uid}
+
+    results = search("ubuntu gpu", project=project.uid)
+    assert {node.uid for node, _ in results} == {
+        shared_image.uid,
+        private_image.uid,
+        flavor.uid,
+    }
+    assert results[0][0].uid == shared_image.uid
+    assert isinstance(results[0][0], SharedImage)
+    assert [score for _, score in results] == sorted(
+        (score for _, score in results), reverse=True
+    )
+
+    results = search("ubuntu", project=project.uid, labels=("Flavor",))
+    assert results == []
+    results = search(project.name, project=project.uid)
+    assert [node.uid for node, _ in results] == [project.uid]
@@ -0,0 +1,105 @@
+import json
+import zipfile
+from io import BytesIO
+from typing import Any
+
+import pytest
+from neomodel import db
+
+from fedreg import snapshot
+from fedreg.identity_provider.models import IdentityProvider
+from fedreg.image.models import PrivateImage
+from fedreg.project.models import Project
+from fedreg.provider.models import Provider
+from fedreg.region.models import Region
+from fedreg.service.enum import ServiceType
+from fedreg.service.models import ComputeService
+from fedreg.snapshot import (
+    FORMAT,
+    FORMAT_VERSION,
+    MANIFEST,
+    export_snapshot,
+    import_snapshot,
+)
+from tests.models.utils import (
+    auth_method_model_dict,
+    identity_provider_model_dict,
+    image_model_dict,
+    project_model_dict,
+    provider_model_dict,
+    region_model_dict,
+    service_model_dict,
+)
+
+
+def test_snapshot_round_trip() -> None:
+    """Export a small graph, clear the DB and restore it."""
+    provider = Provider(**provider_model_dict()).save()
+    region = Region(**region_model_dict()).save()
+    service = ComputeService(**service_model_dict(ServiceType.COMPUTE)).save()
+    project = Project(**project_model_dict()).save()
+    image = PrivateImage(**image_model_dict()).save()
+    idp = IdentityProvider(**identity_provider_model_dict()).save()
+    auth_method = auth_method_model_dict()
+    provider.regions.connect(region)
+    provider.projects.connect(project)
+    provider.identity_providers.connect(idp, auth_method)
+    region.services.connect(service)
+    service.images.connect(image)
+    project.private_images.connect(image)
+
+    buffer = BytesIO()
+    manifest = export_snapshot(buffer, batch_size=2)
+    assert sum(manifest["nodes"].values()) == 6
+    assert sum(manifest["relationships"].values()) == 6
+
+    db.clear_neo4j_database()
+    buffer.seek(0)
+    import_snapshot(buffer, batch_size=2)
+
+    restored = Provider.nodes.get(uid=provider.uid)
+    assert restored.name == provider.name
+    assert restored.regions.single().uid == region.uid
+    assert restored.projects.single().uid == project.uid
+    assert restored.images()[0].uid == image.uid
+    restored_idp = restored.identity_providers.single()
+    assert restored_idp.uid == idp.uid
+    rel = restored.identity_providers.relationship(restored_idp)
+    assert rel.idp_name == auth_method["idp_name"]
+    assert rel.protocol == auth_method["protocol"]
+
+    restored_image = PrivateImage.nodes.get(uid=image.uid)
+    assert restored_image.tags == image.tags
+    assert restored_image.projects.single().uid == project.uid
+
+
+def test_snapshot_import_is_atomic(monkeypatch: pytest.MonkeyPatch) -> None:
+    """A failing import leaves the DB unchanged."""
+    provider = Provider(**provider_model_dict()).save()
+    provider.regions.connect(Region(**region_model_dict()).save())
+    buffer = BytesIO()
+    export_snapshot(buffer)
+    db.clear_neo4j_database()
+    buffer.seek(0)
+
+    def fail(*args: Any) -> None:
+        raise RuntimeError("failed")
+
+    monkeypatch.setattr(snapshot, "_create_relationships", fail)
+    with pytest.raises(RuntimeError):
+        import_snapshot(buffer)
+    assert Provider.nodes.get_or_none(uid=provider.uid) is None
+
+
+@pytest.mark.parametrize(
+    "manifest",
+    [{"format": "other", "version": FORMAT_VERSION}, {"format": FORMAT, "version": 0}],
+)
+def test_snapshot_invalid_manifest(manifest: dict) -> None:
+    """Reject files which are not snapshots of the supported version."""
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        zf.writestr(MANIFEST, json.dumps(manifest))
+    buffer.seek(0)
+    with pytest.raises(ValueError):
+        import_snapshot(buffer)
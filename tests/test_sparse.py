@@ -0,0 +1,226 @@
+import pytest
+
+from fedreg.flavor.models import Flavor, PrivateFlavor
+from fedreg.flavor.schemas import FlavorRead
+from fedreg.flavor.schemas_extended import FlavorReadExtended
+from fedreg.identity_provider.models import IdentityProvider
+from fedreg.identity_provider.schemas_extended import IdentityProviderReadExtended
+from fedreg.instrumentation import QueryCollector, instrument
+from fedreg.project.models import Project
+from fedreg.provider.models import Provider
+from fedreg.provider.schemas_extended import ProviderReadExtended
+from fedreg.quota.models import ComputeQuota
+from fedreg.region.models import Region
+from fedreg.region.schemas_extended import RegionReadExtended
+from fedreg.service.enum import ServiceType
+from fedreg.service.models import ComputeService
+from fedreg.sparse import expand_view, parse_expand, parse_fields, sparse_view
+from tests.models.utils import (
+    flavor_model_dict,
+    project_model_dict,
+    provider_model_dict,
+    quota_model_dict,
+    region_model_dict,
+    service_model_dict,
+)
+
+
+def test_parse_fields() -> None:
+    assert parse_fields("uid, name,service.endpoint,service") == (
+        ("name", ()),
+        ("service", (("endpoint", ()),)),
+        ("uid", ()),
+    )
+    assert parse_fields(["service.region.name", "uid"]) == (
+        ("service", (("region", (("name", ()),)),)),
+        ("uid", ()),
+    )
+    with pytest.raises(ValueError):
+        parse_fields(" , ")
+    with pytest.raises(ValueError):
+        parse_fields("service..name")
+
+
+def test_sparse_view() -> None:
+    view = sparse_view(Flavor, FlavorReadExtended, "uid,name,is_shared,projects.name")
+    assert view is sparse_view(
+        Flavor, FlavorReadExtended, ["projects.name", "is_shared", "name", "uid"]
+    )
+    assert list(view.model.__fields__) == ["name", "uid", "is_shared", "projects"]
+    assert list(FlavorReadExtended.__fields__) != list(view.model.__fields__)
+    assert view.projection == (
+        "n {.is_shared, .name, projects: COLLECT { MATCH (n)<-[r_n_projects:"
+        "`CAN_USE_VM_FLAVOR`]-(n_projects:Project) RETURN n_projects {.name} "
+        "ORDER BY n_projects.uid }, .uid}"
+    )
+    item = view.model.parse_obj(
+        {"uid": "a", "name": "b", "is_shared": None, "projects": [{"name": "c"}]}
+    )
+    assert item.dict() == {
+        "name": "b",
+        "uid": "a",
+        "is_shared": None,
+        "projects": [{"name": "c"}],
+    }
+
+    view = sparse_view(Flavor, FlavorReadExtended, "uid,etag")
+    assert view.projection == ("n {etag: coalesce(n.tree_hash, n.content_hash), .uid}")
+
+    view = sparse_view(Flavor, FlavorReadExtended, "service")
+    assert view.projection.startswith("n {service: head(COLLECT { MATCH (n)<-[")
+    assert set(view.model.__fields__["service"].type_.__fields__) == {
+        "description",
+        "endpoint",
+        "etag",
+        "name",
+        "type",
+        "uid",
+    }
+
+    view = sparse_view(
+        IdentityProvider,
+        IdentityProviderReadExtended,
+        "providers.name,providers.relationship.protocol",
+    )
+    assert "relationship: r_n_providers {.protocol}" in view.projection
+    item = view.parse({"providers": [{"name": "a", "relationship": {"protocol": "b"}}]})
+    assert item.providers[0].relationship.protocol == "b"
+
+    view = sparse_view(Region, RegionReadExtended, "uid,services.endpoint")
+    assert "n_services {.endpoint, .type}" in view.projection
+    item = view.parse(
+        {
+            "uid": "r",
+            "services": [
+                {"endpoint": "https://compute.example", "type": "compute"},
+                {"endpoint": "https://network.example", "type": "network"},
+            ],
+        }
+    )
+    assert [type(i).__name__ for i in item.services] == [
+        "SparseComputeServiceRead",
+        "SparseNetworkServiceRead",
+    ]
+
+    view = sparse_view(Provider, ProviderReadExtended, "regions.services.flavors.name")
+    assert "THEN n_regions_services {.type} WHEN" in view.projection
+    item = view.parse(
+        {"regions": [{"services": [{"flavors": [{"name": "a"}], "type": "compute"}]}]}
+    )
+    assert item.regions[0].services[0].flavors[0].name == "a"
+    item = view.parse({"regions": [{"services": [{"type": "identity"}]}]})
+    assert type(item.regions[0].services[0]).__name__ == "SparseIdentityServiceRead"
+    assert "$uids" not in view.query()
+    assert "WHERE n.uid IN $uids" in view.query(by_uid=True)
+
+    with pytest.raises(ValueError):
+        sparse_view(Flavor, FlavorRead, "service")
+    with pytest.raises(ValueError):
+        sparse_view(Flavor, FlavorReadExtended, "missing")
+    with pytest.raises(ValueError):
+        sparse_view(Flavor, FlavorReadExtended, "schema_type")
+
+
+def test_fetch() -> None:
+    region = Region(**region_model_dict()).save()
+    service = ComputeService(**service_model_dict(ServiceType.COMPUTE)).save()
+    region.services.connect(service)
+    project = Project(**project_model_dict()).save()
+    flavors = []
+    for _ in range(3):
+        flavor = PrivateFlavor(**flavor_model_dict()).save()
+        service.flavors.connect(flavor)
+        project.private_flavors.connect(flavor)
+        flavors.append(flavor)
+    uids = sorted(i.uid for i in flavors)
+
+    view = sparse_view(
+        Flavor,
+        FlavorReadExtended,
+        "uid,name,projects.uuid,service.endpoint,service.region.name",
+    )
+    collector = QueryCollector()
+    with instrument(collector):
+        items = view.fetch(uids, skip=1, limit=5)
+    assert collector.count == 1
+    assert [i.uid for i in items] == uids[1:]
+    assert items[0].projects[0].uuid == project.uuid
+    assert items[0].service.endpoint == service.endpoint
+    assert items[0].service.region.name == region.name
+    assert view.fetch([uids[0]])[0].name == Flavor.nodes.get(uid=uids[0]).name
+
+
+def test_expand_view() -> None:
+    assert parse_expand("regions.services") == (
+        ("*", ()),
+        ("regions", (("*", ()), ("services", (("*", ()),)))),
+    )
+    assert parse_expand("") == (("*", ()),)
+
+    view = expand_view(Provider, ProviderReadExtended)
+    assert "COLLECT" not in view.projection
+    assert set(view.model.__fields__) == {
+        "description",
+        "etag",
+        "name",
+        "type",
+        "status",
+        "is_public",
+        "support_emails",
+        "uid",
+    }
+
+    view = expand_view(Provider, ProviderReadExtended, "regions.services.quotas")
+    assert view is expand_view(
+        Provider, ProviderReadExtended, ["regions.services.quotas"]
+    )
+    assert "identity_providers" not in view.model.__fields__
+    assert "WHEN n_regions_services:ComputeService THEN" in view.projection
+    region = view.model.__fields__["regions"].type_
+    assert "location" not in region.__fields__
+    service = {
+        "uid": "s",
+        "name": "org.openstack.nova",
+        "endpoint": "https://compute.example",
+        "quotas": [{"uid": "q", "per_user": False, "usage": False}],
+    }
+    item = view.parse(
+        {
+            "uid": "p",
+            "name": "provider",
+            "type": "openstack",
+            "regions": [
+                {
+                    "uid": "r",
+                    "name": "region",
+                    "services": [{**service, "type": ServiceType.COMPUTE.value}],
+                }
+            ],
+        }
+    )
+    [service] = item.regions[0].services
+    assert type(service).__name__ == "SparseComputeServiceReadExtended"
+    assert service.quotas[0].uid == "q"
+
+    with pytest.raises(ValueError):
+        expand_view(Provider, ProviderReadExtended, "regions.missing")
+
+
+def test_fetch_expanded() -> None:
+    provider = Provider(**provider_model_dict()).save()
+    region = Region(**region_model_dict()).save()
+    provider.regions.connect(region)
+    service = ComputeService(**service_model_dict(ServiceType.COMPUTE)).save()
+    region.services.connect(service)
+    quota = ComputeQuota(**quota_model_dict()).save()
+    quota.service.connect(service)
+
+    view = expand_view(Provider, ProviderReadExtended, "regions.services.quotas")
+    collector = QueryCollector()
+    with instrument(collector):
+        [item] = view.fetch([provider.uid])
+    assert collector.count == 1
+    assert item.name == provider.name
+    [service_item] = item.regions[0].services
+    assert service_item.endpoint == service.endpoint
+    assert [i.uid for i in service_item.quotas] == [quota.uid]